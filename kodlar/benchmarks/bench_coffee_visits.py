@@ -0,0 +1,66 @@
+"""cofee_visits.py: batch ve stream modlarının çıktı eşitliği, süre ve tepe bellek karşılaştırması
+
+Her mod ayrı süreçte çalıştırılır; böylece tepe RSS değerleri birbirini etkilemez.
+
+Kullanım (kodlar/ klasöründen):
+    python benchmarks/bench_coffee_visits.py --cihaz 20000 --ping 300
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import uuid
+
+import numpy as np
+import pandas as pd
+
+KODLAR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KAHVECILER = os.path.join(KODLAR, "..", "datalar", "kahveci2.csv")
+
+
+def sentetik_cihaz_csvleri(klasor, n_devices, pings_per_device, seed=3):
+    """Kahvecilerin çevresinde yoğunlaşan ping'lerle cihaz başına CSV üretir"""
+    rng = np.random.default_rng(seed)
+    kahveciler = pd.read_csv(KAHVECILER)[['latitude', 'longitude']].values
+    os.makedirs(klasor, exist_ok=True)
+    for _ in range(n_devices):
+        n = rng.integers(pings_per_device // 2, pings_per_device * 2)
+        merkez = kahveciler[rng.integers(0, len(kahveciler), n)]
+        pd.DataFrame({
+            "device_aid": str(uuid.uuid4()),
+            "timestamp": rng.integers(1714510800, 1717189200, n),
+            "latitude": merkez[:, 0] + rng.normal(0, 0.002, n),
+            "longitude": merkez[:, 1] + rng.normal(0, 0.002, n),
+        }).to_csv(os.path.join(klasor, f"{uuid.uuid4()}_data.csv"), index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cihaz", type=int, default=20_000)
+    parser.add_argument("--ping", type=int, default=300, help="Cihaz başına ortalama ping")
+    args = parser.parse_args()
+
+    klasor = tempfile.mkdtemp(prefix="bench_coffee_")
+    print(f"Sentetik veri üretiliyor: {args.cihaz:,} cihaz")
+    sentetik_cihaz_csvleri(os.path.join(klasor, "devices"), args.cihaz, args.ping)
+
+    ciktilar = {}
+    for mod in ["batch", "stream"]:
+        cikti = os.path.join(klasor, f"coffee_{mod}.csv")
+        sonuc = subprocess.run(
+            [sys.executable, os.path.join(KODLAR, "cofee_visits.py"), "--mod", mod,
+             "--magaza", os.path.join(klasor, "yok"), "--csv", os.path.join(klasor, "devices", "*.csv"),
+             "--kahveciler", KAHVECILER, "--cikti", cikti],
+            cwd=KODLAR, capture_output=True, text=True, check=True)
+        ozet = re.search(r"Mod: .*", sonuc.stdout).group(0)
+        print(ozet)
+        ciktilar[mod] = pd.read_csv(cikti)
+
+    ayni = ciktilar["batch"].equals(ciktilar["stream"])
+    print(f"Çıktılar aynı: {'evet' if ayni else 'HAYIR'}")
+
+
+if __name__ == "__main__":
+    main()
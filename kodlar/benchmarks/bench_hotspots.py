@@ -0,0 +1,86 @@
+"""user_profile_analyzer.find_hotspots_fast: derece*111 üzerinde DBSCAN vs. grid yoğunluk + bağlı bileşenler
+
+Sentetik farklı konumlar (İstanbul kutusunda düzgün dağılım + yoğun merkezler) üzerinde iki
+kümeleme adımı ölçülür; konum tablosunun groupby'ı ölçüme dahil değildir. Küçük boyutlarda
+her iki yöntemin, haversine metrikli DBSCAN'e (gerçek metre) göre kapsama oranı ve
+ayarlanmış Rand indeksi de raporlanır. --agirlikli ile konumlara sentetik ziyaret sayıları
+verilir; grid ve haversine referansı ziyaretle ağırlıklı yoğunluk kullanır (derece*111 DBSCAN
+find_hotspots_fast'teki gibi ağırlıksız kalır). DBSCAN --dbscan-max konum üzerinde atlanır.
+
+Kullanım (kodlar/ klasöründen):
+    python benchmarks/bench_hotspots.py --konumlar 1e4,1e5,1e6,1e7 --yaricap 0.1
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.metrics import adjusted_rand_score
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spatial_join import EARTH_RADIUS_M, grid_density_clusters
+
+
+def sentetik_konumlar(n, seed=5):
+    rng = np.random.default_rng(seed)
+    n_merkez = max(n // 200, 1)
+    merkez_lat = rng.uniform(40.95, 41.15, n_merkez)
+    merkez_lng = rng.uniform(28.7, 29.2, n_merkez)
+    secim = rng.integers(0, n_merkez, n // 2)
+    lat = np.r_[merkez_lat[secim] + rng.normal(0, 0.002, n // 2), rng.uniform(40.95, 41.15, n - n // 2)]
+    lng = np.r_[merkez_lng[secim] + rng.normal(0, 0.002, n // 2), rng.uniform(28.7, 29.2, n - n // 2)]
+    return lat, lng, rng.geometric(0.3, n).astype(np.float64)
+
+
+def karsilastir(referans, etiketler):
+    """(kapsama %, ayarlanmış Rand indeksi); ARI en az bir yöntemin kümelediği konumlarda"""
+    secim = (referans >= 0) | (etiketler >= 0)
+    return (etiketler >= 0).mean() * 100, adjusted_rand_score(referans[secim], etiketler[secim])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--konumlar", default="1e4,1e5,1e6")
+    parser.add_argument("--yaricap", type=float, default=0.1, help="km")
+    parser.add_argument("--min-samples", type=int, default=3)
+    parser.add_argument("--dbscan-max", type=float, default=1e5)
+    parser.add_argument("--dogruluk-max", type=float, default=2e4, help="haversine DBSCAN referansı üst sınırı")
+    parser.add_argument("--agirlikli", action="store_true", help="yoğunluk ziyaret sayısıyla ağırlıklı")
+    args = parser.parse_args()
+
+    print(f"{'konum':>10} | {'dbscan sn':>9} | {'grid sn':>8} | {'küme d/g':>13} | "
+          f"{'ref kapsama':>11} | {'dbscan kap/ARI':>15} | {'grid kap/ARI':>13}")
+    for n in [int(float(b)) for b in args.konumlar.split(",")]:
+        lat, lng, ziyaret = sentetik_konumlar(n)
+        agirlik = ziyaret if args.agirlikli else None
+
+        start = time.perf_counter()
+        grid = grid_density_clusters(lat, lng, args.yaricap * 1000, min_points=args.min_samples, weights=agirlik)
+        grid_sure = time.perf_counter() - start
+
+        dbscan = None
+        if n <= args.dbscan_max:
+            start = time.perf_counter()
+            dbscan = DBSCAN(eps=args.yaricap, min_samples=args.min_samples).fit_predict(np.c_[lat, lng] * 111)
+            dbscan_sure = f"{time.perf_counter() - start:9.1f}"
+            kumeler = f"{dbscan.max() + 1:>6,}/{grid.max() + 1:<6,}"
+        else:
+            dbscan_sure, kumeler = f"{'atlandı':>9}", f"{'-':>6}/{grid.max() + 1:<6,}"
+
+        ref_kap, dbscan_dog, grid_dog = "-", "-", "-"
+        if n <= args.dogruluk_max:
+            referans = DBSCAN(eps=args.yaricap * 1000 / EARTH_RADIUS_M, min_samples=args.min_samples,
+                              metric="haversine", algorithm="ball_tree").fit_predict(np.radians(np.c_[lat, lng]),
+                                                                                     sample_weight=agirlik)
+            ref_kap = f"{(referans >= 0).mean() * 100:.1f}%"
+            grid_dog = "{:.1f}% / {:.2f}".format(*karsilastir(referans, grid))
+            if dbscan is not None:
+                dbscan_dog = "{:.1f}% / {:.2f}".format(*karsilastir(referans, dbscan))
+        print(f"{n:>10,} | {dbscan_sure} | {grid_sure:8.2f} | {kumeler:>13} | {ref_kap:>11} | "
+              f"{dbscan_dog:>15} | {grid_dog:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""matcher.balltree_eslestirme sonuç tablosu: eşleşme başına dict + .loc döngüsü vs. dizi take
+
+Tek cihazlık sentetik hareket verisiyle (varsayılan 100k ping) aynı indeks sorgusu
+üzerinden iki sonuç üretimi ölçülür ve çıktıların satır satır aynı olduğu doğrulanır.
+
+Kullanım (kodlar/ klasöründen):
+    python benchmarks/bench_matcher_results.py --ping 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from matcher import balltree_eslestirme, mekan_indeksi_olustur
+
+MEKANLAR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                        "datalar", "maindataplaces.csv")
+
+
+def eski_sonuclar(hareketler_df, mekanlar_df, mekan_indeksi):
+    """Eski yöntem: her eşleşme için bir dict ve üç .loc araması"""
+    mekanlar_temiz, index = mekan_indeksi
+    hareketler_temiz = hareketler_df.dropna(subset=['latitude', 'longitude']).copy()
+    h_indices, m_indices, mesafeler = index.query(hareketler_temiz['latitude'].values,
+                                                  hareketler_temiz['longitude'].values)
+    sonuclar = []
+    for h_idx, m_idx, mesafe_metre in zip(h_indices, m_indices, mesafeler):
+        original_h_idx = hareketler_temiz.index[h_idx]
+        original_m_idx = mekanlar_temiz.index[m_idx]
+        sonuclar.append({
+            'timestamp': hareketler_df.loc[original_h_idx, 'timestamp'],
+            'device_aid': hareketler_df.loc[original_h_idx, 'device_aid'],
+            'gidilen_mekan': mekanlar_df.loc[original_m_idx, 'MusteriTabelaAdi'],
+            'mesafe_m': mesafe_metre
+        })
+    return pd.DataFrame(sonuclar)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ping", type=int, default=100_000)
+    parser.add_argument("--esik", type=float, default=30.0, help="metre")
+    parser.add_argument("--tekrar", type=int, default=3)
+    args = parser.parse_args()
+
+    mekanlar = pd.read_csv(MEKANLAR)
+    mekan_indeksi = mekan_indeksi_olustur(mekanlar, args.esik)
+    temiz = mekan_indeksi[0]
+
+    # Tek cihaz: ping'lerin çoğu mekanların çevresinde, birkaçı koordinatsız
+    rng = np.random.default_rng(5)
+    i = rng.integers(0, len(temiz), args.ping)
+    hareketler = pd.DataFrame({
+        'timestamp': 1714500000 + np.sort(rng.integers(0, 30 * 86400, args.ping)),
+        'device_aid': 'cihaz-0001',
+        'latitude': temiz['lat'].values[i] + rng.normal(0, 0.0003, args.ping),
+        'longitude': temiz['lng'].values[i] + rng.normal(0, 0.0003, args.ping),
+    })
+    hareketler.loc[rng.random(args.ping) < 0.01, 'latitude'] = np.nan
+
+    sureler = {}
+    for ad, calistir in [("dict + .loc", lambda: eski_sonuclar(hareketler, mekanlar, mekan_indeksi)),
+                         ("dizi take", lambda: balltree_eslestirme(hareketler, mekanlar, args.esik,
+                                                                   mekan_indeksi=mekan_indeksi))]:
+        en_iyi = float("inf")
+        for _ in range(args.tekrar):
+            start = time.perf_counter()
+            sonuc = calistir()
+            en_iyi = min(en_iyi, time.perf_counter() - start)
+        sureler[ad] = (en_iyi, sonuc)
+        print(f"{ad:>12}: {en_iyi:7.3f} sn, {len(sonuc):,} eşleşme")
+
+    eski, yeni = sureler["dict + .loc"][1], sureler["dizi take"][1]
+    print(f"Satır satır aynı: {eski.astype(str).equals(yeni.astype(str))}")
+    print(f"Hızlanma: {sureler['dict + .loc'][0] / sureler['dizi take'][0]:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""En yakın veteriner ataması: eski ping başına tree.query döngüsü vs. toplu nearest()
+
+Eski yöntem (vet_visiter.py) query_radius sonrası eşleşen her ping için ayrı bir
+tree.query çağırıyordu. Yeni yöntem tüm ping'ler için tek vektörize çağrıdır. Ayrıca
+eski döngünün kaç ping'e en yakın olmayan veterineri atadığı raporlanır.
+
+Kullanım (kodlar/ klasöründen):
+    python benchmarks/bench_nearest_poi.py --ping 10000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spatial_join import EARTH_RADIUS_M, build_index, haversine_m
+
+VETERINERLER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            "datalar", "veterinerlerson.csv")
+
+
+def sentetik_pingler(poi_lat, poi_lng, n_pings, seed=11):
+    """Yarısı veteriner çevresinde, yarısı şehir geneline dağılmış ping'ler"""
+    rng = np.random.default_rng(seed)
+    yakin = rng.random(n_pings) < 0.5
+    i = rng.integers(0, len(poi_lat), n_pings)
+    lat = np.where(yakin, poi_lat[i] + rng.normal(0, 0.0002, n_pings), rng.uniform(36.0, 42.0, n_pings))
+    lng = np.where(yakin, poi_lng[i] + rng.normal(0, 0.0002, n_pings), rng.uniform(26.0, 45.0, n_pings))
+    return lat, lng
+
+
+def eski_dongu(tree, lat, lng, radius_m):
+    """vet_visiter.py'deki eski yöntem: eşleşen her ping için ayrı tree.query"""
+    user_coords = np.radians(np.column_stack([lat, lng]))
+    indices = tree.query_radius(user_coords, r=radius_m / EARTH_RADIUS_M)
+    nearest = np.full(len(lat), -1, dtype=np.int64)
+    for idx, vet_indices in enumerate(indices):
+        if len(vet_indices) > 0:
+            distances = tree.query([user_coords[idx]], k=len(vet_indices), return_distance=True)[0][0]
+            nearest[idx] = vet_indices[np.argmin(distances)]
+    return nearest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ping", type=float, default=1e7)
+    parser.add_argument("--yaricap", type=float, default=20.0, help="metre")
+    args = parser.parse_args()
+
+    vets = pd.read_csv(VETERINERLER).dropna(subset=["lat", "lng"])
+    poi_lat, poi_lng = vets["lat"].values, vets["lng"].values
+    n_pings = int(args.ping)
+    lat, lng = sentetik_pingler(poi_lat, poi_lng, n_pings)
+    print(f"{len(poi_lat):,} veteriner, {n_pings:,} ping, yarıçap {args.yaricap:.0f} m")
+
+    sonuclar = {}
+    for motor in ("balltree", "grid"):
+        index = build_index(poi_lat, poi_lng, args.yaricap, engine=motor)
+        start = time.perf_counter()
+        sonuclar[motor] = index.nearest(lat, lng)
+        print(f"nearest() [{motor:>8}]: {time.perf_counter() - start:8.1f} sn")
+
+    index = build_index(poi_lat, poi_lng, args.yaricap, engine="balltree")
+    start = time.perf_counter()
+    eski = eski_dongu(index.tree, lat, lng, args.yaricap)
+    print(f"eski döngü          : {time.perf_counter() - start:8.1f} sn")
+
+    yeni, yeni_mesafe = sonuclar["balltree"]
+    grid, grid_mesafe = sonuclar["grid"]
+    eslesen = yeni >= 0
+    print(f"Eşleşen ping: {eslesen.sum():,} (eski: {(eski >= 0).sum():,})")
+    # Aynı koordinattaki veterinerlerde indeks farklı olabilir; mesafeler karşılaştırılır
+    ayni = np.array_equal(eslesen, grid >= 0) and np.allclose(yeni_mesafe[eslesen], grid_mesafe[eslesen])
+    print(f"balltree ve grid en yakın mesafeleri aynı: {ayni}")
+
+    # Eski döngünün atadığı veteriner en yakından uzaksa hatalı sayılır
+    farkli = np.flatnonzero(eslesen & (eski != yeni))
+    if len(farkli):
+        eski_m = haversine_m(lat[farkli], lng[farkli], poi_lat[eski[farkli]], poi_lng[eski[farkli]])
+        yeni_m = haversine_m(lat[farkli], lng[farkli], poi_lat[yeni[farkli]], poi_lng[yeni[farkli]])
+        print(f"Eski döngünün en yakın olmayan veterineri atadığı ping: {(eski_m > yeni_m + 1e-6).sum():,}")
+    else:
+        print("Eski döngü ile atamalar aynı")
+
+
+if __name__ == "__main__":
+    main()
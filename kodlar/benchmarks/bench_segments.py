@@ -0,0 +1,103 @@
+"""user_profile_analyzer.segment_users_fast: tüm profillerde KMeans(n_init=10) vs. parça parça MiniBatchKMeans
+
+Sentetik profiller beş bilinen kullanıcı tipinden (Casual Diners, Bar Hoppers, ...) üretilir.
+Her boyutta eğitim süresi ve tracemalloc ile ölçülen en yüksek ek bellek (profil tablosu hariç),
+kayıtlı modelle atama süresi, eski KMeans'e göre ayarlanmış Rand indeksi ve segment adının
+üretilen tipe uyma oranı raporlanır. Ad kararlılığı için model satırları karıştırılmış profillerle
+farklı random_state ile yeniden eğitilir ve cihazların aynı adı alma oranı ölçülür.
+Eski KMeans --kmeans-max profil üzerinde atlanır.
+
+Kullanım (kodlar/ klasöründen):
+    python benchmarks/bench_segments.py --profiller 1e5,1e6,5e6
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.metrics import adjusted_rand_score
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from segment_model import SEGMENT_FEATURES, SEGMENT_PROFILES, SegmentModel, profile_chunks
+
+# Tip başına özellik ortalamaları (SEGMENT_FEATURES sırasıyla)
+TIPLER = {
+    "Casual Diners":   [6, 4, 0.25, 2.0, 25, 0.3, 0.3, 5.0, 0.1, 0.3, 0.5],
+    "Bar Hoppers":     [9, 6, 0.55, 3.0, 45, 0.4, 6.0, 1.0, 0.1, 1.5, 2.0],
+    "Fine Diners":     [5, 3, 0.30, 4.0, 80, 0.3, 0.5, 3.5, 0.2, 3.5, 3.0],
+    "Hotel Guests":    [4, 2, 0.40, 12.0, 60, 0.2, 0.2, 0.8, 3.0, 1.5, 2.0],
+    "Local Explorers": [14, 11, 0.30, 1.5, 35, 0.9, 2.0, 2.5, 0.3, 1.0, 1.5],
+}
+
+
+def sentetik_profiller(n, seed=11):
+    rng = np.random.default_rng(seed)
+    tip = rng.integers(0, len(TIPLER), n)
+    ortalama = np.array(list(TIPLER.values()))[tip]
+    degerler = np.maximum(ortalama * rng.lognormal(0, 0.35, ortalama.shape), 0)
+    profiller = pd.DataFrame(degerler, columns=SEGMENT_FEATURES)
+    profiller['weekend_ratio'] = profiller['weekend_ratio'].clip(upper=1)
+    profiller['venue_type_diversity'] = profiller['venue_type_diversity'].clip(upper=1)
+    profiller.insert(0, 'device_aid', np.arange(n))
+    return profiller, np.array(list(TIPLER))[tip]
+
+
+def olc(fonksiyon):
+    tracemalloc.start()
+    start = time.perf_counter()
+    sonuc = fonksiyon()
+    sure = time.perf_counter() - start
+    _, tepe = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sonuc, sure, tepe / 2 ** 20
+
+
+def eski_kmeans(profiller):
+    X_scaled = StandardScaler().fit_transform(profiller[SEGMENT_FEATURES].fillna(0))
+    return KMeans(n_clusters=5, random_state=42, n_init=10).fit_predict(X_scaled)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiller", default="1e5,1e6,5e6")
+    parser.add_argument("--parca", type=int, default=100_000)
+    parser.add_argument("--kmeans-max", type=float, default=1e6)
+    args = parser.parse_args()
+    assert list(TIPLER) == list(SEGMENT_PROFILES)
+
+    print(f"{'profil':>10} | {'eski sn':>7} | {'eski MB':>7} | {'eğitim sn':>9} | {'eğitim MB':>9} | "
+          f"{'atama sn':>8} | {'ARI':>5} | {'tip=ad %':>8} | {'ad kararlı %':>12}")
+    for n in [int(float(b)) for b in args.profiller.split(",")]:
+        profiller, tipler = sentetik_profiller(n)
+
+        model, egitim_sure, egitim_mb = olc(lambda: SegmentModel().fit(profile_chunks(profiller, args.parca)))
+        with tempfile.TemporaryDirectory() as tmp:
+            model.save(os.path.join(tmp, "segment_model.npz"))
+            kayitli = SegmentModel.load(os.path.join(tmp, "segment_model.npz"))
+        start = time.perf_counter()
+        segmentler, adlar = kayitli.assign(profiller)
+        atama_sure = time.perf_counter() - start
+
+        # Aynı veri, karıştırılmış satırlar ve farklı tohumla yeniden eğitim
+        karisik = profiller.sample(frac=1, random_state=1)
+        model2 = SegmentModel(random_state=7).fit(profile_chunks(karisik, args.parca))
+        _, adlar2 = model2.assign(profiller)
+
+        if n <= args.kmeans_max:
+            eski, eski_sure, eski_mb = olc(lambda: eski_kmeans(profiller))
+            eski_kisim = f"{eski_sure:7.1f} | {eski_mb:7.0f}"
+            ari = f"{adjusted_rand_score(eski, segmentler):5.2f}"
+        else:
+            eski_kisim, ari = f"{'atlandı':>7} | {'-':>7}", f"{'-':>5}"
+        print(f"{n:>10,} | {eski_kisim} | {egitim_sure:9.1f} | {egitim_mb:9.0f} | {atama_sure:8.2f} | {ari} | "
+              f"{(adlar == tipler).mean() * 100:8.1f} | {(adlar == adlar2).mean() * 100:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Sabit yarıçaplı eşleştirme: haversine BallTree vs. grid-hash vs. izdüşümlü cKDTree
+
+Ping'ler parça parça üretilip sorgulanır; böylece 500M ping bellek sınırı olmadan ölçülür.
+BallTree büyük boyutlarda saatler sürebileceği için --balltree-max üzerinde atlanır.
+Ölçümden önce ilk parça üzerinde her motorun çiftleri BallTree ile karşılaştırılır.
+
+Kullanım (kodlar/ klasöründen):
+    python benchmarks/bench_spatial_join.py --boyutlar 1e6,1e7,1e8 --yaricap 30
+    python benchmarks/bench_spatial_join.py --motorlar balltree,kdtree
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from spatial_join import ENGINES, build_index
+
+MEKANLAR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                        "datalar", "maindataplaces.csv")
+
+
+def ping_parcalari(poi_lat, poi_lng, n_pings, chunk, seed=11):
+    """Yarısı POI çevresinde, yarısı şehir geneline dağılmış sentetik ping parçaları"""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_pings, chunk):
+        n = min(chunk, n_pings - start)
+        yakin = rng.random(n) < 0.5
+        i = rng.integers(0, len(poi_lat), n)
+        lat = np.where(yakin, poi_lat[i] + rng.normal(0, 0.0004, n), rng.uniform(40.85, 41.2, n))
+        lng = np.where(yakin, poi_lng[i] + rng.normal(0, 0.0004, n), rng.uniform(28.6, 29.4, n))
+        yield lat, lng
+
+
+def dogrula(poi_lat, poi_lng, yaricap, motorlar, n_pings):
+    """Her motorun (ping, poi) çiftlerini ve mesafelerini BallTree sonucuyla karşılaştırır"""
+    lat, lng = next(ping_parcalari(poi_lat, poi_lng, n_pings, n_pings))
+    referans = build_index(poi_lat, poi_lng, yaricap, engine="balltree").query(lat, lng)
+    ref_order = np.lexsort((referans[1], referans[0]))
+    for motor in motorlar:
+        if motor == "balltree":
+            continue
+        ping_idx, poi_idx, dist_m = build_index(poi_lat, poi_lng, yaricap, engine=motor).query(lat, lng)
+        order = np.lexsort((poi_idx, ping_idx))
+        ayni = (np.array_equal(ping_idx[order], referans[0][ref_order])
+                and np.array_equal(poi_idx[order], referans[1][ref_order]))
+        fark = np.abs(dist_m[order] - referans[2][ref_order]).max() if ayni and len(dist_m) else float("nan")
+        print(f"Doğrulama ({n_pings:,} ping) {motor}: çiftler BallTree ile aynı: {ayni}, "
+              f"en büyük mesafe farkı {fark:.2e} m")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--boyutlar", default="1e6,1e7,1e8,5e8")
+    parser.add_argument("--yaricap", type=float, default=30.0, help="metre")
+    parser.add_argument("--chunk", type=int, default=5_000_000)
+    parser.add_argument("--balltree-max", type=float, default=1e7)
+    parser.add_argument("--motorlar", default=",".join(ENGINES))
+    args = parser.parse_args()
+
+    mekanlar = pd.read_csv(MEKANLAR).dropna(subset=["lat", "lng"])
+    poi_lat, poi_lng = mekanlar["lat"].values, mekanlar["lng"].values
+    boyutlar = [int(float(b)) for b in args.boyutlar.split(",")]
+    motorlar = args.motorlar.split(",")
+
+    print(f"{len(poi_lat):,} mekan, yarıçap {args.yaricap:.0f} m")
+    dogrula(poi_lat, poi_lng, args.yaricap, motorlar, min(args.chunk, 1_000_000))
+    print(f"{'ping':>12} | {'motor':>9} | {'süre sn':>9} | {'ping/sn':>12} | {'eşleşme':>12}")
+    for n_pings in boyutlar:
+        for motor in motorlar:
+            if motor == "balltree" and n_pings > args.balltree_max:
+                print(f"{n_pings:>12,} | {motor:>9} | {'atlandı':>9} |")
+                continue
+            index = build_index(poi_lat, poi_lng, args.yaricap, engine=motor)
+            sure, eslesme = 0.0, 0
+            for lat, lng in ping_parcalari(poi_lat, poi_lng, n_pings, args.chunk):
+                start = time.perf_counter()
+                ping_idx, _, _ = index.query(lat, lng)
+                sure += time.perf_counter() - start
+                eslesme += len(ping_idx)
+            print(f"{n_pings:>12,} | {motor:>9} | {sure:9.1f} | {n_pings / sure:12,.0f} | {eslesme:12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Trajektori indeksi ile rastgele tek cihaz okuma vs. tam tarama
+
+Kullanım (kodlar/ klasöründen):
+    python benchmarks/bench_trajectory_index.py --satir 20000000 --cihaz 200000 --sorgu 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from device_store import DeviceStoreWriter, read_device
+from trajectory_index import TrajectoryIndex, build_index
+
+
+def sentetik_magaza(root, n_rows, n_devices, chunk_rows=2_000_000, seed=7):
+    rng = np.random.default_rng(seed)
+    cihazlar = np.array([str(uuid.UUID(int=int(x))) for x in rng.integers(0, 2**63, n_devices)], dtype=object)
+    writer = DeviceStoreWriter(root, n_buckets=64)
+    for start in range(0, n_rows, chunk_rows):
+        n = min(chunk_rows, n_rows - start)
+        writer.write(pd.DataFrame({
+            "device_aid": cihazlar[rng.integers(0, n_devices, n)],
+            "timestamp": rng.integers(1714510800, 1717189200, n),
+            "latitude": rng.uniform(40.8, 41.3, n),
+            "longitude": rng.uniform(28.5, 29.5, n),
+        }))
+    writer.close()
+    return cihazlar
+
+
+def zamanla(fonksiyon, cihazlar):
+    sureler = []
+    for cihaz in cihazlar:
+        start = time.perf_counter()
+        fonksiyon(cihaz)
+        sureler.append((time.perf_counter() - start) * 1000)
+    return np.median(sureler), np.percentile(sureler, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--satir", type=int, default=20_000_000)
+    parser.add_argument("--cihaz", type=int, default=200_000)
+    parser.add_argument("--sorgu", type=int, default=200)
+    parser.add_argument("--tam-tarama-sorgu", type=int, default=5, help="Tam tarama yavaş olduğu için daha az sorgu")
+    args = parser.parse_args()
+
+    root = os.path.join(tempfile.mkdtemp(prefix="bench_index_"), "device_store")
+    print(f"Sentetik mağaza üretiliyor: {args.satir:,} satır, {args.cihaz:,} cihaz")
+    cihazlar = sentetik_magaza(root, args.satir, args.cihaz)
+
+    start = time.perf_counter()
+    build_index(root)
+    print(f"İndeks oluşturma: {time.perf_counter() - start:.1f} sn")
+
+    start = time.perf_counter()
+    index = TrajectoryIndex(root)
+    print(f"İndeks yükleme: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = np.random.default_rng(1)
+    sorgular = rng.choice(cihazlar, args.sorgu)
+    dataset = ds.dataset(root, format="parquet")
+
+    sonuclar = {
+        "indeks": zamanla(index.lookup, sorgular),
+        "bucket tarama": zamanla(lambda c: read_device(root, c), sorgular),
+        "tam tarama": zamanla(lambda c: dataset.to_table(filter=pc.field("device_aid") == c).to_pandas(),
+                              sorgular[:args.tam_tarama_sorgu]),
+    }
+    print(f"\n{'yöntem':>14} | {'medyan ms':>10} | {'p95 ms':>10}")
+    for ad, (medyan, p95) in sonuclar.items():
+        print(f"{ad:>14} | {medyan:10.2f} | {p95:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
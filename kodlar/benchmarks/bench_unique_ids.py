@@ -0,0 +1,74 @@
+"""getunique_ids.py: eski pandas taraması ile Arrow taramasının süre karşılaştırması
+
+Kullanım (kodlar/ klasöründen):
+    python benchmarks/bench_unique_ids.py --satir 120000000 --cihaz 2000000
+
+Varsayılan 120M satırlık sentetik dosya diskte ~2-3 GB yer kaplar.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from getunique_ids import unique_ids_arrow, unique_ids_pandas
+
+
+def sentetik_mobility_yaz(path, n_rows, n_devices, chunk_rows=5_000_000, seed=42):
+    """MobilityData şemasında sentetik parquet dosyası üretir"""
+    rng = np.random.default_rng(seed)
+    cihazlar = np.array([str(uuid.UUID(int=int(x))) for x in rng.integers(0, 2**63, n_devices)], dtype=object)
+    schema = pa.schema([
+        ("device_aid", pa.string()),
+        ("timestamp", pa.int64()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("horizontal_accuracy", pa.float64()),
+    ])
+    with pq.ParquetWriter(path, schema) as writer:
+        for start in range(0, n_rows, chunk_rows):
+            n = min(chunk_rows, n_rows - start)
+            writer.write_table(pa.table({
+                "device_aid": cihazlar[rng.integers(0, n_devices, n)],
+                "timestamp": rng.integers(1714510800, 1717189200, n),
+                "latitude": rng.uniform(40.8, 41.3, n),
+                "longitude": rng.uniform(28.5, 29.5, n),
+                "horizontal_accuracy": rng.uniform(3, 50, n),
+            }, schema=schema), row_group_size=1_000_000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--satir", type=int, default=120_000_000)
+    parser.add_argument("--cihaz", type=int, default=2_000_000)
+    parser.add_argument("--klasor", default=None, help="Sentetik dosyanın yazılacağı klasör")
+    args = parser.parse_args()
+
+    klasor = args.klasor or tempfile.mkdtemp(prefix="bench_unique_")
+    girdi = os.path.join(klasor, "mobility.parquet")
+    if not os.path.exists(girdi):
+        print(f"Sentetik veri üretiliyor: {args.satir:,} satır, {args.cihaz:,} cihaz")
+        sentetik_mobility_yaz(girdi, args.satir, args.cihaz)
+    print(f"Dosya boyutu: {os.path.getsize(girdi) / 1e9:.2f} GB")
+
+    sureler = {}
+    for ad, fonksiyon, cikti in [
+        ("pandas", unique_ids_pandas, "unique_device_ids.csv"),
+        ("arrow", unique_ids_arrow, "unique_device_ids.parquet"),
+    ]:
+        start = time.perf_counter()
+        adet = fonksiyon(girdi, os.path.join(klasor, cikti))
+        sureler[ad] = time.perf_counter() - start
+        print(f"{ad:>7}: {sureler[ad]:8.1f} sn ({adet:,} cihaz)")
+
+    print(f"Hızlanma: {sureler['pandas'] / sureler['arrow']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""user_profile_analyzer.create_user_profiles_fast: lambda'lı groupby vs. bool kolon + yerleşik indirgeme
+
+Zenginleştirilmiş eşleşme tablosu (cihaz başına ortalama --ziyaret satır) doğrudan sentetik
+üretilir; _prepare_data_fast'teki birleştirme ölçüme dahil değildir. Cihaz ve mekan kimlikleri
+5M cihazın bellekte kalabilmesi için tamsayıdır. Eski lambda'lı toplama --eski-max cihaz
+üzerinde atlanır; çalıştığı boyutlarda iki çıktının CSV olarak aynı olduğu doğrulanır.
+
+Kullanım (kodlar/ klasöründen):
+    python benchmarks/bench_user_profiles.py --cihazlar 1e5,1e6,5e6
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from user_profile_analyzer import FastSpatialSocialAnalyzer, PROFILE_COLUMNS, _group_mode
+
+
+def sentetik_zengin_veri(n_cihaz, ziyaret, seed=3):
+    rng = np.random.default_rng(seed)
+    n = int(n_cihaz * ziyaret)
+    venue_type = np.array(['bar_pub', 'restaurant', 'hotel', 'other', None], dtype=object)[rng.integers(0, 5, n)]
+    bilinmeyen = venue_type == None  # noqa: E711 (eşleşmeyen mekan: tür ve konum yok)
+    lat = np.where(bilinmeyen, np.nan, rng.uniform(40.9, 41.2, n))
+    return pd.DataFrame({
+        'device_aid': rng.integers(0, n_cihaz, n),
+        'gidilen_mekan': rng.integers(0, 800, n),
+        'mesafe_m': rng.uniform(0, 30, n),
+        'hour': rng.integers(0, 24, n).astype('int32'),
+        'is_weekend': rng.random(n) < 2 / 7,
+        'venue_type': venue_type,
+        'venue_level': np.where(bilinmeyen, np.nan, rng.integers(0, 4, n)),
+        'venue_quality': np.where(bilinmeyen, None, np.array(['A', 'B', 'C'], dtype=object)[rng.integers(0, 3, n)]),
+        'lat': lat,
+        'lng': np.where(bilinmeyen, np.nan, rng.uniform(28.6, 29.4, n)),
+    })
+
+
+def eski_profiller(data):
+    """Eski create_user_profiles_fast toplama kısmı: cihaz başına Python lambda'ları"""
+    user_stats = data.groupby('device_aid').agg({
+        'gidilen_mekan': ['count', 'nunique'],
+        'mesafe_m': 'mean',
+        'is_weekend': 'mean',
+        'hour': lambda x: (x < 12).sum(),
+        'venue_type': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else 'unknown',
+        'venue_level': lambda x: (x >= 3).sum(),
+        'venue_quality': [lambda x: (x == 'A').sum(), lambda x: (x == 'B').sum()],
+        'lat': ['min', 'max'],
+        'lng': ['min', 'max']
+    })
+    user_stats.columns = ['total_visits', 'unique_places', 'avg_distance', 'weekend_ratio',
+                          'morning_visits', 'favorite_venue_type', 'high_level_venues',
+                          'quality_A_visits', 'quality_B_visits', 'lat_min', 'lat_max', 'lng_min', 'lng_max']
+    venue_counts = data.groupby(['device_aid', 'venue_type']).size().unstack(fill_value=0)
+    venue_counts = venue_counts.reindex(columns=['bar_pub', 'restaurant', 'hotel'], fill_value=0)
+    hour_stats = data.groupby('device_aid')['hour'].agg([
+        lambda x: ((x >= 12) & (x < 18)).sum(),
+        lambda x: (x >= 18).sum(),
+        lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else 12
+    ])
+    hour_stats.columns = ['afternoon_visits', 'evening_visits', 'most_active_hour']
+    return user_stats.join([venue_counts, hour_stats]).reset_index()
+
+
+def yeni_profiller(data):
+    analyzer = object.__new__(FastSpatialSocialAnalyzer)
+    analyzer.enriched_data = data
+    with contextlib.redirect_stdout(io.StringIO()):
+        profiles = analyzer.create_user_profiles_fast()
+    return profiles[['device_aid'] + PROFILE_COLUMNS]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cihazlar", default="1e5,1e6,5e6")
+    parser.add_argument("--ziyaret", type=float, default=3.0, help="cihaz başına ortalama satır")
+    parser.add_argument("--eski-max", type=float, default=1e5)
+    args = parser.parse_args()
+
+    print(f"{'cihaz':>10} | {'satır':>11} | {'eski sn':>8} | {'yeni sn':>8} | {'mod sn':>7} | aynı")
+    for n_cihaz in [int(float(b)) for b in args.cihazlar.split(",")]:
+        data = sentetik_zengin_veri(n_cihaz, args.ziyaret)
+
+        start = time.perf_counter()
+        yeni = yeni_profiller(data)
+        yeni_sure = time.perf_counter() - start
+
+        # Yeni sürenin içindeki iki mod hesabı ayrıca ölçülür
+        device_codes = data.groupby('device_aid').ngroup().to_numpy()
+        start = time.perf_counter()
+        _group_mode(device_codes, data['venue_type'], pd.Index(yeni['device_aid']), 'unknown')
+        _group_mode(device_codes, data['hour'], pd.Index(yeni['device_aid']), 12)
+        mod_sure = time.perf_counter() - start
+
+        if n_cihaz <= args.eski_max:
+            start = time.perf_counter()
+            eski = eski_profiller(data)
+            eski_sure = f"{time.perf_counter() - start:8.1f}"
+            ayni = str(eski.to_csv(index=False) == yeni.to_csv(index=False))
+        else:
+            eski_sure, ayni = f"{'atlandı':>8}", "-"
+        print(f"{n_cihaz:>10,} | {len(data):>11,} | {eski_sure} | {yeni_sure:8.1f} | {mod_sure:7.1f} | {ayni}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""venue_analyzer bulanık mekan adı eşleştirmesi: eşleşme oranı kazancı ve hız
+
+Katalog, gerçek ana mekan ve veteriner adlarından (load_venue_data ile aynı normalizasyon)
+kurulur. Aktivite adları bu adların yazım varyantlarından (büyük/küçük harf, ASCII yazım,
+harf hatası, ek kelime) ve katalogda olmayan adlardan üretilir. Tam eşleşme ile tam eşleşme +
+trigram indeksi karşılaştırılır; bulanık eşleşmenin doğru adı bulma oranı ve katalog dışı
+adlarda yanlış eşleşme oranı da raporlanır. Bulanık arama sadece farklı adlar üzerinde yapılır.
+
+Kullanım (kodlar/ klasöründen):
+    python benchmarks/bench_venue_fuzzy.py --aktivite 1000000 --farkli 50000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from venue_fuzzy import VenueNameIndex
+
+DATALAR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "datalar")
+TURKCE_ASCII = str.maketrans("ıİşŞğĞçÇöÖüÜ", "iIsSgGcCoOuU")
+HARFLER = list("abcdefghijklmnoprstuvyzçğıöşü")
+
+
+def katalog_adlari():
+    adlar = pd.concat([pd.read_csv(os.path.join(DATALAR, "maindataplaces.csv"))['MusteriTabelaAdi'],
+                       pd.read_csv(os.path.join(DATALAR, "veterinerlerson.csv"))['name']]).dropna().astype(str)
+    # load_venue_data ile aynı anahtar: str.lower + strip
+    return adlar, pd.Index(adlar.str.lower().str.strip()).unique()
+
+
+def varyant(ad, rng):
+    """Tek yazım varyantı ve türü"""
+    tur = rng.integers(5)
+    if tur == 0:
+        return ad.title(), "harf_boyu"
+    if tur == 1:
+        return ad.translate(TURKCE_ASCII), "ascii"
+    if tur == 2 and len(ad) > 4:
+        i = rng.integers(1, len(ad) - 1)
+        return ad[:i] + ad[i + 1:], "harf_eksik"
+    if tur == 3 and len(ad) > 4:
+        i = rng.integers(1, len(ad) - 1)
+        return ad[:i] + HARFLER[rng.integers(len(HARFLER))] + ad[i + 1:], "harf_hatasi"
+    return f"{ad} {['ŞUBE', 'CAFE', '2', 'LTD'][rng.integers(4)]}", "ek_kelime"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--aktivite", type=float, default=1e6)
+    parser.add_argument("--farkli", type=int, default=50_000, help="farklı aktivite adı sayısı")
+    parser.add_argument("--katalog-disi", type=float, default=0.3, help="katalogda olmayan farklı ad oranı")
+    parser.add_argument("--esik", type=float, default=0.85)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(17)
+    ham_adlar, katalog = katalog_adlari()
+    n_disi = int(args.farkli * args.katalog_disi)
+    kaynak = ham_adlar.to_numpy()[rng.integers(0, len(ham_adlar), args.farkli - n_disi)]
+    uretilen = [varyant(ad, rng) for ad in kaynak]
+    adlar = [ad for ad, _ in uretilen] + [f"MAĞAZA {i} {HARFLER[i % len(HARFLER)]}" for i in range(n_disi)]
+    turler = np.array([tur for _, tur in uretilen] + ["katalog_disi"] * n_disi)
+    dogru = np.r_[katalog.get_indexer(pd.Index(kaynak).str.lower().str.strip()), np.full(n_disi, -1)]
+
+    # Aktiviteler farklı adlardan tekrarla örneklenir; arama sadece farklı adlarda yapılır
+    n = int(args.aktivite)
+    aktivite_kod = rng.integers(0, len(adlar), n)
+    print(f"{len(katalog):,} katalog adı, {len(adlar):,} farklı aktivite adı, {n:,} aktivite")
+
+    start = time.perf_counter()
+    index = VenueNameIndex(katalog)
+    kurulum = time.perf_counter() - start
+
+    tam = katalog.get_indexer(pd.Index(adlar).str.lower().str.strip())
+    start = time.perf_counter()
+    bulanik, _ = index.match(np.asarray(adlar, dtype=object)[tam < 0], k=args.k, min_similarity=args.esik)
+    sure = time.perf_counter() - start
+    sonuc = tam.copy()
+    sonuc[tam < 0] = bulanik
+
+    print(f"İndeks kurulumu: {kurulum:.2f} sn, {len(index.vocabulary):,} trigram")
+    print(f"Bulanık arama: {(tam < 0).sum():,} ad {sure:.2f} sn ({(tam < 0).sum() / sure:,.0f} ad/sn)")
+
+    tam_oran = (tam[aktivite_kod] >= 0).mean() * 100
+    bulanik_oran = (sonuc[aktivite_kod] >= 0).mean() * 100
+    print(f"Aktivite eşleşme oranı: tam {tam_oran:.1f}% -> bulanık {bulanik_oran:.1f}% "
+          f"(+{bulanik_oran - tam_oran:.1f} puan)")
+
+    print(f"{'varyant':>12} | {'ad':>7} | {'tam %':>6} | {'bulanık %':>9} | {'doğru ad %':>10}")
+    for tur in pd.unique(turler):
+        secim = turler == tur
+        eslesen = sonuc[secim] >= 0
+        dogru_oran = (sonuc[secim][eslesen] == dogru[secim][eslesen]).mean() * 100 if eslesen.any() else float("nan")
+        print(f"{tur:>12} | {secim.sum():>7,} | {(tam[secim] >= 0).mean() * 100:6.1f} | "
+              f"{eslesen.mean() * 100:9.1f} | {dogru_oran:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
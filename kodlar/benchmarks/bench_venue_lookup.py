@@ -0,0 +1,119 @@
+"""venue_analyzer mekan eşleştirmesi: satır başına dict/.iloc döngüsü vs. kategorik kod hash join
+
+Sentetik ana/ikincil kataloglar ve --aktivite kadar aktiviteyle (varsayılan 10M) eski
+eşleştirme adımı ile resolve_activity_venues karşılaştırılır; venue_type, total_weight ve
+match_source kolonlarının aynı olduğu doğrulanır.
+
+Kullanım (kodlar/ klasöründen):
+    python benchmarks/bench_venue_lookup.py --aktivite 10000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from venue_analyzer import (build_venue_catalog, get_spending_bonus_vectorized,
+                            get_venue_type_and_quality_from_segment_vectorized, resolve_activity_venues)
+
+SEGMENTLER = ['H0', 'H1', 'H2', 'R1-A', 'R2-B', 'R3-C', 'D1-A', 'D2-B', 'D3-C', 'X9', None]
+HARCAMALAR = ['0-499 TL', '500-999 TL', '1.000-1.999 TL', '2000+ TL', '', None]
+
+
+def sentetik_kataloglar(n_ana, n_ikincil, seed=7):
+    rng = np.random.default_rng(seed)
+    main_lookup = {
+        f"ana mekan {i}": {'segment': SEGMENTLER[rng.integers(len(SEGMENTLER))],
+                           'spending': HARCAMALAR[rng.integers(len(HARCAMALAR))]}
+        for i in range(n_ana)
+    }
+    # İkincil adların bir kısmı ana katalogla çakışır (ana eşleşme geçersizse ikincil kullanılır)
+    secondary_lookup = {}
+    for i in range(n_ikincil):
+        name = f"ana mekan {i}" if i % 5 == 0 else f"ikincil mekan {i}"
+        venue_type = 'kahve' if i % 2 else 'veteriner'
+        secondary_lookup[name] = {'type': venue_type, 'weight': 1.0 if venue_type == 'kahve' else 4.5}
+    return main_lookup, secondary_lookup
+
+
+def sentetik_aktiviteler(n, n_ana, n_ikincil, seed=8):
+    rng = np.random.default_rng(seed)
+    adlar = np.array([f"Ana Mekan {i}" for i in range(n_ana)]
+                     + [f" ikincil mekan {i} " for i in range(n_ikincil)]
+                     + [f"Bilinmeyen {i}" for i in range(n_ana // 2)], dtype=object)
+    return pd.DataFrame({
+        'device_aid': np.char.add("cihaz-", rng.integers(0, n // 20 + 1, n).astype(str)).astype(object),
+        'gidilen_mekan': adlar[rng.integers(0, len(adlar), n)],
+    })
+
+
+def eski_eslestirme(activities_df, main_venue_lookup, secondary_venue_lookup):
+    """Eski process_activities_vectorized'in eşleştirme kısmı (cihaz toplama hariç)"""
+    activities_clean = activities_df[['device_aid', 'gidilen_mekan']].copy().dropna()
+    activities_clean['mekan_processed'] = activities_clean['gidilen_mekan'].astype(str).str.lower().str.strip()
+    n_activities = len(activities_clean)
+    venue_type = np.full(n_activities, None, dtype=object)
+    total_weight = np.zeros(n_activities)
+    match_source = np.full(n_activities, "Eşleşme Yok", dtype=object)
+
+    segments_list, spending_list, main_match_indices = [], [], []
+    for idx, mekan_processed in enumerate(activities_clean['mekan_processed']):
+        if mekan_processed in main_venue_lookup:
+            venue_data = main_venue_lookup[mekan_processed]
+            segments_list.append(venue_data['segment'])
+            spending_list.append(venue_data['spending'])
+            main_match_indices.append(idx)
+        else:
+            segments_list.append('')
+            spending_list.append('')
+    if main_match_indices:
+        venue_types, _, base_weights = get_venue_type_and_quality_from_segment_vectorized(segments_list)
+        spending_bonuses = get_spending_bonus_vectorized(venue_types, spending_list)
+        for idx in [i for i in main_match_indices if venue_types[i] is not None]:
+            venue_type[idx] = venue_types[idx]
+            total_weight[idx] = base_weights[idx] + spending_bonuses[idx]
+            match_source[idx] = "Ana Mekan"
+
+    for idx in np.where(total_weight == 0)[0]:
+        mekan_processed = activities_clean.iloc[idx]['mekan_processed']
+        if mekan_processed in secondary_venue_lookup:
+            venue_data = secondary_venue_lookup[mekan_processed]
+            venue_type[idx] = venue_data['type'].capitalize()
+            total_weight[idx] = venue_data['weight']
+            match_source[idx] = "İkincil Mekan"
+    return pd.DataFrame({'venue_type': venue_type, 'total_weight': total_weight, 'match_source': match_source})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--aktivite", type=float, default=1e7)
+    parser.add_argument("--ana", type=int, default=20_000)
+    parser.add_argument("--ikincil", type=int, default=10_000)
+    args = parser.parse_args()
+
+    n = int(args.aktivite)
+    main_lookup, secondary_lookup = sentetik_kataloglar(args.ana, args.ikincil)
+    aktiviteler = sentetik_aktiviteler(n, args.ana, args.ikincil)
+    print(f"{n:,} aktivite, {len(main_lookup):,} ana / {len(secondary_lookup):,} ikincil mekan")
+
+    start = time.perf_counter()
+    catalog = build_venue_catalog(main_lookup, secondary_lookup)
+    yeni = resolve_activity_venues(aktiviteler, catalog)
+    yeni_sure = time.perf_counter() - start
+    print(f"katalog + hash join : {yeni_sure:8.1f} sn ({len(catalog):,} katalog satırı)")
+
+    start = time.perf_counter()
+    eski = eski_eslestirme(aktiviteler, main_lookup, secondary_lookup)
+    eski_sure = time.perf_counter() - start
+    print(f"eski döngüler       : {eski_sure:8.1f} sn")
+
+    ayni = all(eski[c].astype(str).equals(yeni[c].astype(str)) for c in ['venue_type', 'total_weight', 'match_source'])
+    print(f"Sonuçlar aynı: {ayni}, eşleşen aktivite: {(yeni['total_weight'] > 0).sum():,}")
+    print(f"Hızlanma: {eski_sure / yeni_sure:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+# Sabit hash anahtarı: farklı dosya/işçilerde üretilen sketch'ler birleştirilebilir kalır
+HASH_KEY = "mostra-hll-key01"
+
+
+def hash_values(values):
+    """Değerleri deterministik 64-bit hash'e çevirir (object/string dizileri için)"""
+    return pd.util.hash_array(np.asarray(values, dtype=object), hash_key=HASH_KEY, categorize=False)
+
+
+def _bit_length(x):
+    """uint64 dizisindeki her değerin bit uzunluğu (vektörize)"""
+    x = x.copy()
+    n = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = x >= np.uint64(1 << shift)
+        n[mask] += shift
+        x[mask] >>= np.uint64(shift)
+    return n + (x > 0)
+
+
+def _register_updates(hashes, p):
+    """Hash'lerden (register indeksi, rank) çiftlerini hesaplar"""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    idx = (hashes >> np.uint64(64 - p)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - p)) - 1)
+    rank = (64 - p) - _bit_length(rest) + 1
+    return idx, rank.astype(np.uint8)
+
+
+def _estimate(registers):
+    """HyperLogLog kardinalite tahmini (küçük aralıkta linear counting düzeltmesi ile)"""
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=1)
+    zeros = np.sum(registers == 0, axis=1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+class HyperLogLog:
+    """Sabit bellekli, birleştirilebilir yaklaşık tekil sayacı (2^p register)"""
+
+    def __init__(self, p=14, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8) if registers is None else registers
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(self.m)
+
+    def update_hashes(self, hashes):
+        idx, rank = _register_updates(hashes, self.p)
+        np.maximum.at(self.registers, idx, rank)
+
+    def update(self, values):
+        self.update_hashes(hash_values(values))
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Farklı hassasiyetteki sketch'ler birleştirilemez")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        return float(_estimate(self.registers)[0])
+
+
+class GroupedHyperLogLog:
+    """Tamsayı anahtar başına ayrı HyperLogLog tutar (gün, saat, hücre kırılımları için)"""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.sketches = {}
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(self.m)
+
+    def update_hashes(self, keys, hashes):
+        """keys ve hashes aynı uzunlukta; her satır kendi anahtarının sketch'ine eklenir"""
+        if len(keys) == 0:
+            return
+        uniq_keys, inverse = np.unique(keys, return_inverse=True)
+        idx, rank = _register_updates(hashes, self.p)
+
+        # Batch içindeki anahtarlar için yerel register matrisi, sonra sözlüğe aktarılır
+        local = np.zeros((len(uniq_keys), self.m), dtype=np.uint8)
+        np.maximum.at(local, (inverse, idx), rank)
+        for key, regs in zip(uniq_keys.tolist(), local):
+            mevcut = self.sketches.get(key)
+            if mevcut is None:
+                self.sketches[key] = regs.copy()
+            else:
+                np.maximum(mevcut, regs, out=mevcut)
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Farklı hassasiyetteki sketch'ler birleştirilemez")
+        for key, regs in other.sketches.items():
+            mevcut = self.sketches.get(key)
+            if mevcut is None:
+                self.sketches[key] = regs.copy()
+            else:
+                np.maximum(mevcut, regs, out=mevcut)
+        return self
+
+    def counts(self):
+        """Anahtara göre sıralı tahmin tablosu"""
+        keys = sorted(self.sketches)
+        if not keys:
+            return pd.Series(dtype=float)
+        estimates = _estimate(np.stack([self.sketches[k] for k in keys]))
+        return pd.Series(estimates, index=keys)
+
+    def to_arrays(self):
+        keys = sorted(self.sketches)
+        regs = np.stack([self.sketches[k] for k in keys]) if keys else np.zeros((0, self.m), dtype=np.uint8)
+        return np.array(keys, dtype=np.int64), regs
+
+    @classmethod
+    def from_arrays(cls, p, keys, registers):
+        sketch = cls(p)
+        sketch.sketches = {k: r.copy() for k, r in zip(keys.tolist(), registers)}
+        return sketch
+
+
+def save_sketches(path, total, groups, meta=None):
+    """Toplam ve kırılım sketch'lerini tek .npz dosyasına yazar.
+
+    meta: sketch'lerin üretildiği sayısal ayarlar (örn. hücre boyutu); birleştirmede karşılaştırılır.
+    """
+    arrays = {"total_p": np.array(total.p), "total_registers": total.registers}
+    for name, sketch in groups.items():
+        keys, regs = sketch.to_arrays()
+        arrays[f"{name}_p"] = np.array(sketch.p)
+        arrays[f"{name}_keys"] = keys
+        arrays[f"{name}_registers"] = regs
+    for key, value in (meta or {}).items():
+        arrays[f"meta_{key}"] = np.array(value)
+    np.savez_compressed(path, **arrays)
+
+
+def load_sketches(path, group_names):
+    """(toplam, kırılımlar, meta); ayar kaydı olmayan eski dosyalarda meta boştur"""
+    with np.load(path) as data:
+        total = HyperLogLog(int(data["total_p"]), data["total_registers"].copy())
+        groups = {
+            name: GroupedHyperLogLog.from_arrays(int(data[f"{name}_p"]), data[f"{name}_keys"],
+                                                 data[f"{name}_registers"])
+            for name in group_names
+        }
+        meta = {key[len("meta_"):]: data[key].item() for key in data.files if key.startswith("meta_")}
+    return total, groups, meta
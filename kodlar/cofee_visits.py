@@ -1,59 +1,173 @@
 import pandas as pd
 import numpy as np
 import glob
-from sklearn.neighbors import BallTree
+import argparse
+import resource
+import time
 from tqdm import tqdm
 
-# 1. 📥 Cihaz CSV dosyalarını oku ve birleştir
+from device_store import is_store, iter_buckets, read_store
+from spatial_join import ENGINES, build_index
+from staypoints import detect_stay_points
+
+# Dosya yolları
+device_store_path = "../device_store"
 device_csv_folder = "../devices/*.csv"
-all_files = glob.glob(device_csv_folder)
+coffee_file = "../kahveci2.csv"  # Kolonlar: name, latitude, longitude
+output_file = "coffee_visits_balltree.csv"
 
-df_list = []
-for file in tqdm(all_files, desc="Cihaz verileri yükleniyor"):
-    df = pd.read_csv(file)
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', utc=True).dt.tz_convert('Etc/GMT-3')
-    df_list.append(df)
+# 0.1km (100 metre) yarıçap içindeki kahveciler ziyaret sayılır
+RADIUS_KM = 0.1
+PING_COLS = ['device_aid', 'latitude', 'longitude']
+STAY_PING_COLS = PING_COLS + ['timestamp']
 
-mobility_df = pd.concat(df_list, ignore_index=True)
+# Kalış noktası eşikleri: ardışık ping'ler arası en fazla 50 m ve 15 dk
+STAY_DISTANCE_M = 50
+STAY_GAP_S = 15 * 60
 
-# 2. 📍 Kahve zinciri verisini oku
-coffee_df = pd.read_csv("../kahveci2.csv")  # Kolonlar: name, lat, lng
 
-# 3. 🧭 BallTree ile yakın kahveci kontrolü
-# BallTree 0.1km (100 metre) içinde olan kahvecileri bulur
-RADIUS_KM = 0.1
-EARTH_RADIUS_KM = 6371.0
+def load_coffee_index(path=coffee_file, engine="balltree"):
+    """Kahve zinciri verisini okur ve seçilen motorla (BallTree / grid / kdtree) yarıçap indeksi kurar"""
+    coffee_df = pd.read_csv(path)
+    index = build_index(coffee_df['latitude'].values, coffee_df['longitude'].values,
+                        RADIUS_KM * 1000, engine=engine)
+    return coffee_df, index
+
+
+def load_mobility_df(store_path=device_store_path, csv_pattern=device_csv_folder):
+    """Tüm ping'leri tek DataFrame'e yükler (eski toplu mod)"""
+    if is_store(store_path):
+        mobility_df = read_store(store_path)
+        mobility_df['timestamp'] = pd.to_datetime(mobility_df['timestamp'], unit='s', utc=True).dt.tz_convert('Etc/GMT-3')
+        return mobility_df
+
+    df_list = []
+    for file in tqdm(glob.glob(csv_pattern), desc="Cihaz verileri yükleniyor"):
+        df = pd.read_csv(file)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s', utc=True).dt.tz_convert('Etc/GMT-3')
+        df_list.append(df)
+    return pd.concat(df_list, ignore_index=True)
+
+
+def iter_ping_chunks(chunk_size, store_path=device_store_path, csv_pattern=device_csv_folder,
+                     columns=PING_COLS, whole_devices=False):
+    """Ping'leri sadece gerekli kolonlarla, yaklaşık chunk_size satırlık parçalar halinde döndürür.
+
+    whole_devices=True iken bir cihazın ping'leri asla iki parçaya bölünmez (kalış tespiti için).
+    """
+    if is_store(store_path):
+        for _, bucket_df in iter_buckets(store_path, columns=columns):
+            # Bir cihazın tüm ping'leri aynı bucket'tadır; bucket bölünmeden verilir
+            if whole_devices:
+                yield bucket_df
+                continue
+            for start in range(0, len(bucket_df), chunk_size):
+                yield bucket_df.iloc[start:start + chunk_size]
+        return
+
+    # Küçük cihaz CSV'leri chunk_size dolana kadar biriktirilir
+    buffer, buffered = [], 0
+    for file in tqdm(glob.glob(csv_pattern), desc="Cihaz verileri işleniyor"):
+        readers = [pd.read_csv(file, usecols=columns)] if whole_devices else \
+            pd.read_csv(file, usecols=columns, chunksize=chunk_size)
+        for df in readers:
+            buffer.append(df)
+            buffered += len(df)
+            if buffered >= chunk_size:
+                yield pd.concat(buffer, ignore_index=True)
+                buffer, buffered = [], 0
+    if buffer:
+        yield pd.concat(buffer, ignore_index=True)
+
+
+def coffee_visits_batch(coffee_df, index, mobility_df):
+    """Eski mod: tüm ping'ler bellekte, her ping için ilk bulunan kahveci adı yazılır"""
+    # c. Yakın kahvecileri bul: düz (ping, kahveci) çiftleri, ping sırasıyla
+    ping_idx, cafe_idx, _ = index.query(mobility_df['latitude'].values, mobility_df['longitude'].values)
 
-# a. Kahveci koordinatlarını radyana çevir
-coffee_coords = np.radians(coffee_df[['latitude', 'longitude']].values)
-tree = BallTree(coffee_coords, metric='haversine')
+    # d. Eşleşmeleri tabloya yaz: her ping'in ilk kahvecisi düz dizi indeksleme ile alınır
+    matches = np.full(len(mobility_df), None, dtype=object)
+    matched_pings, first_pos = np.unique(ping_idx, return_index=True)
+    matches[matched_pings] = coffee_df['name'].values[cafe_idx[first_pos]]
 
-# b. Cihaz koordinatlarını radyana çevir
-user_coords = np.radians(mobility_df[['latitude', 'longitude']].values)
+    mobility_df['near_coffee'] = matches
 
-# c. Yakın kahvecileri bul (BallTree sorgusu)
-indices = tree.query_radius(user_coords, r=RADIUS_KM / EARTH_RADIUS_KM)
+    # 4. 📊 Kahveci ziyaret sayısı hesapla (kalış girdisinde toplam kalış süresi de eklenir)
+    visits = mobility_df.dropna(subset=['near_coffee']).groupby('device_aid')
+    coffee_visits = visits['near_coffee'].count().rename('coffee_visit_count').reset_index()
+    if 'dwell_s' in mobility_df.columns:
+        coffee_visits['coffee_dwell_s'] = visits['dwell_s'].sum().values
+    return coffee_visits
 
-# d. Eşleşmeleri tabloya yaz
-matches = []
-for idx, cafe_indices in enumerate(indices):
-    if len(cafe_indices) > 0:
-        matched_names = [coffee_df.iloc[i]['name'] for i in cafe_indices]
-        matches.append(matched_names[0])  # İlkini alıyoruz
+
+def coffee_visits_stream(index, chunks):
+    """Akış modu: ping'ler parça parça sorgulanır, sadece cihaz başına sayaçlar tutulur"""
+    counts, dwell = {}, {}
+    for chunk in chunks:
+        chunk = chunk.dropna(subset=['latitude', 'longitude'])
+        if chunk.empty:
+            continue
+        near = index.hits(chunk['latitude'].values, chunk['longitude'].values)
+        if not near.any():
+            continue
+        for device_id, n in pd.Series(chunk['device_aid'].values[near]).value_counts().items():
+            counts[device_id] = counts.get(device_id, 0) + n
+        if 'dwell_s' in chunk.columns:
+            near_dwell = chunk.loc[near].groupby('device_aid')['dwell_s'].sum()
+            for device_id, seconds in near_dwell.items():
+                dwell[device_id] = dwell.get(device_id, 0) + seconds
+
+    coffee_visits = pd.DataFrame({
+        'device_aid': list(counts.keys()),
+        'coffee_visit_count': np.fromiter(counts.values(), dtype=np.int64, count=len(counts)),
+    })
+    if dwell:
+        coffee_visits['coffee_dwell_s'] = coffee_visits['device_aid'].map(dwell).astype(np.int64)
+    return coffee_visits.sort_values('device_aid').reset_index(drop=True)
+
+
+def peak_rss_mb():
+    """Sürecin tepe bellek kullanımı (Linux'ta ru_maxrss KB cinsindendir)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cihaz bazında kahveci ziyaret sayıları")
+    parser.add_argument("--mod", choices=["stream", "batch"], default="stream",
+                        help="stream: sınırlı bellekli akış, batch: tüm ping'ler bellekte (eski yöntem)")
+    parser.add_argument("--motor", choices=ENGINES, default="balltree",
+                        help="Yarıçap sorgu motoru: haversine BallTree, metrik grid-hash veya izdüşümlü cKDTree")
+    parser.add_argument("--chunk", type=int, default=1_000_000, help="stream: parça başına ping sayısı")
+    parser.add_argument("--kalis", action="store_true",
+                        help="Ping yerine kalış noktaları eşleştirilir (ziyaret = kalış, süre de yazılır)")
+    parser.add_argument("--magaza", default=device_store_path, help="Cihaz parquet mağazası")
+    parser.add_argument("--csv", default=device_csv_folder, help="Mağaza yoksa cihaz CSV deseni")
+    parser.add_argument("--kahveciler", default=coffee_file)
+    parser.add_argument("--cikti", default=output_file)
+    args = parser.parse_args()
+
+    start_time = time.time()
+
+    # 2. 📍 Kahve zinciri verisini oku ve 3. 🧭 yarıçap indeksini kur
+    coffee_df, index = load_coffee_index(args.kahveciler, args.motor)
+
+    if args.mod == "batch":
+        mobility_df = load_mobility_df(args.magaza, args.csv)
+        if args.kalis:
+            mobility_df = detect_stay_points(mobility_df, STAY_DISTANCE_M, STAY_GAP_S)
+        coffee_visits = coffee_visits_batch(coffee_df, index, mobility_df)
+    elif args.kalis:
+        chunks = iter_ping_chunks(args.chunk, args.magaza, args.csv, columns=STAY_PING_COLS, whole_devices=True)
+        coffee_visits = coffee_visits_stream(
+            index, (detect_stay_points(chunk, STAY_DISTANCE_M, STAY_GAP_S) for chunk in chunks))
     else:
-        matches.append(None)
-
-mobility_df['near_coffee'] = matches
-
-# 4. 📊 Kahveci ziyaret sayısı hesapla
-coffee_visits = (
-    mobility_df.dropna(subset=['near_coffee'])
-    .groupby('device_aid')['near_coffee']
-    .count()
-    .reset_index()
-    .rename(columns={'near_coffee': 'coffee_visit_count'})
-)
-
-# 5. 💾 Sonucu CSV olarak kaydet
-coffee_visits.to_csv("coffee_visits_balltree.csv", index=False)
-print("Ziyaret analizi tamamlandı: coffee_visits_balltree.csv")
+        coffee_visits = coffee_visits_stream(index, iter_ping_chunks(args.chunk, args.magaza, args.csv))
+
+    # 5. 💾 Sonucu CSV olarak kaydet
+    coffee_visits.to_csv(args.cikti, index=False)
+    print(f"Ziyaret analizi tamamlandı: {args.cikti}")
+    print(f"Mod: {args.mod} ({args.motor}{', kalış' if args.kalis else ''}), süre: {time.time() - start_time:.1f} sn, tepe bellek (RSS): {peak_rss_mb():,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
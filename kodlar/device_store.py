@@ -0,0 +1,221 @@
+import glob
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DEVICE_COL = "device_aid"
+TIME_COL = "timestamp"
+STORE_META = "_store.json"
+
+
+def device_buckets(device_ids, n_buckets):
+    """device_aid değerlerini deterministik olarak bucket numarasına eşler"""
+    hashes = pd.util.hash_array(np.asarray(device_ids, dtype=object), categorize=False)
+    return (hashes % np.uint64(n_buckets)).astype(np.int32)
+
+
+def is_store(path):
+    return os.path.isfile(os.path.join(path, STORE_META))
+
+
+def load_store_meta(root):
+    with open(os.path.join(root, STORE_META), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def bucket_dir(root, bucket):
+    return os.path.join(root, f"bucket={bucket:04d}")
+
+
+def _sort_by_device(table):
+    keys = [(DEVICE_COL, "ascending")]
+    if TIME_COL in table.column_names:
+        keys.append((TIME_COL, "ascending"))
+    return table.sort_by(keys)
+
+
+class DeviceStoreWriter:
+    """Filtrelenmiş batch'leri hash-bucket'lı, cihaz sıralı parquet veri setine akıtır.
+
+    Bellekte en fazla ``flush_rows`` satır tutulur; eşik aşılınca en büyük bucket'lar
+    sıralanıp ayrı part dosyası olarak yazılır. ``close(compact=True)`` her bucket'ı
+    tek, tamamen sıralı dosyada birleştirir (bir seferde tek bucket okunur).
+
+    Varsayılan olarak mağaza baştan yazılır: veri ``root`` yanındaki geçici klasöre yazılır ve
+    ``close()`` eski mağazanın yerine taşınır; yarıda kalan çalıştırma eski mağazayı bozmaz.
+    ``append=True`` mevcut mağazaya yeni part'lar ekler (aynı veri iki kez eklenirse satırlar
+    çoğalır). Mağaza olmayan dolu bir klasörün üzerine yazılmaz.
+    """
+
+    def __init__(self, root, n_buckets=64, flush_rows=5_000_000, row_group_size=65_536, append=False):
+        if os.path.isdir(root) and os.listdir(root) and not is_store(root):
+            raise ValueError(f"{root} mağaza değil ve boş değil; üzerine yazılmaz")
+        self.path = root
+        self.append = append
+        self.row_group_size = row_group_size
+        self.flush_rows = flush_rows
+        if append and is_store(root):
+            n_buckets = load_store_meta(root)["n_buckets"]
+        self.n_buckets = n_buckets
+        self.run_id = time.strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        if append:
+            self.root = root
+        else:
+            # '.' ile başlayan kardeş klasör: mağaza okuyucuları ve glob'lar tarafından görülmez
+            parent, name = os.path.split(os.path.abspath(root))
+            self.root = os.path.join(parent, f".{name}.tmp-{self.run_id}")
+        self._buffers = {}
+        self._buffered_rows = {}
+        self._total_buffered = 0
+        self._part_seq = 0
+        self._part_paths = []
+        self.rows_written = 0
+        os.makedirs(self.root, exist_ok=True)
+        self._write_meta()
+
+    def _write_meta(self):
+        with open(os.path.join(self.root, STORE_META), "w", encoding="utf-8") as f:
+            json.dump({"n_buckets": self.n_buckets, "device_col": DEVICE_COL}, f)
+
+    def write(self, data):
+        """pa.Table, RecordBatch veya DataFrame kabul eder"""
+        if isinstance(data, pd.DataFrame):
+            data = pa.Table.from_pandas(data, preserve_index=False)
+        elif isinstance(data, pa.RecordBatch):
+            data = pa.Table.from_batches([data])
+        if data.num_rows == 0:
+            return
+
+        buckets = device_buckets(data.column(DEVICE_COL).to_numpy(zero_copy_only=False), self.n_buckets)
+        order = np.argsort(buckets, kind="stable")
+        sorted_buckets = buckets[order]
+        data = data.take(pa.array(order))
+        starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+        ends = np.r_[starts[1:], len(sorted_buckets)]
+
+        for start, end in zip(starts, ends):
+            bucket = int(sorted_buckets[start])
+            self._buffers.setdefault(bucket, []).append(data.slice(start, end - start))
+            self._buffered_rows[bucket] = self._buffered_rows.get(bucket, 0) + int(end - start)
+        self._total_buffered += data.num_rows
+
+        if self._total_buffered > self.flush_rows:
+            # En büyük bucket'lar yazılarak bellek eşiğin yarısına indirilir
+            for bucket in sorted(self._buffered_rows, key=self._buffered_rows.get, reverse=True):
+                if self._total_buffered <= self.flush_rows // 2:
+                    break
+                self._flush_bucket(bucket)
+
+    def _flush_bucket(self, bucket):
+        parts = self._buffers.pop(bucket, None)
+        if not parts:
+            return
+        n_rows = self._buffered_rows.pop(bucket)
+        self._total_buffered -= n_rows
+
+        table = _sort_by_device(pa.concat_tables(parts))
+        out_dir = bucket_dir(self.root, bucket)
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, f"part-{self.run_id}-{self._part_seq:05d}.parquet")
+        self._part_seq += 1
+        pq.write_table(table, path, row_group_size=self.row_group_size)
+        self._part_paths.append(path)
+        self.rows_written += n_rows
+
+    def _compact_bucket(self, bucket):
+        files = sorted(glob.glob(os.path.join(bucket_dir(self.root, bucket), "part-*.parquet")))
+        if len(files) <= 1:
+            return
+        table = _sort_by_device(pa.concat_tables([pq.read_table(f) for f in files]))
+        name = f"part-{self.run_id}-compact.parquet"
+        path = os.path.join(bucket_dir(self.root, bucket), name)
+        # '.' ile başlayan geçici dosya okuyucular tarafından yok sayılır
+        tmp_path = os.path.join(bucket_dir(self.root, bucket), f".{name}.tmp")
+        pq.write_table(table, tmp_path, row_group_size=self.row_group_size)
+        os.replace(tmp_path, path)
+        for f in files:
+            os.remove(f)
+
+    def close(self, compact=True):
+        for bucket in list(self._buffers):
+            self._flush_bucket(bucket)
+        if compact:
+            for bucket in range(self.n_buckets):
+                self._compact_bucket(bucket)
+        if not self.append:
+            self._swap_into_place()
+        return self.rows_written
+
+    def _swap_into_place(self):
+        """Geçici klasörü mağaza yoluna taşır; eski mağaza ancak yenisi yerine geçtikten sonra silinir"""
+        old_path = None
+        if os.path.exists(self.path):
+            parent, name = os.path.split(os.path.abspath(self.path))
+            old_path = os.path.join(parent, f".{name}.old-{self.run_id}")
+            os.replace(self.path, old_path)
+        os.replace(self.root, self.path)
+        self.root = self.path
+        if old_path is not None:
+            shutil.rmtree(old_path)
+
+    def abort(self):
+        """Yarıda kalan yazmayı bırakır: baştan yazma modunda geçici klasör, ekleme modunda bu
+        çalıştırmanın part'ları silinir; mağaza değişmez"""
+        self._buffers.clear()
+        self._buffered_rows.clear()
+        self._total_buffered = 0
+        if not self.append:
+            shutil.rmtree(self.root, ignore_errors=True)
+            return
+        for path in self._part_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def read_bucket(root, bucket, columns=None):
+    """Tek bir bucket'ı DataFrame olarak okur"""
+    path = bucket_dir(root, bucket)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=columns or [])
+    return ds.dataset(path, format="parquet").to_table(columns=columns).to_pandas()
+
+
+def store_bucket_ids(root):
+    """Mağazada verisi olan bucket numaraları"""
+    n_buckets = load_store_meta(root)["n_buckets"]
+    return [b for b in range(n_buckets) if os.path.isdir(bucket_dir(root, b))]
+
+
+def iter_buckets(root, columns=None):
+    """Mağazadaki dolu bucket'ları sırayla (bucket_no, DataFrame) olarak döndürür"""
+    for bucket in store_bucket_ids(root):
+        df = read_bucket(root, bucket, columns)
+        if len(df) > 0:
+            yield bucket, df
+
+
+def read_device(root, device_id, columns=None):
+    """Tek cihazın tüm kayıtlarını sadece ilgili bucket'ı tarayarak okur"""
+    n_buckets = load_store_meta(root)["n_buckets"]
+    bucket = int(device_buckets([device_id], n_buckets)[0])
+    path = bucket_dir(root, bucket)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=columns or [])
+    # Dosyalar cihaza göre sıralı olduğundan row group istatistikleri çoğu row group'u eler
+    table = ds.dataset(path, format="parquet").to_table(
+        columns=columns, filter=pc.field(DEVICE_COL) == device_id)
+    return table.to_pandas()
+
+
+def read_store(root, columns=None):
+    """Tüm mağazayı tek DataFrame olarak okur"""
+    return ds.dataset(root, format="parquet").to_table(columns=columns).to_pandas()
@@ -1,70 +1,158 @@
+import argparse
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.dataset as ds
 import pandas as pd
-import os
-from collections import defaultdict
+
+from device_store import DeviceStoreWriter
+from trajectory_index import build_index
 
 # Dosya yolları
 parquet_filepath = "MobilityDataMay2024.paraquet"
-device_ids_file = 'unique_device_ids.csv'
-
-# İstenen device_id'leri oku
-target_device_ids = set(pd.read_csv(device_ids_file)["device_aid"].dropna().unique())
-print(f"Toplam hedef device_id sayısı: {len(target_device_ids)}")
-
-# Dataset'i oluştur
-dataset = ds.dataset(parquet_filepath, format="parquet")
-scanner = dataset.scanner(batch_size=1_000_000)  # Batch size'ı artırdık
-
-# Her device_id için veri toplama
-device_data = defaultdict(list)
-processed_rows = 0
-found_device_count = 0
-
-print("Veri işleniyor...")
-
-# Tek seferde tüm veriyi oku ve gruplandır
-for batch_num, record_batch in enumerate(scanner.to_batches()):
-    df_chunk = record_batch.to_pandas()
-    processed_rows += len(df_chunk)
-    
-    # Sadece hedef device_id'leri filtrele
-    filtered_chunk = df_chunk[df_chunk["device_aid"].isin(target_device_ids)]
-    
-    if not filtered_chunk.empty:
-        # Device_id'lere göre gruplandır
-        for device_id, group in filtered_chunk.groupby("device_aid"):
-            device_data[device_id].append(group)
-    
-    # İlerleme raporu
-    if batch_num % 10 == 0:
-        print(f"İşlenen batch: {batch_num + 1}, İşlenen satır: {processed_rows:,}")
-
-print(f"Toplam işlenen satır: {processed_rows:,}")
-print(f"Veri bulunan device_id sayısı: {len(device_data)}")
-
-# Her device_id için dosya oluştur
-print("CSV dosyaları oluşturuluyor...")
-saved_count = 0
-
-for device_id, data_chunks in device_data.items():
-    if data_chunks:
-        # Tüm chunk'ları birleştir
-        result_df = pd.concat(data_chunks, ignore_index=True)
-        
-        # CSV olarak kaydet
-        filename = f"{device_id}_data.csv"
-        result_df.to_csv(filename, index=False)
-        
-        saved_count += 1
-        print(f"Kaydedildi: {filename} ({len(result_df)} satır)")
-
-print(f"\nToplam {saved_count} dosya oluşturuldu.")
-
-# Veri bulunamayan device_id'leri göster
-missing_devices = target_device_ids - set(device_data.keys())
-if missing_devices:
-    print(f"\nVeri bulunamayan {len(missing_devices)} device_id:")
-    for device_id in list(missing_devices)[:10]:  # İlk 10'unu göster
-        print(f"  - {device_id}")
-    if len(missing_devices) > 10:
-        print(f"  ... ve {len(missing_devices) - 10} tane daha")
\ No newline at end of file
+device_ids_file = 'unique_device_ids.parquet'
+store_path = "device_store"
+
+
+def load_target_device_ids(path):
+    """İstenen device_id'leri oku (getunique_ids.py parquet veya eski CSV çıktısı)"""
+    if path.endswith('.parquet'):
+        return set(pd.read_parquet(path, columns=["device_aid"])["device_aid"].dropna().unique())
+    return set(pd.read_csv(path)["device_aid"].dropna().unique())
+
+
+def _row_group_may_contain(statistics, sorted_targets):
+    """Row group min/max istatistiği hedeflerden en az birini kapsayabiliyor mu"""
+    stats = (statistics or {}).get("device_aid")
+    if not stats or stats.get("min") is None or stats.get("max") is None:
+        return True
+    pos = np.searchsorted(sorted_targets, stats["min"], side="left")
+    return pos < len(sorted_targets) and sorted_targets[pos] <= stats["max"]
+
+
+def scan_target_devices(parquet_path, target_device_ids, batch_size=1_000_000, columns=None, report=None):
+    """Hedef cihaz filtresini Arrow tarayıcısına iterek sadece eşleşen satırları döndürür.
+
+    device_aid min/max istatistikleri hiçbir hedefi kapsamayan row group'lar hiç okunmaz.
+    pyarrow parquet bloom filtrelerini okumadığından eleme sadece istatistiklerle yapılır.
+    ``report`` sözlüğü verilirse okunan byte ve tutulan satır sayıları tarama boyunca içine yazılır.
+    """
+    dataset = ds.dataset(parquet_path, format="parquet")
+    columns = columns or dataset.schema.names
+    sorted_targets = np.array(sorted(target_device_ids), dtype=object)
+    filtre = pc.field("device_aid").isin(pa.array(sorted_targets, type=pa.string()))
+
+    stats = report if report is not None else {}
+    stats.update({"row_groups": 0, "row_groups_read": 0, "rows_total": 0, "rows_scanned": 0,
+                  "rows_kept": 0, "bytes_total": 0, "bytes_read": 0})
+    kept_fragments = []
+    for fragment in dataset.get_fragments():
+        metadata = fragment.metadata
+        col_names = metadata.schema.names
+        col_indices = [col_names.index(c) for c in columns if c in col_names]
+        for rg_fragment in fragment.split_by_row_group():
+            rg = rg_fragment.row_groups[0]
+            rg_meta = metadata.row_group(rg.id)
+            rg_bytes = sum(rg_meta.column(j).total_compressed_size for j in col_indices)
+            stats["row_groups"] += 1
+            stats["rows_total"] += rg.num_rows
+            stats["bytes_total"] += rg_bytes
+            if _row_group_may_contain(rg.statistics, sorted_targets):
+                kept_fragments.append(rg_fragment)
+                stats["row_groups_read"] += 1
+                stats["rows_scanned"] += rg.num_rows
+                stats["bytes_read"] += rg_bytes
+
+    if kept_fragments:
+        pruned = ds.FileSystemDataset(kept_fragments, dataset.schema, dataset.format,
+                                      filesystem=dataset.filesystem)
+        scanner = pruned.scanner(columns=columns, filter=filtre, batch_size=batch_size)
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                stats["rows_kept"] += batch.num_rows
+                yield batch
+
+
+def print_scan_report(report):
+    print("\n=== TARAMA RAPORU ===")
+    print(f"Okunan row group: {report['row_groups_read']:,}/{report['row_groups']:,}")
+    print(f"Okunan veri: {report['bytes_read'] / 1e6:,.1f} MB / {report['bytes_total'] / 1e6:,.1f} MB")
+    print(f"Taranan satır: {report['rows_scanned']:,}/{report['rows_total']:,}")
+    print(f"Tutulan satır: {report['rows_kept']:,}")
+
+
+def extract_device_locations(parquet_path, target_device_ids, output_store,
+                             n_buckets=64, flush_rows=5_000_000, compact=True, append=False):
+    """Hedef cihazların kayıtlarını tek geçişte bucket'lı parquet mağazasına akıtır.
+
+    append=False iken mağaza baştan yazılır (aynı çıktıyla tekrar çalıştırmak satırları
+    çoğaltmaz); append=True yeni veriyi mevcut mağazaya ekler.
+    """
+    writer = DeviceStoreWriter(output_store, n_buckets=n_buckets, flush_rows=flush_rows, append=append)
+    found_devices = set()
+    report = {}
+
+    print("Veri işleniyor...")
+
+    try:
+        # Filtre tarayıcıda uygulanır: eşleşmeyen satırlar Python'a hiç gelmez
+        for batch_num, record_batch in enumerate(scan_target_devices(parquet_path, target_device_ids,
+                                                                     batch_size=1_000_000, report=report)):
+            writer.write(record_batch)
+            found_devices.update(pc.unique(record_batch.column("device_aid")).to_pylist())
+
+            # İlerleme raporu
+            if batch_num % 10 == 0:
+                print(f"İşlenen batch: {batch_num + 1}, Tutulan satır: {report.get('rows_kept', 0):,}")
+
+        if compact:
+            print("Bucket dosyaları sıralanıp birleştiriliyor...")
+        rows_written = writer.close(compact=compact)
+    except BaseException:
+        writer.abort()
+        raise
+
+    print_scan_report(report)
+    print(f"Veri bulunan device_id sayısı: {len(found_devices)}")
+    print(f"Mağazaya yazılan satır: {rows_written:,} ({output_store}, {writer.n_buckets} bucket)")
+    return found_devices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hedef cihazların konum verilerini parquet mağazasına çıkarır")
+    parser.add_argument("--girdi", default=parquet_filepath, help="Mobility parquet dosyası veya klasörü")
+    parser.add_argument("--cihazlar", default=device_ids_file, help="Hedef device_aid listesi (parquet/csv)")
+    parser.add_argument("--cikti", default=store_path, help="Çıktı mağaza klasörü")
+    parser.add_argument("--bucket", type=int, default=64, help="Bucket sayısı (ekleme modunda mevcut mağazanınki kullanılır)")
+    parser.add_argument("--ekle", action="store_true",
+                        help="Mevcut mağazaya ekle (varsayılan: mağaza baştan yazılıp eskisinin yerine geçer)")
+    parser.add_argument("--bellek-satir", type=int, default=5_000_000,
+                        help="Diske yazmadan önce bellekte tutulacak en fazla satır")
+    parser.add_argument("--sikistirma-yok", action="store_true",
+                        help="Bucket'ları tek dosyada birleştirme (--ekle ile günlük ekleme için; indeks sadece yeni part'ları tarar)")
+    parser.add_argument("--indeks-yok", action="store_true", help="Trajektori indeksini güncelleme")
+    args = parser.parse_args()
+
+    target_device_ids = load_target_device_ids(args.cihazlar)
+    print(f"Toplam hedef device_id sayısı: {len(target_device_ids)}")
+
+    found_devices = extract_device_locations(args.girdi, target_device_ids, args.cikti,
+                                             n_buckets=args.bucket, flush_rows=args.bellek_satir,
+                                             compact=not args.sikistirma_yok, append=args.ekle)
+
+    if not args.indeks_yok:
+        build_index(args.cikti)
+
+    # Veri bulunamayan device_id'leri göster
+    missing_devices = target_device_ids - found_devices
+    if missing_devices:
+        print(f"\nVeri bulunamayan {len(missing_devices)} device_id:")
+        for device_id in list(missing_devices)[:10]:  # İlk 10'unu göster
+            print(f"  - {device_id}")
+        if len(missing_devices) > 10:
+            print(f"  ... ve {len(missing_devices) - 10} tane daha")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,253 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import numpy as np
 import pandas as pd
 
+from cardinality import GroupedHyperLogLog, HyperLogLog, hash_values, load_sketches, save_sketches
+
 parafilepath = "MobilityDataMay2024.paraquet"
-dataset = ds.dataset(parafilepath, format="parquet")
+DEVICE_COL = "device_aid"
+
+# Yaklaşık sayım (HyperLogLog) ayarları
+TZ_OFFSET_S = 3 * 3600      # Etc/GMT-3 (İstanbul)
+HLL_GROUPS = ["gun", "saat", "hucre"]
+HUCRE_DERECE = 0.05
+# Hücre anahtarında boylam indeksi 6 ondalık haneye sığmalı: |lng| / cell_deg < 500_000
+_LNG_OFFSET = 500_000
+MIN_HUCRE_DERECE = 180 / _LNG_OFFSET
+
+
+def unique_ids_pandas(parquet_path, output_path="unique_device_ids.csv"):
+    """Eski yöntem: tüm kolonları pandas'a çevirip Python set'inde toplar"""
+    dataset = ds.dataset(parquet_path, format="parquet")
+    scanner = dataset.scanner(batch_size=100_000)
+
+    unique_ids = set()
+
+    for record_batch in scanner.to_batches():
+        df_chunk = record_batch.to_pandas()
+        if DEVICE_COL in df_chunk.columns:
+            unique_ids.update(df_chunk[DEVICE_COL].dropna().unique())
+
+    unique_ids_list = sorted(unique_ids)
+    df_unique = pd.DataFrame(unique_ids_list, columns=[DEVICE_COL])
+
+    df_unique.to_csv(output_path, index=False)
+    print(f"CSV dosyası kaydedildi: {output_path}")
+    return len(df_unique)
+
+
+def _fragment_unique_ids(fragment, batch_size):
+    """Tek bir row group fragment'ındaki benzersiz device_aid değerleri (Arrow içinde)"""
+    parcalar = []
+    for batch in fragment.to_batches(columns=[DEVICE_COL], batch_size=batch_size):
+        kolon = pc.drop_null(batch.column(0))
+        if len(kolon) == 0:
+            continue
+        benzersiz = pc.unique(kolon)
+        # Dictionary kolonda unique sadece indeksleri tekilleştirir, string'lere sonra dönülür
+        if pa.types.is_dictionary(benzersiz.type):
+            benzersiz = benzersiz.dictionary_decode()
+        parcalar.append(benzersiz)
+
+    if not parcalar:
+        return pa.array([], type=pa.string())
+    return pc.unique(pa.chunked_array(parcalar))
+
+
+def unique_ids_arrow(parquet_path, output_path="unique_device_ids.parquet",
+                     workers=None, batch_size=1_000_000):
+    """Sadece device_aid kolonunu okuyarak row group'ları paralel tekilleştirir ve parquet yazar"""
+    # device_aid dictionary olarak okunur: her satır için string üretilmez
+    parquet_format = ds.ParquetFileFormat(
+        read_options=ds.ParquetReadOptions(dictionary_columns={DEVICE_COL})
+    )
+    dataset = ds.dataset(parquet_path, format=parquet_format)
+
+    if DEVICE_COL not in dataset.schema.names:
+        raise ValueError(f"'{DEVICE_COL}' kolonu bulunamadı: {parquet_path}")
+
+    # Tek büyük dosyada da paralellik için her row group ayrı iş olur
+    fragments = []
+    for fragment in dataset.get_fragments():
+        fragments.extend(fragment.split_by_row_group())
+
+    workers = workers or os.cpu_count() or 1
+    print(f"İşlenecek row group sayısı: {len(fragments)} ({workers} iş parçacığı)")
+
+    # Arrow hesaplamaları GIL'i bıraktığı için thread havuzu yeterli
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sonuclar = list(executor.map(lambda f: _fragment_unique_ids(f, batch_size), fragments))
+
+    tum_idler = pa.chunked_array(sonuclar, type=pa.string())
+    benzersiz = pc.unique(tum_idler)
+    benzersiz = benzersiz.take(pc.sort_indices(benzersiz))
+
+    tablo = pa.table({DEVICE_COL: benzersiz})
+    pq.write_table(tablo, output_path)
+    print(f"Parquet dosyası kaydedildi: {output_path} ({len(tablo):,} cihaz)")
+    return len(tablo)
+
+
+def _batch_hashes(kolon):
+    """device_aid kolonunun hash'leri; dictionary kolonda sadece sözlük hash'lenir"""
+    if pa.types.is_dictionary(kolon.type):
+        sozluk_hash = hash_values(kolon.dictionary.to_numpy(zero_copy_only=False))
+        indeksler = kolon.indices.to_numpy(zero_copy_only=False)
+        return sozluk_hash[indeksler]
+    return hash_values(kolon.to_numpy(zero_copy_only=False))
+
+
+def check_cell_deg(cell_deg):
+    """Hücre boyutu anahtar kodlamasına sığmıyorsa ValueError (küçük hücrelerde anahtarlar çakışır)"""
+    if not cell_deg > MIN_HUCRE_DERECE:
+        raise ValueError(f"Hücre boyutu {MIN_HUCRE_DERECE:.5f} dereceden büyük olmalı: {cell_deg}")
+
+
+def _cell_keys(lat, lng, cell_deg):
+    """Kaba lat/lng hücresini tek int64 anahtara kodlar (|lng| <= 180 ve check_cell_deg varsayılır)"""
+    lat_idx = np.floor(lat / cell_deg).astype(np.int64)
+    lng_idx = np.floor(lng / cell_deg).astype(np.int64)
+    return (lat_idx + 100_000) * 1_000_000 + (lng_idx + _LNG_OFFSET)
+
+
+def _decode_cell_keys(keys, cell_deg):
+    keys = np.asarray(keys, dtype=np.int64)
+    lat_idx = keys // 1_000_000 - 100_000
+    lng_idx = keys % 1_000_000 - _LNG_OFFSET
+    return lat_idx * cell_deg, lng_idx * cell_deg
+
+
+def approx_device_sketches(parquet_path, p_total=14, p_group=12, cell_deg=HUCRE_DERECE, batch_size=1_000_000):
+    """Parquet'i bir kez tarayıp toplam, günlük, saatlik ve hücre bazında HLL sketch'leri üretir"""
+    check_cell_deg(cell_deg)
+    parquet_format = ds.ParquetFileFormat(
+        read_options=ds.ParquetReadOptions(dictionary_columns={DEVICE_COL})
+    )
+    dataset = ds.dataset(parquet_path, format=parquet_format)
+    kolonlar = [DEVICE_COL, "timestamp", "latitude", "longitude"]
+    eksik = [k for k in kolonlar if k not in dataset.schema.names]
+    if eksik:
+        raise ValueError(f"Eksik kolonlar: {eksik}")
+
+    total = HyperLogLog(p_total)
+    groups = {name: GroupedHyperLogLog(p_group) for name in HLL_GROUPS}
+    islenen = 0
+
+    scanner = dataset.scanner(columns=kolonlar, filter=pc.field(DEVICE_COL).is_valid(),
+                              batch_size=batch_size)
+    for batch_num, batch in enumerate(scanner.to_batches()):
+        if batch.num_rows == 0:
+            continue
+        hashes = _batch_hashes(batch.column(0))
+        ts = batch.column(1).to_numpy(zero_copy_only=False).astype(np.int64) + TZ_OFFSET_S
+        lat = batch.column(2).to_numpy(zero_copy_only=False)
+        lng = batch.column(3).to_numpy(zero_copy_only=False)
+
+        total.update_hashes(hashes)
+        groups["gun"].update_hashes(ts // 86_400, hashes)
+        groups["saat"].update_hashes(ts // 3_600, hashes)
+        # Aralık dışı koordinatlar hücre anahtarında başka hücreye taşar
+        gecerli = (np.abs(lat) <= 90) & (np.abs(lng) <= 180)
+        groups["hucre"].update_hashes(_cell_keys(lat[gecerli], lng[gecerli], cell_deg), hashes[gecerli])
+
+        islenen += batch.num_rows
+        if batch_num % 10 == 0:
+            print(f"İşlenen batch: {batch_num + 1}, İşlenen satır: {islenen:,}")
+
+    return total, groups
+
+
+def merge_sketch_files(paths):
+    """.npz sketch dosyalarını birleştirir; dönüş (toplam, kırılımlar, meta).
+
+    Farklı ayarlarla (örn. hücre boyutu) üretilmiş dosyalar ValueError verir.
+    """
+    total, groups, meta = load_sketches(paths[0], HLL_GROUPS)
+    for path in paths[1:]:
+        diger_total, diger_groups, diger_meta = load_sketches(path, HLL_GROUPS)
+        if diger_meta != meta:
+            raise ValueError(f"{path} farklı ayarlarla üretilmiş ({diger_meta} != {meta}), birleştirilemez")
+        total.merge(diger_total)
+        for name in HLL_GROUPS:
+            groups[name].merge(diger_groups[name])
+    return total, groups, meta
+
+
+def write_cardinality_report(total, groups, output_prefix, cell_deg=HUCRE_DERECE):
+    """Sketch'lerden günlük/saatlik/hücre bazında yaklaşık cihaz sayısı CSV'lerini yazar"""
+    gun = groups["gun"].counts()
+    gunluk = pd.DataFrame({
+        "gun": pd.to_datetime(gun.index.astype(np.int64) * 86_400, unit="s").strftime("%Y-%m-%d"),
+        "yaklasik_cihaz": gun.values.round().astype(np.int64),
+    })
+    saat = groups["saat"].counts()
+    saatlik = pd.DataFrame({
+        "saat": pd.to_datetime(saat.index.astype(np.int64) * 3_600, unit="s").strftime("%Y-%m-%d %H:00"),
+        "yaklasik_cihaz": saat.values.round().astype(np.int64),
+    })
+    hucre = groups["hucre"].counts()
+    lat_min, lng_min = _decode_cell_keys(hucre.index.values, cell_deg)
+    hucreler = pd.DataFrame({
+        "lat_min": lat_min.round(6),
+        "lng_min": lng_min.round(6),
+        "yaklasik_cihaz": hucre.values.round().astype(np.int64),
+    })
+
+    for ad, df in [("gunluk", gunluk), ("saatlik", saatlik), ("hucre", hucreler)]:
+        df.to_csv(f"{output_prefix}_{ad}.csv", index=False)
+
+    print(f"Yaklaşık toplam cihaz: {total.count():,.0f} (±%{total.relative_error * 100:.1f})")
+    print(f"Kırılım hata payı: ±%{groups['gun'].relative_error * 100:.1f}")
+    print(f"Oluşturulan dosyalar: {output_prefix}_gunluk.csv, {output_prefix}_saatlik.csv, {output_prefix}_hucre.csv")
 
-scanner = dataset.scanner(batch_size=100_000)
 
-unique_ids = set()
+def main():
+    parser = argparse.ArgumentParser(description="Parquet dosyasından benzersiz device_aid listesini çıkarır")
+    parser.add_argument("--girdi", default=parafilepath, help="Mobility parquet dosyası veya klasörü")
+    parser.add_argument("--mod", choices=["arrow", "pandas", "hll"], default="arrow",
+                        help="arrow: kolon projeksiyonlu paralel tarama, pandas: eski yöntem, "
+                             "hll: gün/saat/hücre bazında yaklaşık cihaz sayısı")
+    parser.add_argument("--cikti", default=None, help="Çıktı dosyası")
+    parser.add_argument("--is-parcacigi", type=int, default=None, help="Paralel iş parçacığı sayısı")
+    parser.add_argument("--hucre", type=float, default=None,
+                        help=f"hll: hücre boyutu (derece, varsayılan {HUCRE_DERECE}); --birlestir'de sketch'lerden okunur")
+    parser.add_argument("--sketch-cikti", default=None, help="hll: sketch'leri .npz olarak kaydet")
+    parser.add_argument("--birlestir", nargs="+", default=None,
+                        help="hll: parquet taramak yerine verilen .npz sketch dosyalarını birleştir")
+    args = parser.parse_args()
 
-for record_batch in scanner.to_batches():
-    df_chunk = record_batch.to_pandas()
-    if "device_aid" in df_chunk.columns:
-        unique_ids.update(df_chunk["device_aid"].dropna().unique())
+    start_time = time.time()
+    if args.mod == "hll":
+        try:
+            if args.birlestir:
+                total, groups, meta = merge_sketch_files(args.birlestir)
+                # Hücre boyutu kaydı olmayan eski sketch'lerde --hucre (veya varsayılan) kullanılır
+                cell_deg = meta.get("cell_deg", args.hucre if args.hucre is not None else HUCRE_DERECE)
+                if args.hucre is not None and args.hucre != cell_deg:
+                    raise ValueError(f"--hucre {args.hucre}, sketch'ler {cell_deg} derece hücreyle üretilmiş")
+            else:
+                cell_deg = args.hucre if args.hucre is not None else HUCRE_DERECE
+                total, groups = approx_device_sketches(args.girdi, cell_deg=cell_deg)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.sketch_cikti:
+            save_sketches(args.sketch_cikti, total, groups, meta={"cell_deg": cell_deg})
+            print(f"Sketch dosyası kaydedildi: {args.sketch_cikti}")
+        write_cardinality_report(total, groups, args.cikti or "cihaz_sayilari", cell_deg=cell_deg)
+    elif args.mod == "pandas":
+        unique_ids_pandas(args.girdi, args.cikti or "unique_device_ids.csv")
+    else:
+        unique_ids_arrow(args.girdi, args.cikti or "unique_device_ids.parquet", workers=args.is_parcacigi)
+    print(f"Süre: {time.time() - start_time:.1f} saniye")
 
-unique_ids_list = sorted(unique_ids)
-df_unique = pd.DataFrame(unique_ids_list, columns=["device_aid"])
 
-df_unique.to_csv("unique_device_ids.csv", index=False)
-print("CSV dosyası kaydedildi: unique_device_ids.csv")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import json
+import os
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Tekrar eden metin kolonları parquet'te sözlük (dictionary) kodlu saklanır
+DICT_COLUMNS = ['device_aid', 'gidilen_mekan', 'kategori']
+# Bilinen eşleşme kolonlarının sabit parquet tipleri: şema parçaların tipinden bağımsızdır
+# (tamamı boş ya da int/float karışık parçalar aynı dosyaya yazılabilir). Diğer kolonların
+# tipi ilk parçadan çıkarılır.
+_DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+MATCH_COLUMN_TYPES = {
+    'device_aid': _DICT_STRING,
+    'gidilen_mekan': _DICT_STRING,
+    'kategori': _DICT_STRING,
+    'mesafe_m': pa.float64(),
+    'kalis_suresi_s': pa.int64(),
+}
+# Artımlı eşleştirme klasöründe işlenen kaynakların kaydı ('_' ile başladığı için veri sayılmaz)
+MANIFEST_FILE = "_eslesme_manifest.jsonl"
+
+
+def _decode_dictionaries(table):
+    """Sözlük kolonlarını düz metne çevirir; okuyucular CSV ile aynı tipleri görür"""
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    return table
+
+
+def match_schema(df):
+    """DataFrame kolonları için çıktı şeması: bilinen kolonlar MATCH_COLUMN_TYPES, diğerleri çıkarım"""
+    inferred = pa.Schema.from_pandas(df, preserve_index=False)
+    fields = []
+    for field in inferred:
+        if field.name in MATCH_COLUMN_TYPES:
+            field = pa.field(field.name, MATCH_COLUMN_TYPES[field.name])
+        elif field.name in DICT_COLUMNS:
+            field = pa.field(field.name, _DICT_STRING)
+        elif pa.types.is_null(field.type):
+            raise ValueError(f"'{field.name}' kolonunun tipi ilk parçadan çıkarılamıyor (tamamı boş); "
+                             f"MatchWriter'a schema verin")
+        fields.append(field)
+    return pa.schema(fields)
+
+
+class MatchWriter:
+    """Eşleşme sonuçlarını üretildikçe diske akıtır.
+
+    ``.parquet`` uzantısında ``row_group_rows`` satır biriktikçe bir row group yazılır;
+    device_aid ve mekan kolonları sözlük kodludur. Diğer uzantılarda CSV'ye eklenir.
+    Şema ``schema`` ile verilebilir, verilmezse ilk parçadan ``match_schema`` ile kurulur;
+    her parça bu şemaya dönüştürülür, kolonları farklı parça ValueError verir.
+
+    Yazma hedefin yanındaki ``partial_path``'e (varsayılan: görünür ``<ad>.partial.parquet``
+    klasörü) yapılır; her row group atomik yazılmış ayrı bir parça dosyasıdır. Süreç öldürülse
+    bile tamamlanan row group'lar ``read_matches`` ile okunabilir. ``close()`` parçaları tek
+    dosyada birleştirip hedef yola taşır; ``abort()`` veya çökmede hedefteki eski çıktı yerinde
+    kalır, hiç satır yazılmadıysa da değişmez. CSV'de yarım sonuç ``<ad>.partial.csv``'ye eklenir.
+    Önceki kesilmiş çalıştırmadan kalan yarım sonuç yeni yazıcı açılırken silinir.
+    """
+
+    def __init__(self, path, row_group_rows=1_000_000, schema=None, partial_path=None):
+        self.path = path
+        self.row_group_rows = row_group_rows
+        self.is_parquet = path.endswith('.parquet')
+        self.rows_written = 0
+        root, ext = os.path.splitext(path)
+        self.partial_path = partial_path or f"{root}.partial{ext}"
+        _remove_path(self.partial_path)
+        self._schema = schema
+        self._buffer = []
+        self._buffered = 0
+        self._n_parts = 0
+
+    def write(self, df):
+        if len(df) == 0:
+            return
+        if not self.is_parquet:
+            df.to_csv(self.partial_path, mode='a', header=self.rows_written == 0, index=False)
+            self.rows_written += len(df)
+            return
+
+        if self._schema is None:
+            self._schema = match_schema(df).remove_metadata()
+        if set(df.columns) != set(self._schema.names):
+            raise ValueError(f"Parça kolonları şemayla uyuşmuyor: {list(df.columns)} != {self._schema.names}")
+        table = pa.Table.from_pandas(df[self._schema.names], schema=self._schema, preserve_index=False).replace_schema_metadata(None)
+        self._buffer.append(table)
+        self._buffered += table.num_rows
+        if self._buffered >= self.row_group_rows:
+            self._flush()
+
+    def _part_path(self, i):
+        return os.path.join(self.partial_path, f"part-{i:05d}.parquet")
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        table = pa.concat_tables(self._buffer)
+        os.makedirs(self.partial_path, exist_ok=True)
+        # Parça önce gizli adla yazılır; yarım parça okuyuculara görünmez
+        tmp_path = os.path.join(self.partial_path, f".part-{self._n_parts:05d}.parquet.tmp")
+        pq.write_table(table, tmp_path, row_group_size=table.num_rows)
+        os.replace(tmp_path, self._part_path(self._n_parts))
+        self._n_parts += 1
+        self.rows_written += table.num_rows
+        self._buffer, self._buffered = [], 0
+
+    def close(self):
+        """Kalanı yazar ve yarım sonucu hedef yola taşır (hiç satır yoksa eski çıktı değişmez)"""
+        if self.is_parquet:
+            self._flush()
+        if self.rows_written == 0:
+            _remove_path(self.partial_path)
+            return 0
+        if not self.is_parquet:
+            os.replace(self.partial_path, self.path)
+            return self.rows_written
+
+        # Parçalar row group sınırları korunarak tek dosyada birleştirilir; bellekte bir parça tutulur
+        directory, name = os.path.split(self.path)
+        tmp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            with pq.ParquetWriter(tmp_path, self._schema) as writer:
+                for i in range(self._n_parts):
+                    table = pq.read_table(self._part_path(i)).cast(self._schema)
+                    writer.write_table(table, row_group_size=table.num_rows)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            _remove_path(tmp_path)
+            raise
+        _remove_path(self.partial_path)
+        return self.rows_written
+
+    def abort(self, keep_partial=False):
+        """Yazmayı bırakır; hedef yoldaki eski çıktı değişmez.
+
+        keep_partial=True iken tamamlanan row group'lar ``partial_path``'te okunabilir kalır
+        (tampondaki yazılmamış satırlar atılır), aksi halde yarım sonuç silinir.
+        """
+        self._buffer, self._buffered = [], 0
+        if not keep_partial:
+            _remove_path(self.partial_path)
+
+
+def _remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _is_parquet(path):
+    """Tek parquet dosyası veya artımlı eşleştirme klasörü (parquet bölümleri)"""
+    return path.endswith('.parquet') or os.path.isdir(path)
+
+
+def load_manifest(out_dir):
+    """Manifest kayıtları: kaynak -> son kayıt (aynı kaynağın sonraki satırı öncekini geçersiz kılar)"""
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Çökme sırasında yarım kalmış son satır yok sayılır; kaynak yeniden işlenir
+                continue
+            entries[entry["kaynak"]] = entry
+    return entries
+
+
+def append_manifest(out_dir, entry):
+    """Tek kaydı manifest'e ekler ve diske zorlar; çökmede en fazla son kaynak kaybolur"""
+    with open(os.path.join(out_dir, MANIFEST_FILE), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_manifest(out_dir, entries):
+    """Manifest'i sadece güncel kayıtlarla yeniden yazar (geçici dosya + os.replace)"""
+    tmp_path = os.path.join(out_dir, f".{MANIFEST_FILE}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for entry in entries.values():
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, os.path.join(out_dir, MANIFEST_FILE))
+
+
+def write_partition(out_dir, name, df):
+    """Tek kaynağın eşleşmelerini klasöre atomik olarak yazar; yazılan dosya adını döndürür"""
+    file_name = f"part-{name}.parquet"
+    # Yarım bölüm gizli adla yazılır; klasörü okuyanlar onu veri saymaz
+    writer = MatchWriter(os.path.join(out_dir, file_name), partial_path=os.path.join(out_dir, f".{file_name}.partial"))
+    try:
+        writer.write(df)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return file_name
+
+
+def iter_match_chunks(path, chunk_size=50_000, columns=None):
+    """Eşleşme dosyasını (parquet, artımlı klasör veya CSV) chunk_size satırlık DataFrame'ler halinde okur"""
+    if not _is_parquet(path):
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+        return
+    for batch in ds.dataset(path, format='parquet').to_batches(columns=columns, batch_size=chunk_size):
+        if batch.num_rows:
+            yield _decode_dictionaries(pa.Table.from_batches([batch])).to_pandas()
+
+
+def read_matches(path, columns=None):
+    """Eşleşme dosyasının tamamını (parquet, artımlı klasör veya CSV) DataFrame olarak okur"""
+    if not _is_parquet(path):
+        return pd.read_csv(path, usecols=columns)
+    return _decode_dictionaries(ds.dataset(path, format='parquet').to_table(columns=columns)).to_pandas()
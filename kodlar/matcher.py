@@ -1,49 +1,172 @@
 import pandas as pd
 import numpy as np
-from sklearn.neighbors import BallTree
 import glob
+import hashlib
+import multiprocessing as mp
 import os
 import time
+from functools import partial
 
-def balltree_eslestirme(hareketler_df, mekanlar_df, esik_metre=50):
-    """BallTree kullanarak spatial indexing ile hızlı eşleştirme"""
-    # Koordinatları kontrol et ve temizle
+from device_store import is_store, read_bucket, store_bucket_ids
+from match_io import MatchWriter, append_manifest, load_manifest, write_manifest, write_partition
+from spatial_join import build_index
+from staypoints import detect_stay_points
+
+# Havuz işçilerinin paylaştığı salt okunur durum (fork ile kopyalanmadan devralınır)
+_ISCI_DURUMU = {}
+
+def mekan_indeksi_olustur(mekanlar_df, esik_metre=50, motor="balltree"):
+    """Mekanları temizler ve indeksi bir kez kurar: (mekanlar_temiz, index)"""
     mekanlar_temiz = mekanlar_df.dropna(subset=['lat', 'lng']).copy()
-    hareketler_temiz = hareketler_df.dropna(subset=['latitude', 'longitude']).copy()
+    if len(mekanlar_temiz) == 0:
+        return mekanlar_temiz, None
+    # Mekan indeksini oluştur (BallTree: haversine metriği, grid: metrik hücreler)
+    index = build_index(mekanlar_temiz['lat'].values, mekanlar_temiz['lng'].values, esik_metre, engine=motor)
+    return mekanlar_temiz, index
+
+def balltree_eslestirme(hareketler_df, mekanlar_df, esik_metre=50, motor="balltree", mekan_indeksi=None):
+    """BallTree (veya grid-hash) kullanarak spatial indexing ile hızlı eşleştirme.
+
+    mekan_indeksi (mekan_indeksi_olustur çıktısı) verilirse indeks yeniden kurulmaz.
+    """
+    if mekan_indeksi is None:
+        mekan_indeksi = mekan_indeksi_olustur(mekanlar_df, esik_metre, motor)
+    mekanlar_temiz, index = mekan_indeksi
+    
+    # Koordinatları kontrol et ve temizle
+    hareketler_temiz = hareketler_df.dropna(subset=['latitude', 'longitude'])
     
     if len(mekanlar_temiz) == 0 or len(hareketler_temiz) == 0:
         return pd.DataFrame()
     
-    # Koordinatları radyana çevir
-    mekan_coords = np.radians(mekanlar_temiz[['lat', 'lng']].values)
-    hareket_coords = np.radians(hareketler_temiz[['latitude', 'longitude']].values)
-    
-    # BallTree oluştur (haversine metriği ile)
-    tree = BallTree(mekan_coords, metric='haversine')
+    # Her hareket noktası için yakın mekanları bul: düz (hareket, mekan, mesafe) dizileri
+    h_indices, m_indices, mesafeler = index.query(hareketler_temiz['latitude'].values,
+                                                  hareketler_temiz['longitude'].values)
     
-    # Her hareket noktası için yakın mekanları bul
-    esik_radyan = esik_metre / 6371000  # metreyi radyana çevir
-    indices, distances = tree.query_radius(hareket_coords, r=esik_radyan, return_distance=True)
+    if len(h_indices) == 0:
+        return pd.DataFrame()
     
-    # Sonuçları topla
-    sonuclar = []
-    for h_idx, (mekan_indices, mesafeler) in enumerate(zip(indices, distances)):
-        for m_idx, mesafe_radyan in zip(mekan_indices, mesafeler):
-            mesafe_metre = mesafe_radyan * 6371000
-            original_h_idx = hareketler_temiz.index[h_idx]
-            original_m_idx = mekanlar_temiz.index[m_idx]
-            
-            sonuclar.append({
-                'timestamp': hareketler_df.loc[original_h_idx, 'timestamp'],
-                'device_aid': hareketler_df.loc[original_h_idx, 'device_aid'],
-                'gidilen_mekan': mekanlar_df.loc[original_m_idx, 'MusteriTabelaAdi'],
-                'mesafe_m': mesafe_metre
-            })
+    # Sonuçları düz dizilerden topla: konum bazlı take, eşleşme başına Python işi yok
+    sonuclar = {
+        'timestamp': hareketler_temiz['timestamp'].to_numpy()[h_indices],
+        'device_aid': hareketler_temiz['device_aid'].to_numpy()[h_indices],
+        'gidilen_mekan': mekanlar_temiz['MusteriTabelaAdi'].to_numpy()[m_indices],
+        'mesafe_m': mesafeler
+    }
+    # Kalış noktası girdisinde (detect_stay_points) kalış süresi de yazılır
+    if 'dwell_s' in hareketler_temiz.columns:
+        sonuclar['kalis_suresi_s'] = hareketler_temiz['dwell_s'].to_numpy()[h_indices]
     
     return pd.DataFrame(sonuclar)
 
-def toplu_eslestirme(mekanlar_dosyasi, devices_klasoru, cikti_dosyasi, esik_metre=50):
-    """Tüm device dosyalarını işleyerek toplu eşleştirme yapar"""
+def hareket_kaynaklari(devices_klasoru):
+    """(ad, okuyucu) çiftleri: parquet mağazasında her bucket, aksi halde her cihaz CSV'si"""
+    if is_store(devices_klasoru):
+        return [(f"bucket={b:04d}", partial(read_bucket, devices_klasoru, b))
+                for b in store_bucket_ids(devices_klasoru)]
+    device_files = glob.glob(os.path.join(devices_klasoru, "*.csv"))
+    return [(os.path.basename(f), partial(pd.read_csv, f)) for f in device_files]
+
+def kaynak_imzasi(yol):
+    """Kaynağın boyutu ve değişiklik zamanı; klasörde (bucket) içindeki dosyaların toplamı / en yenisi"""
+    if os.path.isdir(yol):
+        dosyalar = [os.path.join(yol, f) for f in sorted(os.listdir(yol)) if not f.startswith(('.', '_'))]
+    else:
+        dosyalar = [yol]
+    durumlar = [os.stat(f) for f in dosyalar]
+    return {
+        'boyut': sum(st.st_size for st in durumlar),
+        'mtime_ns': max((st.st_mtime_ns for st in durumlar), default=0),
+        'dosya_sayisi': len(durumlar),
+    }
+
+def eslestirme_ayarlari(mekanlar_dosyasi, esik_metre, motor, kalis):
+    """Bölümlerin üretildiği mekan dosyası özeti (sha1) ve eşleştirme parametreleri"""
+    ozet = hashlib.sha1()
+    with open(mekanlar_dosyasi, 'rb') as f:
+        for blok in iter(lambda: f.read(1 << 20), b''):
+            ozet.update(blok)
+    return {'mekanlar_sha1': ozet.hexdigest(), 'esik_metre': float(esik_metre), 'motor': motor,
+            'kalis': [float(v) for v in kalis] if kalis is not None else None}
+
+def _bekleyen_kaynaklar(device_files, devices_klasoru, cikti_klasoru, ayarlar):
+    """Artımlı mod: manifest'e göre yeni/değişen kaynaklar ve silinen kaynakların temizliği.
+
+    Farklı mekan dosyası veya parametrelerle (ayarlar) üretilmiş bölümler de güncel sayılmaz;
+    ayarlar değiştiğinde tüm kaynaklar yeniden eşleştirilir. Bekleyen kaynakların eski bölümleri
+    ve manifest kayıtları eşleştirmeden önce kaldırılır: yeniden eşleştirme hata verir veya
+    çalışma çökerse klasörü okuyanlar eski ve yeni ayarlı bölümleri karışık görmez.
+    """
+    manifest = load_manifest(cikti_klasoru)
+    imzalar = {ad: kaynak_imzasi(os.path.join(devices_klasoru, ad)) for ad, _ in device_files}
+    
+    bekleyen, ayari_eski = [], 0
+    for ad, oku in device_files:
+        kayit = manifest.get(ad)
+        bolum_var = kayit is not None and (kayit['bolum'] is None
+                                           or os.path.exists(os.path.join(cikti_klasoru, kayit['bolum'])))
+        ayar_ayni = kayit is not None and kayit.get('ayarlar') == ayarlar
+        ayari_eski += kayit is not None and not ayar_ayni
+        if not (bolum_var and ayar_ayni and all(kayit.get(k) == v for k, v in imzalar[ad].items())):
+            bekleyen.append((ad, oku))
+    if ayari_eski:
+        print(f"Artımlı mod: {ayari_eski} kaynak farklı mekan dosyası/parametrelerle eşleştirilmiş, yeniden işlenecek")
+    
+    # Artık var olmayan kaynakların ve yeniden işlenecek kaynakların bölümleri kaldırılır
+    # (kayıtsız kalmış bölüm, örn. manifest yazılmadan çökme, dosya adından bulunur)
+    for ad in (set(manifest) - set(imzalar)) | {ad for ad, _ in bekleyen}:
+        kayit = manifest.pop(ad, None)
+        bolumler = {f"part-{ad}.parquet"} | ({kayit['bolum']} if kayit and kayit['bolum'] else set())
+        for bolum in bolumler:
+            if os.path.exists(os.path.join(cikti_klasoru, bolum)):
+                os.remove(os.path.join(cikti_klasoru, bolum))
+    write_manifest(cikti_klasoru, manifest)
+    return bekleyen, imzalar, manifest
+
+def _isci_baslat(mekanlar, mekan_indeksi, esik_metre, kalis):
+    """Havuz işçisi başlangıcı: mekan indeksi her işçiye bir kez verilir (fork'ta kopyalanmaz)"""
+    _ISCI_DURUMU.update(mekanlar=mekanlar, mekan_indeksi=mekan_indeksi, esik_metre=esik_metre, kalis=kalis)
+
+def _dosya_eslestir(kaynak):
+    """Tek dosya/bucket eşleştirmesi; sonuç DataFrame yerine kolon dizileri olarak döner"""
+    dosya_adi, oku = kaynak
+    try:
+        hareketler = oku()
+        if len(hareketler) == 0:
+            return dosya_adi, None, None
+        
+        # Bucket/CSV bir cihazın tüm ping'lerini içerir; kalışlar parça sınırında bölünmez
+        kalis = _ISCI_DURUMU['kalis']
+        if kalis is not None:
+            hareketler = detect_stay_points(hareketler, *kalis)
+        
+        sonuc = balltree_eslestirme(hareketler, _ISCI_DURUMU['mekanlar'], _ISCI_DURUMU['esik_metre'],
+                                    mekan_indeksi=_ISCI_DURUMU['mekan_indeksi'])
+        if len(sonuc) == 0:
+            return dosya_adi, None, None
+        return dosya_adi, {kolon: sonuc[kolon].to_numpy() for kolon in sonuc.columns}, None
+    except Exception as e:
+        return dosya_adi, None, str(e)
+
+def toplu_eslestirme(mekanlar_dosyasi, devices_klasoru, cikti_dosyasi, esik_metre=50, motor="balltree",
+                     kalis_noktalari=False, kalis_mesafe_m=50, kalis_bosluk_s=900, n_isci=None,
+                     artimli=False):
+    """Tüm device dosyalarını işleyerek toplu eşleştirme yapar.
+
+    Mekan indeksi bir kez kurulur ve n_isci süreçlik havuzla (varsayılan: tüm çekirdekler)
+    paylaşılır; n_isci=1 seri çalışır. kalis_noktalari=True iken ham ping'ler yerine
+    kalış noktaları eşleştirilir. Sonuçlar üretildikçe cikti_dosyasi'na akıtılır
+    (.parquet: sözlük kodlu row group'lar, aksi halde CSV). Yazılan row group'lar çalışma
+    boyunca görünür ``<ad>.partial.parquet`` klasöründe okunabilir ve sadece başarılı bitişte
+    hedefe taşınır; kesilen veya hiç eşleşme bulmayan çalışma eski çıktıyı değiştirmez.
+
+    artimli=True iken cikti_dosyasi bir klasördür: her kaynak (CSV/bucket) ayrı bir parquet
+    bölümüne yazılır ve manifest'e (yol, boyut, mtime, mekan dosyası özeti ve parametreler,
+    bölüm) kaydedilir. Tekrar çalıştırmada sadece yeni veya değişen kaynaklar işlenir; mekan
+    dosyası, esik_metre, motor veya kalış ayarları değişmişse tüm kaynaklar yeniden işlenir.
+    Yeniden işlenecek kaynakların eski bölümleri önce kaldırılır; hata veren kaynak sonraki
+    çalıştırmaya kadar çıktıda yer almaz. Çöken bir çalışma kaldığı yerden devam eder.
+    """
     start_time = time.time()
     
     # Mekanlar dosyasını yükle
@@ -54,46 +177,91 @@ def toplu_eslestirme(mekanlar_dosyasi, devices_klasoru, cikti_dosyasi, esik_metr
         print(f"Mekanlar dosyası yüklenirken hata: {e}")
         return
     
-    # Device dosyalarını bul
-    device_files = glob.glob(os.path.join(devices_klasoru, "*.csv"))
+    # Device dosyalarını bul (parquet mağazası veya CSV klasörü)
+    device_files = hareket_kaynaklari(devices_klasoru)
     if not device_files:
-        print(f"'{devices_klasoru}' klasöründe CSV dosyası bulunamadı")
+        print(f"'{devices_klasoru}' klasöründe CSV dosyası veya mağaza bucket'ı bulunamadı")
         return
     
     print(f"İşlenecek dosya sayısı: {len(device_files)}")
     
-    tum_sonuclar = []
+    kalis = (kalis_mesafe_m, kalis_bosluk_s) if kalis_noktalari else None
+    if artimli:
+        os.makedirs(cikti_dosyasi, exist_ok=True)
+        tum_kaynaklar = len(device_files)
+        ayarlar = eslestirme_ayarlari(mekanlar_dosyasi, esik_metre, motor, kalis)
+        device_files, imzalar, manifest = _bekleyen_kaynaklar(device_files, devices_klasoru, cikti_dosyasi,
+                                                              ayarlar)
+        print(f"Artımlı mod: {tum_kaynaklar - len(device_files)} kaynak güncel, {len(device_files)} kaynak işlenecek")
+        if not device_files:
+            write_manifest(cikti_dosyasi, manifest)
+            print(f"Tüm kaynaklar güncel, toplam eşleşme: {sum(k['satir'] for k in manifest.values())}")
+            return
+    
+    # Mekan indeksi tek sefer kurulur; işçiler salt okunur paylaşır
+    mekan_indeksi = mekan_indeksi_olustur(mekanlar, esik_metre, motor)
+    isci_ayarlari = (mekanlar, mekan_indeksi, esik_metre, kalis)
+    n_isci = min(n_isci or os.cpu_count() or 1, len(device_files))
+    
+    # Eşleşmeler bellekte biriktirilmez, dosyaya (artımlı modda kaynak başına bölüme) akıtılır
+    yazici = None if artimli else MatchWriter(cikti_dosyasi)
     basarili_dosya = 0
     
-    for i, dosya_yolu in enumerate(device_files, 1):
-        try:
-            hareketler = pd.read_csv(dosya_yolu)
-            
-            if len(hareketler) == 0:
-                continue
-                
-            sonuc = balltree_eslestirme(hareketler, mekanlar, esik_metre)
-            
-            if len(sonuc) > 0:
-                tum_sonuclar.append(sonuc)
+    if n_isci > 1:
+        # fork: indeks ve mekan tablosu işçilere pickle edilmeden, copy-on-write devredilir
+        baglam = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+        havuz = baglam.Pool(n_isci, initializer=_isci_baslat, initargs=isci_ayarlari)
+        sonuclar = havuz.imap(_dosya_eslestir, device_files)
+    else:
+        havuz = None
+        _isci_baslat(*isci_ayarlari)
+        sonuclar = map(_dosya_eslestir, device_files)
+    print(f"İşçi süreç sayısı: {n_isci}")
+    
+    try:
+        # imap sırayı korur; çıktı seri çalışmayla aynıdır
+        for i, (dosya_adi, kolonlar, hata) in enumerate(sonuclar, 1):
+            if hata is not None:
+                # Hatalı kaynak manifest'e yazılmaz (eski bölümü zaten kaldırıldı); sonraki çalıştırmada tekrar denenir
+                print(f"Hata - {dosya_adi}: {hata}")
+            elif artimli:
+                # Önce bölüm (atomik), sonra manifest: çökmede yarım kaynak kayıtlı görünmez
+                bolum = write_partition(cikti_dosyasi, dosya_adi, pd.DataFrame(kolonlar)) if kolonlar else None
+                manifest[dosya_adi] = {'kaynak': dosya_adi, **imzalar[dosya_adi], 'ayarlar': ayarlar,
+                                       'bolum': bolum,
+                                       'satir': len(kolonlar['device_aid']) if kolonlar else 0}
+                append_manifest(cikti_dosyasi, manifest[dosya_adi])
+                basarili_dosya += kolonlar is not None
+            elif kolonlar is not None:
+                yazici.write(pd.DataFrame(kolonlar))
                 basarili_dosya += 1
             
             if i % 50 == 0:
                 print(f"İşlenen: {i}/{len(device_files)} dosya")
-                
-        except Exception as e:
-            print(f"Hata - {os.path.basename(dosya_yolu)}: {e}")
-            continue
-    
-    # Sonuçları birleştir ve kaydet
-    if tum_sonuclar:
-        final_df = pd.concat(tum_sonuclar, ignore_index=True)
-        final_df.to_csv(cikti_dosyasi, index=False)
-        
+    except BaseException:
+        if havuz is not None:
+            havuz.terminate()
+        # Yarım sonuç eski çıktının üzerine yazılmaz; tamamlanan row group'lar okunabilir kalır
+        if yazici is not None:
+            yazici.abort(keep_partial=True)
+            print(f"Çalışma kesildi, eski çıktı değişmedi; tamamlanan eşleşmeler: {yazici.partial_path}")
+        raise
+    finally:
+        if artimli:
+            write_manifest(cikti_dosyasi, manifest)
+        if havuz is not None:
+            havuz.close()
+            havuz.join()
+    
+    if artimli:
+        toplam_eslesme = sum(k['satir'] for k in manifest.values())
+    else:
+        toplam_eslesme = yazici.close()
+    if toplam_eslesme:
         toplam_sure = time.time() - start_time
         print(f"\n=== SONUÇ ===")
         print(f"İşlenen dosya: {basarili_dosya}/{len(device_files)}")
-        print(f"Toplam eşleşme: {len(final_df)}")
+        print(f"Toplam eşleşme: {toplam_eslesme}")
         print(f"Süre: {toplam_sure:.1f} saniye")
         print(f"Çıktı dosyası: {cikti_dosyasi}")
     else:
@@ -103,7 +271,7 @@ if __name__ == "__main__":
     # Kullanım örneği
     toplu_eslestirme(
         mekanlar_dosyasi="clean_places.csv",
-        devices_klasoru="devices",
-        cikti_dosyasi="eslesmeler.csv",
+        devices_klasoru="device_store",
+        cikti_dosyasi="eslesmeler.parquet",
         esik_metre=30
     )
\ No newline at end of file
@@ -0,0 +1,166 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from matcher import hareket_kaynaklari
+from spatial_join import ENGINES, build_index
+
+# Katalog dosyalarının bulunduğu temel klasör (CLI: --veri-klasoru)
+data_base_path = ""
+
+# Kategori -> (dosya, ad kolonu, enlem kolonu, boylam kolonu, yarıçap metre)
+# Dosya adları data_base_path'e göre çözülür (resolve_catalogs).
+# Yarıçaplar ayrı scriptlerdekiyle aynı: cofee_visits 100 m, vet_visiter 20 m, matcher 30 m
+CATALOGS = {
+    'kahve': ("kahveci2.csv", 'name', 'latitude', 'longitude', 100),
+    'veteriner': ("veterinerlerson.csv", 'name', 'lat', 'lng', 20),
+    'mekan': ("clean_places.csv", 'MusteriTabelaAdi', 'lat', 'lng', 30),
+}
+PING_COLS = ['timestamp', 'device_aid', 'latitude', 'longitude']
+
+
+def resolve_catalogs(data_dir=data_base_path, paths=None, radii=None, catalogs=CATALOGS):
+    """Katalog dosyalarını data_dir'e göre çözer.
+
+    paths / radii: kategori -> dosya yolu / yarıçap (metre) geçersiz kılmaları; verilen yol
+    olduğu gibi kullanılır. Bilinmeyen kategori ValueError verir.
+    """
+    paths, radii = paths or {}, radii or {}
+    unknown = (set(paths) | set(radii)) - set(catalogs)
+    if unknown:
+        raise ValueError(f"Bilinmeyen kategori: {', '.join(sorted(unknown))} (seçenekler: {', '.join(catalogs)})")
+    resolved = {}
+    for category, (path, name_col, lat_col, lng_col, radius_m) in catalogs.items():
+        path = paths.get(category, os.path.join(data_dir, path))
+        resolved[category] = (path, name_col, lat_col, lng_col, radii.get(category, radius_m))
+    return resolved
+
+
+def load_catalogs(catalogs=CATALOGS):
+    """Tüm POI kataloglarını tek etiketli tabloda birleştirir (kategori, ad, lat, lng, yarıçap)"""
+    frames = []
+    for category, (path, name_col, lat_col, lng_col, radius_m) in catalogs.items():
+        df = pd.read_csv(path).dropna(subset=[lat_col, lng_col])
+        frames.append(pd.DataFrame({
+            'kategori': category,
+            'ad': df[name_col].values,
+            'lat': df[lat_col].values,
+            'lng': df[lng_col].values,
+            'yaricap_m': float(radius_m),
+        }))
+        print(f"{category}: {len(df):,} nokta, yarıçap {radius_m} m")
+    pois = pd.concat(frames, ignore_index=True)
+    pois['kategori'] = pd.Categorical(pois['kategori'], categories=list(catalogs))
+    return pois
+
+
+def match_chunk(index, pois, pings):
+    """Tek ping parçası: (cihaz, kategori) ziyaret sayıları ve mekan bazında eşleşme tablosu.
+
+    Bir ping, kategorisinden en az bir noktanın yarıçapı içindeyse o kategoride bir ziyaret sayılır.
+    """
+    pings = pings.dropna(subset=['latitude', 'longitude'])
+    ping_idx, poi_idx, dist_m = index.query(pings['latitude'].values, pings['longitude'].values)
+    category_codes = pois['kategori'].cat.codes.to_numpy().astype(np.int64)
+    n_categories = len(pois['kategori'].cat.categories)
+
+    # Aynı kategoride birden çok noktaya yakın ping tek ziyaret sayılır
+    ping_category = np.unique(ping_idx * n_categories + category_codes[poi_idx])
+    counts = pd.DataFrame({
+        'device_aid': pings['device_aid'].values[ping_category // n_categories],
+        'kategori': ping_category % n_categories,
+    }).groupby(['device_aid', 'kategori']).size()
+
+    matches = pd.DataFrame({
+        'timestamp': pings['timestamp'].values[ping_idx],
+        'device_aid': pings['device_aid'].values[ping_idx],
+        'kategori': pois['kategori'].values[poi_idx],
+        'gidilen_mekan': pois['ad'].values[poi_idx],
+        'mesafe_m': dist_m,
+    })
+    return counts, matches
+
+
+def multi_category_matching(devices_klasoru, catalogs=None, motor="grid"):
+    """Ping'leri tek kez okuyup tüm kategorilerle eşleştirir (catalogs verilmezse resolve_catalogs()).
+
+    Dönüş: cihaz bazında kategori ziyaret sayıları ve mekan bazında eşleşme tablosu.
+    """
+    catalogs = catalogs or resolve_catalogs()
+    pois = load_catalogs(catalogs)
+    index = build_index(pois['lat'].values, pois['lng'].values, pois['yaricap_m'].values, engine=motor)
+
+    all_counts, all_matches = [], []
+    sources = hareket_kaynaklari(devices_klasoru)
+    for i, (dosya_adi, oku) in enumerate(sources, 1):
+        try:
+            pings = oku()
+            if len(pings) == 0:
+                continue
+            counts, matches = match_chunk(index, pois, pings[PING_COLS])
+            all_counts.append(counts)
+            all_matches.append(matches)
+        except Exception as e:
+            print(f"Hata - {dosya_adi}: {e}")
+            continue
+        if i % 50 == 0:
+            print(f"İşlenen: {i}/{len(sources)} dosya")
+
+    categories = list(catalogs)
+    if all_counts:
+        visits = pd.concat(all_counts).groupby(level=[0, 1]).sum().unstack(fill_value=0)
+    else:
+        visits = pd.DataFrame(columns=range(len(categories)))
+    visits = visits.reindex(columns=range(len(categories)), fill_value=0)
+    visits.columns = [f"{c}_visit_count" for c in categories]
+    visits = visits.rename_axis('device_aid').reset_index()
+    matches = pd.concat(all_matches, ignore_index=True) if all_matches else pd.DataFrame()
+    return visits, matches
+
+
+def _overrides(values, cast):
+    """['kategori=deger', ...] -> {kategori: cast(deger)}"""
+    result = {}
+    for value in values or []:
+        category, sep, raw = value.partition("=")
+        if not sep:
+            raise ValueError(f"'{value}' KATEGORI=DEGER biçiminde değil")
+        result[category.strip()] = cast(raw.strip())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tüm POI kategorileri için tek geçişte eşleştirme")
+    parser.add_argument("--cihazlar", default="device_store", help="Parquet mağazası veya cihaz CSV klasörü")
+    parser.add_argument("--motor", choices=ENGINES, default="grid")
+    parser.add_argument("--veri-klasoru", default=data_base_path, help="Katalog dosyalarının bulunduğu klasör")
+    parser.add_argument("--katalog", action="append", metavar="KATEGORI=YOL",
+                        help=f"Kategori katalog dosyası (tekrarlanabilir; kategoriler: {', '.join(CATALOGS)})")
+    parser.add_argument("--yaricap", action="append", metavar="KATEGORI=METRE",
+                        help="Kategori yarıçapı (tekrarlanabilir)")
+    parser.add_argument("--ziyaret-cikti", default="kategori_ziyaretleri.csv")
+    parser.add_argument("--eslesme-cikti", default="eslesmeler_tum.csv")
+    args = parser.parse_args()
+
+    try:
+        catalogs = resolve_catalogs(args.veri_klasoru, _overrides(args.katalog, str),
+                                    _overrides(args.yaricap, float))
+    except ValueError as e:
+        parser.error(str(e))
+
+    start_time = time.time()
+    visits, matches = multi_category_matching(args.cihazlar, catalogs, motor=args.motor)
+    visits.to_csv(args.ziyaret_cikti, index=False)
+    matches.to_csv(args.eslesme_cikti, index=False)
+
+    print(f"\n=== SONUÇ ===")
+    print(f"Ziyaret eden cihaz: {len(visits):,} -> {args.ziyaret_cikti}")
+    print(f"Toplam eşleşme: {len(matches):,} -> {args.eslesme_cikti}")
+    print(f"Süre: {time.time() - start_time:.1f} saniye")
+
+
+if __name__ == "__main__":
+    main()
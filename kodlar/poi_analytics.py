@@ -0,0 +1,95 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from match_io import read_matches
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+STAT_COLUMNS = ['total_visits', 'unique_visitors', 'avg_visits_per_visitor', 'peak_hour', 'peak_day',
+                'first_visit_date', 'last_visit_date', 'most_frequent_visitor_device',
+                'most_frequent_visitor_count', 'visits_per_day']
+
+
+def _as_local_time(values):
+    """Unix saniye kolonunu GMT+3 zamanına çevirir; datetime kolonları aynen kalır"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, unit='s', utc=True).dt.tz_convert('Etc/GMT-3')
+
+
+def _most_frequent(group_codes, value_codes, n_values):
+    """Grup başına en sık değer ve sayısı; eşitlikte veride ilk görülen değer (value_counts gibi).
+
+    Ayrıca grup başına farklı değer sayısını döndürür.
+    """
+    pairs, first_row, counts = np.unique(group_codes.astype(np.int64) * n_values + value_codes,
+                                         return_index=True, return_counts=True)
+    pair_groups = pairs // n_values
+    order = np.lexsort((first_row, -counts, pair_groups))
+    top = order[np.r_[True, pair_groups[order][1:] != pair_groups[order][:-1]]]
+    return pairs[top] % n_values, counts[top], np.bincount(pair_groups)
+
+
+def venue_visit_stats(visits, venue_col, name_col='venue_name', device_col='device_aid', time_col='timestamp'):
+    """Mekan bazında ziyaret istatistikleri; tüm mekanlar tek gruplu geçişte hesaplanır.
+
+    Her satır bir ziyarettir (ping veya kalış). Eşitlikte en yoğun saat için en küçük saat,
+    en yoğun gün ve en sık ziyaretçi için veride ilk görülen değer seçilir (eski döngüyle aynı).
+    Mekanlar veride ilk görüldükleri sırayla döner.
+    """
+    visits = visits.dropna(subset=[venue_col])
+    if visits.empty:
+        return pd.DataFrame(columns=[name_col] + STAT_COLUMNS)
+
+    venue_codes, venues = pd.factorize(visits[venue_col], sort=False)
+    device_codes, devices = pd.factorize(visits[device_col], sort=False)
+    ts = _as_local_time(visits[time_col])
+    n_venues = len(venues)
+
+    # Toplam ziyaret ve saat (0-23) histogramı; argmax eşitlikte en küçük saati seçer
+    total = np.bincount(venue_codes, minlength=n_venues)
+    hours = np.bincount(venue_codes * 24 + ts.dt.hour.to_numpy(), minlength=n_venues * 24)
+    peak_hour = hours.reshape(n_venues, 24).argmax(axis=1)
+    peak_day, _, _ = _most_frequent(venue_codes, ts.dt.dayofweek.to_numpy(), 7)
+
+    span = ts.groupby(venue_codes).agg(['min', 'max'])
+    first_visit, last_visit = span['min'], span['max']
+
+    # (mekan, cihaz) çiftleri: farklı ziyaretçi sayısı ve en sık ziyaretçi
+    top_device, top_count, unique_visitors = _most_frequent(venue_codes, device_codes, len(devices))
+
+    stats = pd.DataFrame({
+        name_col: venues,
+        'total_visits': total,
+        'unique_visitors': unique_visitors,
+        'avg_visits_per_visitor': np.round(total / unique_visitors, 2),
+        'peak_hour': peak_hour,
+        'peak_day': np.asarray(DAY_NAMES)[peak_day],
+        'first_visit_date': first_visit.dt.strftime('%Y-%m-%d %H:%M').to_numpy(),
+        'last_visit_date': last_visit.dt.strftime('%Y-%m-%d %H:%M').to_numpy(),
+        'most_frequent_visitor_device': devices[top_device],
+        'most_frequent_visitor_count': top_count,
+        'visits_per_day': np.round(total / ((last_visit - first_visit).dt.days.to_numpy() + 1), 2),
+    })
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eşleşme tablosundan mekan bazında ziyaret istatistikleri")
+    parser.add_argument("girdi", help="Eşleşme dosyası (örn. matcher.py çıktısı eslesmeler.parquet veya CSV)")
+    parser.add_argument("--mekan-kolonu", default="gidilen_mekan")
+    parser.add_argument("--cikti", default="mekan_detayli_analiz.csv")
+    args = parser.parse_args()
+
+    start = time.time()
+    visits = read_matches(args.girdi, columns=['timestamp', 'device_aid', args.mekan_kolonu])
+    stats = venue_visit_stats(visits, args.mekan_kolonu, name_col='mekan_adi')
+    stats = stats.sort_values('total_visits', ascending=False)
+    stats.to_csv(args.cikti, index=False)
+    print(f"{len(stats):,} mekan, {len(visits):,} ziyaret -> {args.cikti} ({time.time() - start:.1f} sn)")
+
+
+if __name__ == "__main__":
+    main()
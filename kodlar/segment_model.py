@@ -0,0 +1,191 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+from match_io import iter_match_chunks
+
+SEGMENT_FEATURES = ['total_visits', 'unique_places', 'weekend_ratio',
+                    'travel_radius', 'wealth_score', 'venue_type_diversity',
+                    'bar_pub', 'restaurant', 'hotel',
+                    'quality_A_visits', 'high_level_venues']
+
+# Segment adları ve merkezde (standartlaştırılmış uzayda) belirleyici özellik ağırlıkları.
+# Sıra segment numarasını verir; KMeans etiket sırası keyfi olduğu için adlar bu profillere
+# en iyi uyan merkezlere atanır.
+SEGMENT_PROFILES = {
+    "Casual Diners": {'restaurant': 1.0, 'wealth_score': -1.0, 'quality_A_visits': -0.5},
+    "Bar Hoppers": {'bar_pub': 1.0, 'weekend_ratio': 0.5},
+    "Fine Diners": {'wealth_score': 1.0, 'quality_A_visits': 1.0, 'restaurant': 0.5},
+    "Hotel Guests": {'hotel': 1.0, 'travel_radius': 0.5},
+    "Local Explorers": {'unique_places': 1.0, 'venue_type_diversity': 1.0, 'travel_radius': -0.5},
+}
+
+
+def name_centroids(centroids, features=SEGMENT_FEATURES):
+    """Merkezleri segment adlarına eşler; dönüş (yeni merkez sırası, adlar).
+
+    Ad-merkez eşleşmesi toplam profil puanını en büyükleyen atamadır (Macar yöntemi), bu
+    yüzden etiket sırasından bağımsızdır. Adlandırılan merkezler SEGMENT_PROFILES sırasıyla,
+    ad kalmayan merkezler toplam ziyarete göre azalan sırayla "Segment N" olarak gelir.
+    """
+    weights = np.array([[profile.get(feature, 0.0) for feature in features]
+                        for profile in SEGMENT_PROFILES.values()])
+    names = list(SEGMENT_PROFILES)
+    centroid_idx, name_idx = linear_sum_assignment(centroids @ weights.T, maximize=True)
+    order = centroid_idx[np.argsort(name_idx)]
+    segment_names = [names[i] for i in np.sort(name_idx)]
+
+    rest = np.setdiff1d(np.arange(len(centroids)), order)
+    rest = rest[np.argsort(-centroids[rest, features.index('total_visits')], kind='stable')]
+    segment_names += [f"Segment {len(segment_names) + i}" for i in range(len(rest))]
+    return np.r_[order, rest].astype(np.int64), segment_names
+
+
+def profile_chunks(source, chunk_size=100_000, features=SEGMENT_FEATURES):
+    """Profil parçaları üreten, her çağrıda baştan başlayan fonksiyon.
+
+    source bir DataFrame ya da profil dosyasıdır (parquet, klasör veya CSV; match_io ile okunur).
+    """
+    if isinstance(source, pd.DataFrame):
+        return lambda: (source.iloc[start:start + chunk_size] for start in range(0, len(source), chunk_size))
+    return lambda: iter_match_chunks(source, chunk_size, columns=features)
+
+
+class SegmentModel:
+    """Kalıcı kullanıcı segmentasyonu modeli: ölçekleyici, MiniBatchKMeans merkezleri ve segment adları.
+
+    ``fit`` profilleri parça parça iki kez gezer: önce StandardScaler ``partial_fit`` ile ortalama
+    ve ölçek, sonra ``batch_size`` satırlık mini batch'lerle MiniBatchKMeans ``partial_fit``.
+    Başlangıç merkezleri ilk ``init_size`` satırda tam KMeans ile seçilir. Bellekte en fazla bir
+    parça ve birkaç batch tutulur; cihaz sayısı arttıkça eğitim belleği büyümez. ``assign``
+    yeniden eğitmeden en yakın merkezi verir; model ``save``/``load`` ile .npz olarak saklanır.
+    """
+
+    def __init__(self, n_clusters=5, batch_size=4096, n_epochs=3, init_size=20_000,
+                 random_state=42, features=SEGMENT_FEATURES):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        self.init_size = init_size
+        self.random_state = random_state
+        self.features = list(features)
+        self.mean_ = None
+        self.scale_ = None
+        self.centroids_ = None
+        self.names_ = None
+        self.n_samples_seen_ = 0
+
+    def _matrix(self, profiles):
+        return profiles[self.features].fillna(0).to_numpy(dtype=np.float64)
+
+    def _scaled(self, profiles):
+        return (self._matrix(profiles) - self.mean_) / self.scale_
+
+    def _batches(self, chunks, size):
+        """Parça sınırlarından bağımsız, size satırlık ölçeklenmiş batch'ler (sonuncusu kısa olabilir)"""
+        buffer, buffered = [], 0
+        for chunk in chunks():
+            buffer.append(self._scaled(chunk))
+            buffered += len(buffer[-1])
+            while buffered >= size:
+                data = np.concatenate(buffer) if len(buffer) > 1 else buffer[0]
+                yield data[:size]
+                buffer, buffered = [data[size:]], buffered - size
+        if buffered:
+            yield np.concatenate(buffer)
+
+    def fit(self, chunks):
+        """chunks: profil DataFrame parçaları veren, her çağrıda baştan başlayan fonksiyon (profile_chunks)"""
+        scaler = StandardScaler()
+        for chunk in chunks():
+            scaler.partial_fit(self._matrix(chunk))
+        if not getattr(scaler, 'n_samples_seen_', 0):
+            raise ValueError("Segmentasyon için profil yok")
+        self.mean_, self.scale_ = scaler.mean_, scaler.scale_
+        self.n_samples_seen_ = int(scaler.n_samples_seen_)
+
+        init_sample = next(self._batches(chunks, self.init_size))
+        init = KMeans(n_clusters=self.n_clusters, random_state=self.random_state,
+                      n_init=10).fit(init_sample).cluster_centers_
+        kmeans = MiniBatchKMeans(n_clusters=self.n_clusters, init=init, n_init=1,
+                                 batch_size=self.batch_size, random_state=self.random_state)
+        for _ in range(self.n_epochs):
+            for batch in self._batches(chunks, self.batch_size):
+                kmeans.partial_fit(batch)
+
+        order, self.names_ = name_centroids(kmeans.cluster_centers_, self.features)
+        self.centroids_ = kmeans.cluster_centers_[order]
+        return self
+
+    def assign(self, profiles, chunk_size=500_000):
+        """Profiller için (segment numarası, segment adı) dizileri; model yeniden eğitilmez"""
+        centroid_sq = (self.centroids_ ** 2).sum(axis=1)
+        segments = np.empty(len(profiles), dtype=np.int64)
+        for start in range(0, len(profiles), chunk_size):
+            scaled = self._scaled(profiles.iloc[start:start + chunk_size])
+            # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2; ||x||^2 en yakın merkezi değiştirmez
+            segments[start:start + len(scaled)] = np.argmin(centroid_sq - 2 * scaled @ self.centroids_.T, axis=1)
+        return segments, np.asarray(self.names_, dtype=object)[segments]
+
+    def save(self, path):
+        """Modeli .npz olarak yazar (geçici dosya + os.replace: yarım yazılmış model okunmaz)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npz.tmp")
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, mean=self.mean_, scale=self.scale_, centroids=self.centroids_,
+                     names=np.array(self.names_), features=np.array(self.features),
+                     n_samples_seen=np.array(self.n_samples_seen_))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            model = cls(n_clusters=len(data['centroids']), features=data['features'].tolist())
+            model.mean_ = data['mean']
+            model.scale_ = data['scale']
+            model.centroids_ = data['centroids']
+            model.names_ = data['names'].tolist()
+            model.n_samples_seen_ = int(data['n_samples_seen'])
+        return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kullanıcı segmentasyonu modelini eğitir veya yeni profilleri segmentlere atar")
+    parser.add_argument("islem", choices=["egit", "ata"])
+    parser.add_argument("--profiller", default="kullanici_profilleri_fast.csv",
+                        help="Profil dosyası (parquet, klasör veya CSV)")
+    parser.add_argument("--model", default="segment_model.npz")
+    parser.add_argument("--cikti", default="kullanici_segmentleri.csv", help="ata: device_aid + segment dosyası")
+    parser.add_argument("--segment", type=int, default=5, help="egit: segment sayısı")
+    parser.add_argument("--parca", type=int, default=100_000, help="Parça başına profil sayısı")
+    args = parser.parse_args()
+
+    if args.islem == "egit":
+        model = SegmentModel(n_clusters=args.segment).fit(profile_chunks(args.profiller, args.parca))
+        model.save(args.model)
+        print(f"✅ {model.n_samples_seen_:,} profille eğitildi, model: {args.model}")
+        for name, centroid in zip(model.names_, model.centroids_ * model.scale_ + model.mean_):
+            print(f"  • {name}: " + ", ".join(f"{f}={v:.2f}" for f, v in zip(model.features, centroid)))
+        return
+
+    model = SegmentModel.load(args.model)
+    header = True
+    n_profiles = 0
+    for chunk in iter_match_chunks(args.profiller, args.parca, columns=['device_aid'] + model.features):
+        segments, names = model.assign(chunk)
+        pd.DataFrame({'device_aid': chunk['device_aid'].to_numpy(), 'segment': segments,
+                      'segment_name': names}).to_csv(args.cikti, mode='w' if header else 'a',
+                                                     header=header, index=False)
+        header = False
+        n_profiles += len(chunk)
+    print(f"✅ {n_profiles:,} profil segmentlere atandı: {args.cikti}")
+
+
+if __name__ == "__main__":
+    main()
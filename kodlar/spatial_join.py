@@ -0,0 +1,308 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_M = 6_371_000.0
+ENGINES = ("balltree", "grid", "kdtree")
+
+# Hücre anahtarı: (cx << 32) + (cy + 2^31); int64 içinde çakışmasız
+_KEY_SHIFT = np.int64(32)
+_KEY_OFFSET = np.int64(1 << 31)
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Derece cinsinden koordinatlar arasındaki haversine mesafesi (metre)"""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _radii(radius_m):
+    """Sabit veya POI başına yarıçap: (sorgu yarıçapı = en büyük, POI dizisi veya None)"""
+    radius_m = np.asarray(radius_m, dtype=np.float64)
+    if radius_m.ndim == 0:
+        return float(radius_m), None
+    return (float(radius_m.max()) if radius_m.size else 0.0), radius_m
+
+
+def _within_poi_radius(poi_radius_m, ping_idx, poi_idx, dist_m):
+    """POI başına yarıçap verildiyse, en büyük yarıçapla bulunan çiftleri POI'nin kendi yarıçapıyla süzer"""
+    if poi_radius_m is None:
+        return ping_idx, poi_idx, dist_m
+    keep = dist_m <= poi_radius_m[poi_idx]
+    return ping_idx[keep], poi_idx[keep], dist_m[keep]
+
+
+def _first_per_ping(n_pings, ping_idx, poi_idx, dist_m):
+    """(ping, mesafe) sıralı çiftlerden her ping'in ilk (en yakın) POI'si; eşleşmeyen -1 / NaN"""
+    nearest = np.full(n_pings, -1, dtype=np.int64)
+    nearest_m = np.full(n_pings, np.nan)
+    matched, first_pos = np.unique(ping_idx, return_index=True)
+    nearest[matched] = poi_idx[first_pos]
+    nearest_m[matched] = dist_m[first_pos]
+    return nearest, nearest_m
+
+
+def _expand_ranges(starts, counts):
+    """[s, s+c) aralıklarını tek düz indeks dizisine açar"""
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + offsets
+
+
+class BallTreeIndex:
+    """sklearn haversine BallTree'yi ortak (ping, poi, mesafe) arayüzüyle sarar.
+
+    radius_m sabit veya POI başına dizi olabilir (örn. kategori bazında farklı yarıçap).
+    """
+
+    def __init__(self, lat, lng, radius_m):
+        self.radius_m, self.poi_radius_m = _radii(radius_m)
+        self.tree = BallTree(np.radians(np.column_stack([lat, lng])), metric='haversine')
+
+    def query(self, lat, lng):
+        """Yarıçap içindeki tüm (ping_idx, poi_idx, mesafe_m) çiftleri, ping sırasıyla"""
+        coords = np.radians(np.column_stack([lat, lng]))
+        indices, distances = self.tree.query_radius(coords, r=self.radius_m / EARTH_RADIUS_M,
+                                                    return_distance=True)
+        lengths = np.fromiter((len(a) for a in indices), dtype=np.int64, count=len(indices))
+        if lengths.sum() == 0:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float64)
+        ping_idx = np.repeat(np.arange(len(indices), dtype=np.int64), lengths)
+        poi_idx = np.concatenate(indices).astype(np.int64)
+        dist_m = np.concatenate(distances) * EARTH_RADIUS_M
+        return _within_poi_radius(self.poi_radius_m, ping_idx, poi_idx, dist_m)
+
+    def hits(self, lat, lng):
+        """Her ping için yarıçap içinde en az bir POI var mı"""
+        if self.poi_radius_m is not None:
+            ping_idx, _, _ = self.query(lat, lng)
+            return np.bincount(ping_idx, minlength=len(lat)) > 0
+        coords = np.radians(np.column_stack([lat, lng]))
+        return self.tree.query_radius(coords, r=self.radius_m / EARTH_RADIUS_M, count_only=True) > 0
+
+    def nearest(self, lat, lng):
+        """Her ping için yarıçap içindeki en yakın POI indeksi ve mesafesi (yoksa -1 / NaN).
+
+        Yarıçap sorgusunun düz çiftleri (ping, mesafe) sırasına dizilir; ping başına ek
+        sorgu yapılmaz. k=1 sorgusu uzak ping'lerde budama yapamadığından daha yavaştır.
+        """
+        ping_idx, poi_idx, dist_m = self.query(lat, lng)
+        order = np.lexsort((dist_m, ping_idx))
+        return _first_per_ping(len(lat), ping_idx[order], poi_idx[order], dist_m[order])
+
+
+class _ProjectedIndex:
+    """Yerel metrik düzlemde aday arama + kesin haversine doğrulaması için ortak taban.
+
+    Koordinatlar POI merkezli eşdikdörtgen izdüşümle metreye çevrilir. Referans enlemden
+    uzaktaki noktalarda doğu-batı mesafesi küçüldüğü için arama mesafesi (``search_m``) buna
+    göre büyütülür. Alt sınıflar sadece ``_candidates`` ile aday (ping, poi) çiftlerini üretir;
+    parçalı sorgu, haversine süzgeci ve (ping, mesafe) sıralaması burada yapılır.
+    """
+
+    def __init__(self, lat, lng, radius_m, chunk_size=1_000_000):
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        self.radius_m, self.poi_radius_m = _radii(radius_m)
+        self.chunk_size = chunk_size
+        self.poi_lat = lat
+        self.poi_lng = lng
+        self.cos_ref = np.cos(np.radians(lat.mean())) if len(lat) else 1.0
+
+        radius_deg = np.degrees(self.radius_m / EARTH_RADIUS_M)
+        max_abs_lat = min(np.abs(lat).max() + radius_deg, 89.0) if len(lat) else 0.0
+        self.search_m = self.radius_m * max(1.0, self.cos_ref / np.cos(np.radians(max_abs_lat))) * 1.01
+
+    def _project(self, lat, lng):
+        return np.column_stack([np.radians(lng) * EARTH_RADIUS_M * self.cos_ref,
+                                np.radians(lat) * EARTH_RADIUS_M])
+
+    def _candidates(self, xy):
+        """İzdüşümlü ping'ler için search_m içindeki olası (ping sırası, poi_idx) çiftleri"""
+        raise NotImplementedError
+
+    def _query_chunk(self, lat, lng):
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lng)))
+        ping_pos, poi_idx = self._candidates(self._project(lat[valid], lng[valid]))
+        ping_idx = valid[ping_pos]
+
+        dist_m = haversine_m(lat[ping_idx], lng[ping_idx], self.poi_lat[poi_idx], self.poi_lng[poi_idx])
+        keep = dist_m <= (self.radius_m if self.poi_radius_m is None else self.poi_radius_m[poi_idx])
+        ping_idx, poi_idx, dist_m = ping_idx[keep], poi_idx[keep], dist_m[keep]
+
+        order = np.lexsort((dist_m, ping_idx))
+        return ping_idx[order], poi_idx[order], dist_m[order]
+
+    def query(self, lat, lng):
+        """Yarıçap içindeki tüm (ping_idx, poi_idx, mesafe_m) çiftleri, (ping, mesafe) sırasıyla"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        if len(self.poi_lat) == 0 or len(lat) == 0:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float64)
+
+        parts = []
+        for start in range(0, len(lat), self.chunk_size):
+            ping_idx, poi_idx, dist_m = self._query_chunk(lat[start:start + self.chunk_size],
+                                                          lng[start:start + self.chunk_size])
+            parts.append((ping_idx + start, poi_idx, dist_m))
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+    def hits(self, lat, lng):
+        """Her ping için yarıçap içinde en az bir POI var mı"""
+        ping_idx, _, _ = self.query(lat, lng)
+        return np.bincount(ping_idx, minlength=len(lat)) > 0
+
+    def nearest(self, lat, lng):
+        """Her ping için yarıçap içindeki en yakın POI indeksi ve mesafesi (yoksa -1 / NaN)"""
+        return _first_per_ping(len(lat), *self.query(lat, lng))
+
+
+class GridIndex(_ProjectedIndex):
+    """Sabit küçük yarıçaplı eşleştirme için metrik grid-hash indeksi.
+
+    POI'ler arama mesafesi boyutlu hücrelere yerleştirilir. Her ping için sadece kendi ve
+    komşu 8 hücredeki POI'ler aday olur. POI başına yarıçap dizisi verilirse hücre boyutu
+    en büyük yarıçapa göre seçilir.
+    """
+
+    def __init__(self, lat, lng, radius_m, chunk_size=1_000_000):
+        super().__init__(lat, lng, radius_m, chunk_size)
+        keys = self._cell_keys(self._project(self.poi_lat, self.poi_lng))
+        self._poi_order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self._poi_order]
+        self._keys, self._starts, self._counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+
+    def _cells(self, xy):
+        cells = np.floor(xy / self.search_m).astype(np.int64)
+        return cells[:, 0], cells[:, 1]
+
+    def _cell_keys(self, xy):
+        cx, cy = self._cells(xy)
+        return (cx << _KEY_SHIFT) + (cy + _KEY_OFFSET)
+
+    def _candidates(self, xy):
+        cx, cy = self._cells(xy)
+        ping_ids = np.arange(len(xy), dtype=np.int64)
+        ping_parts, poi_parts = [np.empty(0, np.int64)], [np.empty(0, np.int64)]
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                keys = ((cx + dx) << _KEY_SHIFT) + (cy + dy + _KEY_OFFSET)
+                pos = np.searchsorted(self._keys, keys)
+                pos_clipped = np.minimum(pos, len(self._keys) - 1)
+                found = (pos < len(self._keys)) & (self._keys[pos_clipped] == keys)
+                if not found.any():
+                    continue
+                cell_pos = pos[found]
+                counts = self._counts[cell_pos]
+                ping_parts.append(np.repeat(ping_ids[found], counts))
+                poi_parts.append(self._poi_order[_expand_ranges(self._starts[cell_pos], counts)])
+        return np.concatenate(ping_parts), np.concatenate(poi_parts)
+
+
+class KDTreeIndex(_ProjectedIndex):
+    """Yerel metrik düzlemde cKDTree yarıçap sorgusu; sonuç BallTree ile aynı çiftlerdir."""
+
+    def __init__(self, lat, lng, radius_m, chunk_size=1_000_000):
+        super().__init__(lat, lng, radius_m, chunk_size)
+        self.tree = cKDTree(self._project(self.poi_lat, self.poi_lng))
+
+    def _candidates(self, xy):
+        # Ping'ler için geçici ağaç; iki ağaç arası sorgu düz (ping, poi) dizisini C içinde üretir
+        pairs = cKDTree(xy).sparse_distance_matrix(self.tree, self.search_m, output_type="ndarray")
+        return pairs["i"].astype(np.int64), pairs["j"].astype(np.int64)
+
+
+def _disk_offsets(reach):
+    """Aralarındaki en kısa mesafe ``reach`` hücreden az olan (dx, dy) hücre kaydırmaları"""
+    steps = range(-reach, reach + 1)
+    return [(dx, dy) for dx in steps for dy in steps
+            if max(abs(dx) - 1, 0) ** 2 + max(abs(dy) - 1, 0) ** 2 < reach ** 2]
+
+
+def grid_density_clusters(lat, lng, radius_m, min_points=3, cells_per_radius=2, weights=None):
+    """Yoğun grid hücrelerini bağlı bileşenlerle birleştiren DBSCAN benzeri kümeleme.
+
+    Noktalar yerel eşdikdörtgen düzlemde (ortalama enlem referanslı) radius_m / cells_per_radius
+    boyutlu hücrelere yerleştirilir. Bir hücre, merkezi kendi merkezine radius_m içinde olan
+    hücrelerdeki toplam nokta ağırlığı ``min_points`` veya fazlaysa yoğundur (DBSCAN'in eps
+    komşuluğunun hücre çözünürlüğündeki karşılığı; ``weights`` verilmezse her nokta 1 sayılır,
+    DBSCAN'in sample_weight'i gibi). Birbirine radius_m'den yakın yoğun hücreler tek kümede toplanır.
+    Yoğun olmayan hücrelerdeki noktalar, DBSCAN'in sınır noktaları gibi radius_m içindeki en
+    yakın yoğun hücre noktasının kümesine katılır (cKDTree ile).
+    Sıralama ve ikili aramayla çalışır, nokta sayısına göre neredeyse doğrusaldır.
+    Dönüş: nokta başına küme etiketi (hiçbir kümeye ulaşmayan hücre ve NaN koordinat: -1).
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    labels = np.full(len(lat), -1, dtype=np.int64)
+    valid = ~(np.isnan(lat) | np.isnan(lng))
+    if not valid.any():
+        return labels
+
+    cell_m = radius_m / cells_per_radius
+    cos_ref = np.cos(np.radians(lat[valid].mean()))
+    x = np.radians(lng[valid]) * EARTH_RADIUS_M * cos_ref
+    y = np.radians(lat[valid]) * EARTH_RADIUS_M
+    cx = np.floor(x / cell_m).astype(np.int64)
+    cy = np.floor(y / cell_m).astype(np.int64)
+    cell_keys, cell_of_point = np.unique((cx << _KEY_SHIFT) + (cy + _KEY_OFFSET), return_inverse=True)
+    cell_of_point = cell_of_point.ravel()
+    point_weights = None if weights is None else np.asarray(weights, dtype=np.float64)[valid]
+    cell_weights = np.bincount(cell_of_point, weights=point_weights, minlength=len(cell_keys))
+
+    # Anahtarın alt 32 biti negatif olmadığı için aritmetik kaydırma cx'i geri verir
+    cell_cx = cell_keys >> _KEY_SHIFT
+    cell_cy = cell_keys - (cell_cx << _KEY_SHIFT) - _KEY_OFFSET
+    neighbourhood = np.zeros(len(cell_keys), dtype=np.float64)
+    rows, cols = [], []
+    for dx, dy in _disk_offsets(cells_per_radius):
+        keys = ((cell_cx + dx) << _KEY_SHIFT) + (cell_cy + dy + _KEY_OFFSET)
+        pos = np.searchsorted(cell_keys, keys)
+        found = (pos < len(cell_keys)) & (cell_keys[np.minimum(pos, len(cell_keys) - 1)] == keys)
+        if dx * dx + dy * dy <= cells_per_radius ** 2:
+            neighbourhood[found] += cell_weights[pos[found]]
+        rows.append(np.flatnonzero(found))
+        cols.append(pos[found])
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+
+    dense = neighbourhood >= min_points
+    edges = dense[rows] & dense[cols]
+    graph = sparse.csr_matrix((np.ones(edges.sum(), dtype=np.int8), (rows[edges], cols[edges])),
+                              shape=(len(cell_keys), len(cell_keys)))
+    _, components = connected_components(graph, directed=False)
+    # Bileşen numaraları yoğun hücrelerde 0'dan ardışık olacak şekilde yeniden verilir
+    _, dense_labels = np.unique(components[dense], return_inverse=True)
+
+    cell_labels = np.full(len(cell_keys), -1, dtype=np.int64)
+    cell_labels[dense] = dense_labels.ravel()
+    point_labels = cell_labels[cell_of_point]
+
+    # Sınır noktaları: sadece yoğun hücreye komşu hücrelerdeki noktalar aranır
+    near_dense = np.zeros(len(cell_keys), dtype=bool)
+    near_dense[rows[dense[cols] & ~dense[rows]]] = True
+    border = np.flatnonzero(near_dense[cell_of_point])
+    core = np.flatnonzero(point_labels >= 0)
+    if len(border) and len(core):
+        distance, nearest = cKDTree(np.column_stack([x[core], y[core]])).query(
+            np.column_stack([x[border], y[border]]), distance_upper_bound=radius_m)
+        reached = np.isfinite(distance)
+        point_labels[border[reached]] = point_labels[core[nearest[reached]]]
+    labels[valid] = point_labels
+    return labels
+
+
+def build_index(lat, lng, radius_m, engine="balltree"):
+    """Seçilen motorla sabit yarıçaplı POI indeksi kurar"""
+    if engine == "balltree":
+        return BallTreeIndex(lat, lng, radius_m)
+    if engine == "grid":
+        return GridIndex(lat, lng, radius_m)
+    if engine == "kdtree":
+        return KDTreeIndex(lat, lng, radius_m)
+    raise ValueError(f"Bilinmeyen motor: {engine} (seçenekler: {', '.join(ENGINES)})")
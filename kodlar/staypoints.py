@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+from spatial_join import haversine_m
+
+STAY_COLUMNS = ['device_aid', 'timestamp', 'end_timestamp', 'dwell_s', 'latitude', 'longitude', 'n_pings']
+
+
+def _to_epoch_seconds(values):
+    """Unix saniye veya datetime kolonunu int64 saniyeye çevirir"""
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy().astype('datetime64[s]').astype(np.int64)
+    return values.to_numpy().astype(np.int64)
+
+
+# Ortak adımlı döngünün en fazla adım sayısı; daha uzun bölümler tek tek işlenir
+LOCKSTEP_STEPS = 256
+
+
+def _split_long_segment(new_stay, lat, lng, max_distance_m, anchor, pos, end):
+    """Tek bölümü ``pos``'tan itibaren böler: çapaya uzaklık büyüyen pencerelerle hesaplanır.
+
+    Pencerede uzak ping yoksa pencere ikiye katlanır, varsa ilki yeni çapa olur ve pencere
+    küçülür. Döngü ping başına değil pencere başına döner; sabit duran uzun bölüm birkaç
+    düzine adımda biter.
+    """
+    window = 64
+    while pos < end:
+        stop = min(pos + window, end)
+        far = np.flatnonzero(haversine_m(lat[anchor], lng[anchor], lat[pos:stop], lng[pos:stop]) > max_distance_m)
+        if len(far):
+            anchor = pos + far[0]
+            new_stay[anchor] = True
+            pos, window = anchor + 1, 64
+        else:
+            pos, window = stop, min(window * 2, 1 << 20)
+
+
+def _split_by_anchor(new_stay, lat, lng, max_distance_m):
+    """Bölümleri çapaya (kalışın ilk ping'i) uzaklığa göre yerinde böler.
+
+    Tüm bölümler aynı anda ilerletilir: k. adımda uzunluğu k'dan büyük her bölümün k. ping'i
+    o anki çapayla karşılaştırılır, uzaksa yeni kalış başlar ve çapa olur. Döngü en fazla
+    ``LOCKSTEP_STEPS`` adım döner; daha uzun bölümlerin kalanı (örn. hep açık, duran cihaz)
+    ``_split_long_segment`` ile tek tek bölünür. Süre en uzun bölümün uzunluğuna bağlı kalmaz.
+    """
+    seg_starts = np.flatnonzero(new_stay)
+    seg_lens = np.diff(np.r_[seg_starts, len(new_stay)])
+    order = np.argsort(-seg_lens, kind='stable')
+    seg_starts, neg_lens = seg_starts[order], -seg_lens[order]
+    anchors = seg_starts.copy()
+    longest = -neg_lens[0] if len(neg_lens) else 0
+    for k in range(1, min(longest, LOCKSTEP_STEPS)):
+        # Uzunluğu k'dan büyük bölümler dizinin başındadır
+        n_active = np.searchsorted(neg_lens, -k, side='left')
+        idx = seg_starts[:n_active] + k
+        anchor = anchors[:n_active]
+        far = haversine_m(lat[anchor], lng[anchor], lat[idx], lng[idx]) > max_distance_m
+        new_stay[idx[far]] = True
+        anchors[:n_active] = np.where(far, idx, anchor)
+
+    n_long = np.searchsorted(neg_lens, -LOCKSTEP_STEPS, side='left')
+    for start, neg_len, anchor in zip(seg_starts[:n_long], neg_lens[:n_long], anchors[:n_long]):
+        _split_long_segment(new_stay, lat, lng, max_distance_m, anchor, start + LOCKSTEP_STEPS, start - neg_len)
+
+
+def detect_stay_points(pings, max_distance_m=50.0, max_gap_s=900, min_dwell_s=0,
+                       device_col='device_aid', time_col='timestamp',
+                       lat_col='latitude', lng_col='longitude'):
+    """Cihaz bazında ardışık ping'leri kalış noktalarına (stay) indirger (vektörize).
+
+    Ping'ler cihaz ve zamana göre sıralanır. Kalışın ilk ping'ine (çapa) ``max_distance_m``'den
+    yakın ve bir önceki ping'den en fazla ``max_gap_s`` saniye sonra gelen ping aynı kalışa
+    eklenir; yavaş ama sürekli hareket zincirlenip tek kalışa dönüşmez. Her
+    kalış için merkez (ortalama koordinat), başlangıç, bitiş, kalış süresi ve ping
+    sayısı döner. ``timestamp`` kolonu kalışın başlangıcıdır (unix saniye).
+    """
+    pings = pings.dropna(subset=[lat_col, lng_col])
+    if pings.empty:
+        return pd.DataFrame(columns=STAY_COLUMNS)
+
+    pings = pings.sort_values([device_col, time_col], kind='stable')
+    devices = pings[device_col].to_numpy()
+    ts = _to_epoch_seconds(pings[time_col])
+    lat = pings[lat_col].to_numpy(dtype=np.float64)
+    lng = pings[lng_col].to_numpy(dtype=np.float64)
+
+    # Aday bölümler: cihaz değişimi veya uzun zaman boşluğu
+    new_stay = np.ones(len(pings), dtype=bool)
+    if len(pings) > 1:
+        new_stay[1:] = (devices[1:] != devices[:-1]) | (ts[1:] - ts[:-1] > max_gap_s)
+    _split_by_anchor(new_stay, lat, lng, max_distance_m)
+
+    starts = np.flatnonzero(new_stay)
+    ends = np.r_[starts[1:], len(pings)] - 1
+    n_pings = ends - starts + 1
+
+    stays = pd.DataFrame({
+        'device_aid': devices[starts],
+        'timestamp': ts[starts],
+        'end_timestamp': ts[ends],
+        'dwell_s': ts[ends] - ts[starts],
+        'latitude': np.add.reduceat(lat, starts) / n_pings,
+        'longitude': np.add.reduceat(lng, starts) / n_pings,
+        'n_pings': n_pings,
+    })
+    if min_dwell_s > 0:
+        stays = stays[stays['dwell_s'] >= min_dwell_s].reset_index(drop=True)
+    return stays
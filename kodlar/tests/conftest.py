@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modüller kodlar/ klasöründen düz import edilir (from spatial_join import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cardinality import GroupedHyperLogLog, HyperLogLog, load_sketches, save_sketches
+from getunique_ids import (HLL_GROUPS, MIN_HUCRE_DERECE, _cell_keys, _decode_cell_keys, approx_device_sketches,
+                           check_cell_deg, merge_sketch_files)
+
+
+def _sketch_file(path, cell_deg, meta=True):
+    total = HyperLogLog(10)
+    total.update(["a", "b"])
+    groups = {name: GroupedHyperLogLog(8) for name in HLL_GROUPS}
+    groups["hucre"].update_hashes(_cell_keys(np.array([41.01]), np.array([29.02]), cell_deg),
+                                  np.array([1], dtype=np.uint64))
+    save_sketches(path, total, groups, meta={"cell_deg": cell_deg} if meta else None)
+    return str(path)
+
+
+def test_cell_size_is_stored_and_mismatched_merge_is_refused(tmp_path):
+    a = _sketch_file(tmp_path / "a.npz", 0.05)
+    b = _sketch_file(tmp_path / "b.npz", 0.05)
+    c = _sketch_file(tmp_path / "c.npz", 0.01)
+    assert load_sketches(a, HLL_GROUPS)[2] == {"cell_deg": 0.05}
+    assert merge_sketch_files([a, b])[2] == {"cell_deg": 0.05}
+    with pytest.raises(ValueError):
+        merge_sketch_files([a, c])
+    # Kaydı olmayan eski dosya kayıtlı olanla karıştırılmaz
+    with pytest.raises(ValueError):
+        merge_sketch_files([a, _sketch_file(tmp_path / "eski.npz", 0.05, meta=False)])
+
+
+def test_cell_keys_round_trip_and_small_cells_are_rejected(tmp_path):
+    lat = np.array([-89.99, 0.0, 41.01, 89.99])
+    lng = np.array([-179.99, 0.0, 29.02, 179.99])
+    cell_deg = MIN_HUCRE_DERECE * 1.01
+    keys = _cell_keys(lat, lng, cell_deg)
+    assert len(np.unique(keys)) == len(keys)
+    lat_min, lng_min = _decode_cell_keys(keys, cell_deg)
+    assert np.all((lat_min <= lat) & (lat < lat_min + cell_deg))
+    assert np.all((lng_min <= lng) & (lng < lng_min + cell_deg))
+
+    with pytest.raises(ValueError):
+        check_cell_deg(MIN_HUCRE_DERECE)
+    path = str(tmp_path / "pingler.parquet")
+    pd.DataFrame({'device_aid': ['a'], 'timestamp': [0], 'latitude': [41.0], 'longitude': [29.0]}).to_parquet(path)
+    with pytest.raises(ValueError):
+        approx_device_sketches(path, cell_deg=0.0001)
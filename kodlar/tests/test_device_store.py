@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from device_store import DeviceStoreWriter, read_store
+
+
+def _pings(n=1000):
+    return pd.DataFrame({'device_aid': [f"d{i % 50}" for i in range(n)], 'timestamp': np.arange(n),
+                         'latitude': 41.0, 'longitude': 29.0})
+
+
+def _write(root, df, **kwargs):
+    writer = DeviceStoreWriter(str(root), n_buckets=8, flush_rows=300, **kwargs)
+    writer.write(df)
+    return writer.close()
+
+
+def test_rewrite_replaces_store_instead_of_duplicating(tmp_path):
+    root = tmp_path / "store"
+    _write(root, _pings())
+    _write(root, _pings())
+    assert len(read_store(str(root))) == 1000
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["store"]
+
+
+def test_append_adds_rows(tmp_path):
+    root = tmp_path / "store"
+    _write(root, _pings())
+    _write(root, _pings(), append=True)
+    assert len(read_store(str(root))) == 2000
+
+
+def test_abort_keeps_previous_store(tmp_path):
+    root = tmp_path / "store"
+    _write(root, _pings())
+    for append in (False, True):
+        writer = DeviceStoreWriter(str(root), n_buckets=8, flush_rows=300, append=append)
+        writer.write(_pings())
+        writer.abort()
+        assert len(read_store(str(root))) == 1000
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["store"]
+
+
+def test_refuses_to_overwrite_non_store_directory(tmp_path):
+    (tmp_path / "notes.txt").write_text("x")
+    with pytest.raises(ValueError):
+        DeviceStoreWriter(str(tmp_path))
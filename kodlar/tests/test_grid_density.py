@@ -0,0 +1,25 @@
+import numpy as np
+
+from spatial_join import EARTH_RADIUS_M, grid_density_clusters
+
+LAT, LNG = 41.0, 29.0
+
+
+def _east(metres):
+    return LNG + np.degrees(metres / (EARTH_RADIUS_M * np.cos(np.radians(LAT))))
+
+
+def test_sparse_point_near_cluster_joins_it_as_border():
+    # 95 m'deki konumun hücresi yoğun değil ama 0 m'deki yoğun konuma radius içinde
+    lat = np.full(4, LAT)
+    lng = np.array([_east(m) for m in (-60, 0, 95, 300)])
+    labels = grid_density_clusters(lat, lng, 100, min_points=6, weights=[3, 3, 1, 1])
+    assert labels.tolist() == [0, 0, 0, -1]
+
+
+def test_density_is_weighted_by_visits():
+    lat = np.array([LAT, LAT + 0.05, np.nan])
+    lng = np.array([LNG, LNG, LNG])
+    assert (grid_density_clusters(lat, lng, 100, min_points=3) == -1).all()
+    labels = grid_density_clusters(lat, lng, 100, min_points=3, weights=[5, 1, 9])
+    assert labels.tolist() == [0, -1, -1]
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from match_io import MatchWriter, read_matches
+
+
+def _chunk(n, null_names=False, int_distance=False):
+    return pd.DataFrame({
+        'timestamp': np.arange(n),
+        'device_aid': [None] * n if null_names else [f"d{i}" for i in range(n)],
+        'gidilen_mekan': [None] * n if null_names else ['mekan'] * n,
+        'mesafe_m': np.arange(n) if int_distance else np.arange(n) * 1.5,
+    })
+
+
+def test_chunks_with_different_dtypes_share_declared_schema(tmp_path):
+    path = str(tmp_path / "eslesmeler.parquet")
+    writer = MatchWriter(path, row_group_rows=4)
+    writer.write(_chunk(2, null_names=True))
+    writer.write(_chunk(3))
+    writer.write(_chunk(3, int_distance=True))
+    assert writer.close() == 8
+    result = read_matches(path)
+    assert len(result) == 8
+    assert result['device_aid'].isna().sum() == 2
+    assert result['mesafe_m'].dtype == np.float64
+
+
+def test_unclosed_writer_leaves_previous_output_readable(tmp_path):
+    path = str(tmp_path / "eslesmeler.parquet")
+    writer = MatchWriter(path)
+    writer.write(_chunk(5))
+    writer.close()
+
+    interrupted = MatchWriter(path, row_group_rows=1)
+    interrupted.write(_chunk(3))
+    assert len(read_matches(path)) == 5
+    interrupted.abort()
+    assert [p.name for p in tmp_path.iterdir()] == ["eslesmeler.parquet"]
+
+
+def test_mismatched_columns_are_rejected(tmp_path):
+    writer = MatchWriter(str(tmp_path / "eslesmeler.parquet"))
+    writer.write(_chunk(2))
+    with pytest.raises(ValueError):
+        writer.write(_chunk(2).drop(columns=['mesafe_m']))
+
+
+def test_completed_row_groups_are_readable_before_close(tmp_path):
+    path = str(tmp_path / "eslesmeler.parquet")
+    writer = MatchWriter(path)
+    writer.write(_chunk(5))
+    writer.close()
+
+    killed = MatchWriter(path, row_group_rows=2)
+    killed.write(_chunk(3))
+    killed.write(_chunk(2))
+    # close() çağrılmadan (süreç öldürülmüş gibi) yarım sonuç ve eski çıktı okunabilir
+    assert len(read_matches(killed.partial_path)) == 5
+    assert len(read_matches(path)) == 5
+
+    resumed = MatchWriter(path, row_group_rows=2)
+    assert not (tmp_path / "eslesmeler.partial.parquet").exists()
+    resumed.write(_chunk(7))
+    assert resumed.close() == 7
+    assert len(read_matches(path)) == 7
+    assert [p.name for p in tmp_path.iterdir()] == ["eslesmeler.parquet"]
+
+
+def test_empty_run_keeps_previous_output(tmp_path):
+    path = str(tmp_path / "eslesmeler.parquet")
+    writer = MatchWriter(path)
+    writer.write(_chunk(4))
+    writer.close()
+    assert MatchWriter(path).close() == 0
+    assert len(read_matches(path)) == 4
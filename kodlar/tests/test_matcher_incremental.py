@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import matcher
+from match_io import load_manifest, read_matches
+from matcher import toplu_eslestirme
+
+
+def _setup(tmp_path):
+    devices = tmp_path / "devices"
+    devices.mkdir()
+    rng = np.random.default_rng(0)
+    for i in range(3):
+        pd.DataFrame({'timestamp': np.arange(50) * 60, 'device_aid': f"d{i}",
+                      'latitude': 41.0 + rng.uniform(-3e-4, 3e-4, 50),
+                      'longitude': 29.0 + rng.uniform(-3e-4, 3e-4, 50)}).to_csv(devices / f"d{i}.csv", index=False)
+    places = tmp_path / "places.csv"
+    pd.DataFrame({'MusteriTabelaAdi': ['A', 'B'], 'lat': [41.0, 41.0002], 'lng': [29.0, 29.0]}).to_csv(places, index=False)
+    return str(devices), places, str(tmp_path / "eslesmeler")
+
+
+def _run(devices, places, out, esik_metre=30, capsys=None):
+    toplu_eslestirme(str(places), devices, out, esik_metre=esik_metre, n_isci=1, artimli=True)
+    return capsys.readouterr().out
+
+
+def test_unchanged_settings_reuse_partitions(tmp_path, capsys):
+    devices, places, out = _setup(tmp_path)
+    _run(devices, places, out, capsys=capsys)
+    assert "Tüm kaynaklar güncel" in _run(devices, places, out, capsys=capsys)
+
+
+def test_changed_threshold_or_places_rebuild_all_partitions(tmp_path, capsys):
+    devices, places, out = _setup(tmp_path)
+    _run(devices, places, out, capsys=capsys)
+    small = len(read_matches(out))
+
+    assert "3 kaynak işlenecek" in _run(devices, places, out, esik_metre=100, capsys=capsys)
+    assert len(read_matches(out)) > small
+    assert all(entry['ayarlar']['esik_metre'] == 100 for entry in load_manifest(out).values())
+
+    pd.DataFrame({'MusteriTabelaAdi': ['C'], 'lat': [41.0], 'lng': [29.0]}).to_csv(places, index=False)
+    assert "3 kaynak işlenecek" in _run(devices, places, out, esik_metre=100, capsys=capsys)
+    assert set(read_matches(out)['gidilen_mekan']) == {'C'}
+
+
+def test_interrupted_full_run_keeps_previous_output(tmp_path, monkeypatch):
+    devices, places, _ = _setup(tmp_path)
+    out = str(tmp_path / "eslesmeler.parquet")
+    toplu_eslestirme(str(places), devices, out, esik_metre=30, n_isci=1)
+    before = read_matches(out)
+
+    gercek = matcher._dosya_eslestir
+    cagri = []
+
+    def kesilen(kaynak):
+        cagri.append(kaynak)
+        if len(cagri) == 2:
+            raise RuntimeError("disk dolu")
+        return gercek(kaynak)
+
+    monkeypatch.setattr(matcher, '_dosya_eslestir', kesilen)
+    with pytest.raises(RuntimeError):
+        toplu_eslestirme(str(places), devices, out, esik_metre=100, n_isci=1)
+    pd.testing.assert_frame_equal(read_matches(out), before)
+
+
+def test_failed_rematch_after_settings_change_drops_stale_partition(tmp_path, capsys, monkeypatch):
+    devices, places, out = _setup(tmp_path)
+    _run(devices, places, out, capsys=capsys)
+    assert set(read_matches(out)['device_aid']) == {'d0', 'd1', 'd2'}
+
+    gercek = matcher._dosya_eslestir
+
+    def d1_hatali(kaynak):
+        if kaynak[0] == "d1.csv":
+            return kaynak[0], None, "okuma hatası"
+        return gercek(kaynak)
+
+    monkeypatch.setattr(matcher, '_dosya_eslestir', d1_hatali)
+    _run(devices, places, out, esik_metre=100, capsys=capsys)
+    # d1'in 30 m ile üretilmiş bölümü 100 m'lik bölümlerle karışmaz
+    assert set(read_matches(out)['device_aid']) == {'d0', 'd2'}
+    assert set(load_manifest(out)) == {'d0.csv', 'd2.csv'}
+
+    monkeypatch.setattr(matcher, '_dosya_eslestir', gercek)
+    assert "1 kaynak işlenecek" in _run(devices, places, out, esik_metre=100, capsys=capsys)
+    assert set(read_matches(out)['device_aid']) == {'d0', 'd1', 'd2'}
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from spatial_join import haversine_m
+from staypoints import LOCKSTEP_STEPS, detect_stay_points
+
+# Enlemde 1 derece ~111.2 km
+METRE_DERECE = 1 / 111_195
+
+
+def _pings(device, ts, lat, lng):
+    return pd.DataFrame({'device_aid': device, 'timestamp': ts, 'latitude': lat, 'longitude': lng})
+
+
+def test_steady_walk_never_becomes_stay():
+    # 1 saat, 30 sn arayla, ping'ler arası 36 m: her adım eşiğin altında ama çapadan hızla uzaklaşır
+    n = 120
+    pings = _pings('a', np.arange(n) * 30, 41.0 + np.arange(n) * 36 * METRE_DERECE, np.full(n, 29.0))
+    stays = detect_stay_points(pings, max_distance_m=50, max_gap_s=900)
+    assert stays['n_pings'].max() <= 2
+    assert stays['dwell_s'].max() <= 30
+    assert detect_stay_points(pings, max_distance_m=50, max_gap_s=900, min_dwell_s=300).empty
+
+
+def test_stationary_pings_with_jitter_form_one_stay():
+    rng = np.random.default_rng(0)
+    n = 60
+    pings = _pings('a', np.arange(n) * 60, 41.0 + rng.uniform(-10, 10, n) * METRE_DERECE,
+                   29.0 + rng.uniform(-10, 10, n) * METRE_DERECE)
+    stays = detect_stay_points(pings, max_distance_m=50, max_gap_s=900)
+    assert len(stays) == 1
+    assert stays.loc[0, 'n_pings'] == n
+    assert stays.loc[0, 'dwell_s'] == (n - 1) * 60
+
+
+def test_stay_splits_on_device_gap_and_anchor_distance():
+    pings = pd.concat([
+        _pings('a', [0, 60, 120], [41.0] * 3, [29.0] * 3),
+        # Zaman boşluğu (> 900 sn): aynı yerde yeni kalış
+        _pings('a', [2000, 2060], [41.0] * 2, [29.0] * 2),
+        # Çapadan 200 m uzak: yeni kalış
+        _pings('a', [2120, 2180], [41.0 + 200 * METRE_DERECE] * 2, [29.0] * 2),
+        _pings('b', [0, 60], [41.0] * 2, [29.0] * 2),
+    ], ignore_index=True)
+    stays = detect_stay_points(pings, max_distance_m=50, max_gap_s=900)
+    assert stays['device_aid'].tolist() == ['a', 'a', 'a', 'b']
+    assert stays['n_pings'].tolist() == [3, 2, 2, 2]
+    assert stays['timestamp'].tolist() == [0, 2000, 2120, 0]
+
+
+def test_long_stationary_device_forms_one_stay():
+    # Hep açık cihaz: 300k ping, 10 sn arayla aynı yerde
+    rng = np.random.default_rng(1)
+    n = 300_000
+    pings = _pings('a', np.arange(n) * 10, 41.0 + rng.uniform(-10, 10, n) * METRE_DERECE, np.full(n, 29.0))
+    stays = detect_stay_points(pings, max_distance_m=50, max_gap_s=900)
+    assert len(stays) == 1
+    assert stays.loc[0, 'n_pings'] == n
+
+
+def test_long_segment_matches_sequential_anchor_rule():
+    # Ortak adımlı döngü sınırından uzun, arada yer değiştiren tek bölüm
+    rng = np.random.default_rng(2)
+    n = LOCKSTEP_STEPS * 20
+    step = np.where(rng.random(n) < 0.01, 120.0, rng.uniform(0, 6, n))
+    lat = 41.0 + np.cumsum(step) * METRE_DERECE
+    stays = detect_stay_points(_pings('a', np.arange(n) * 10, lat, np.full(n, 29.0)),
+                               max_distance_m=50, max_gap_s=900)
+
+    starts, anchor = [0], 0
+    for i in range(1, n):
+        if haversine_m(lat[anchor], 29.0, lat[i], 29.0) > 50:
+            starts.append(i)
+            anchor = i
+    assert stays['timestamp'].tolist() == [s * 10 for s in starts]
+    assert len(starts) > 20
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+# Analiz modülü çizim kütüphanelerini modül düzeyinde içe aktarır
+for modul in ("matplotlib", "seaborn", "folium"):
+    pytest.importorskip(modul)
+
+from user_profile_analyzer import FastSpatialSocialAnalyzer, build_user_profiles_out_of_core
+
+
+def _data(tmp_path, n=15_000, n_devices=1_500):
+    rng = np.random.default_rng(3)
+    mekanlar = pd.DataFrame({
+        'MusteriTabelaAdi': [f"m{i}" for i in range(200)],
+        'MapinSegment': rng.choice(['A1R', 'B3B', 'A4H', 'C2R', 'X'], 200),
+        'lat': 41 + rng.random(200) * 0.1,
+        'lng': 29 + rng.random(200) * 0.1,
+    })
+    eslesmeler = pd.DataFrame({
+        'device_aid': pd.Series([f"d{i}" for i in rng.integers(0, n_devices, n)], dtype=object),
+        'gidilen_mekan': [f"m{i}" for i in rng.integers(0, 220, n)],
+        'timestamp': rng.integers(1_600_000_000, 1_700_000_000, n),
+        'mesafe_m': rng.random(n) * 50,
+    })
+    eslesmeler.loc[rng.choice(n, 50, replace=False), 'device_aid'] = None
+    eslesmeler.loc[rng.choice(n, 50, replace=False), 'mesafe_m'] = np.nan
+    path = str(tmp_path / "eslesmeler.parquet")
+    eslesmeler.to_parquet(path)
+    return path, eslesmeler, mekanlar
+
+
+def test_out_of_core_profiles_match_in_memory_profiles(tmp_path):
+    path, eslesmeler, mekanlar = _data(tmp_path)
+    beklenen = FastSpatialSocialAnalyzer(eslesmeler, mekanlar.copy()).create_user_profiles_fast()
+
+    # Küçük bellek bütçesi ara toplamları diske taşımaya zorlar
+    profiller, _, n_rows, _ = build_user_profiles_out_of_core(
+        path, mekanlar, chunk_size=2_000, memory_budget_mb=0.02, spill_dir=str(tmp_path / "spill"))
+    assert n_rows == len(eslesmeler)
+    assert any((tmp_path / "spill").iterdir())
+    pd.testing.assert_frame_equal(profiller.reset_index(drop=True), beklenen.reset_index(drop=True),
+                                  check_dtype=False)
@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+import venue_analyzer
+from venue_analyzer import _score_chunk, _scoring_worker_init, build_venue_catalog, score_activity_file
+
+
+def _catalog():
+    return build_venue_catalog({}, {'kafe': {'type': 'kahve', 'weight': 2.0}})
+
+
+def _activities(tmp_path):
+    path = str(tmp_path / "aktiviteler.csv")
+    pd.DataFrame({'device_aid': ['a', 'a', 'b'], 'gidilen_mekan': ['Kafe', 'Yok', 'kafe']}).to_csv(path, index=False)
+    return path
+
+
+def test_chunk_without_required_columns_is_skipped():
+    _scoring_worker_init(_catalog(), None)
+    partials, n_fuzzy, error = _score_chunk(pd.DataFrame({'device_aid': ['a']}))
+    assert partials is None and n_fuzzy == 0
+    assert 'gidilen_mekan' in error
+
+
+def test_scoring_errors_are_not_swallowed(tmp_path, monkeypatch):
+    path = _activities(tmp_path)
+    results = score_activity_file(path, _catalog(), n_workers=1)
+    assert results.set_index('device_aid')['Kahve_Puani'].to_dict() == {'a': 2.0, 'b': 2.0}
+
+    monkeypatch.setattr(venue_analyzer, 'device_partials', lambda activities: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        score_activity_file(path, _catalog(), n_workers=1)
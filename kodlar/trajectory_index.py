@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DEVICE_COL = "device_aid"
+INDEX_FILE = "_trajectory_index.parquet"
+MANIFEST_FILE = "_trajectory_manifest.json"
+INDEX_COLUMNS = [DEVICE_COL, "file", "row_group", "row_start", "row_count"]
+
+
+def _parquet_files(root):
+    """root altındaki veri dosyaları ('_' ve '.' ile başlayanlar hariç), root'a göre göreli yol"""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(("_", ".")))
+        for name in sorted(filenames):
+            if name.endswith(".parquet") and not name.startswith(("_", ".")):
+                files.append(os.path.relpath(os.path.join(dirpath, name), root))
+    return files
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def index_file(root, rel_path):
+    """Cihaz sıralı tek bir parquet dosyası için (cihaz, row group, satır aralığı) kayıtları"""
+    pf = pq.ParquetFile(os.path.join(root, rel_path))
+    parts = []
+    for rg in range(pf.num_row_groups):
+        ids = pf.read_row_group(rg, columns=[DEVICE_COL]).column(0).to_numpy(zero_copy_only=False)
+        if len(ids) == 0:
+            continue
+        # Sıralı düzende her cihaz row group içinde tek bir ardışık blok oluşturur
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        counts = np.diff(np.r_[starts, len(ids)])
+        parts.append(pd.DataFrame({
+            DEVICE_COL: ids[starts],
+            "file": rel_path,
+            "row_group": np.int32(rg),
+            "row_start": starts.astype(np.int64),
+            "row_count": counts.astype(np.int64),
+        }))
+    if not parts:
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    return pd.concat(parts, ignore_index=True)
+
+
+def build_index(root, verbose=True):
+    """İndeksi artımlı olarak günceller: sadece yeni veya değişen dosyalar yeniden taranır"""
+    index_path = os.path.join(root, INDEX_FILE)
+    manifest_path = os.path.join(root, MANIFEST_FILE)
+
+    manifest = {}
+    entries = None
+    if os.path.exists(index_path) and os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        entries = pd.read_parquet(index_path)
+
+    current = {rel: _file_signature(os.path.join(root, rel)) for rel in _parquet_files(root)}
+    unchanged = {rel for rel, sig in current.items() if manifest.get(rel) == sig}
+    to_index = [rel for rel in current if rel not in unchanged]
+    removed = set(manifest) - set(current)
+
+    if entries is not None:
+        entries = entries[entries["file"].isin(unchanged)]
+    new_parts = [index_file(root, rel) for rel in to_index]
+    frames = [df for df in [entries, *new_parts] if df is not None and len(df) > 0]
+    if frames:
+        entries = pd.concat(frames, ignore_index=True)
+    else:
+        entries = pd.DataFrame(columns=INDEX_COLUMNS)
+    entries = entries.sort_values([DEVICE_COL, "file", "row_group"], kind="stable").reset_index(drop=True)
+
+    # Önce indeks, sonra manifest yazılır; yarıda kalırsa sonraki çalıştırma dosyaları tekrar tarar
+    tmp_index = os.path.join(root, f".{INDEX_FILE}.tmp")
+    pq.write_table(pa.Table.from_pandas(entries, preserve_index=False), tmp_index)
+    os.replace(tmp_index, index_path)
+    tmp_manifest = os.path.join(root, f".{MANIFEST_FILE}.tmp")
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(current, f)
+    os.replace(tmp_manifest, manifest_path)
+
+    if verbose:
+        print(f"İndeks güncellendi: {len(to_index)} dosya tarandı, {len(unchanged)} dosya aynen kaldı, "
+              f"{len(removed)} dosya çıkarıldı ({entries[DEVICE_COL].nunique():,} cihaz)")
+    return entries
+
+
+class TrajectoryIndex:
+    """device_aid -> (dosya, row group, satır aralığı) indeksi ile tek cihaz okuma"""
+
+    def __init__(self, root):
+        self.root = root
+        entries = pd.read_parquet(os.path.join(root, INDEX_FILE))
+        entries = entries.sort_values([DEVICE_COL, "file", "row_group"], kind="stable")
+        devices = entries[DEVICE_COL].to_numpy()
+        starts = np.flatnonzero(np.r_[True, devices[1:] != devices[:-1]]) if len(devices) else np.array([], int)
+
+        # Hash tabanlı pandas Index: cihaz başına O(1) konum araması
+        self._devices = pd.Index(devices[starts])
+        self._offsets = np.r_[starts, len(devices)]
+        self._files = entries["file"].to_numpy()
+        self._row_groups = entries["row_group"].to_numpy()
+        self._row_starts = entries["row_start"].to_numpy()
+        self._row_counts = entries["row_count"].to_numpy()
+        self._handles = {}
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __contains__(self, device_id):
+        return device_id in self._devices
+
+    def _parquet_file(self, rel_path):
+        handle = self._handles.get(rel_path)
+        if handle is None:
+            handle = pq.ParquetFile(os.path.join(self.root, rel_path))
+            self._handles[rel_path] = handle
+        return handle
+
+    def lookup(self, device_id, columns=None):
+        """Tek cihazın trajektorisini DataFrame olarak döndürür (yoksa boş)"""
+        if device_id not in self._devices:
+            return pd.DataFrame(columns=columns or [])
+        pos = self._devices.get_loc(device_id)
+        tables = []
+        for i in range(self._offsets[pos], self._offsets[pos + 1]):
+            pf = self._parquet_file(self._files[i])
+            rg_table = pf.read_row_group(int(self._row_groups[i]), columns=columns)
+            tables.append(rg_table.slice(int(self._row_starts[i]), int(self._row_counts[i])))
+        if len(tables) == 1:
+            return tables[0].to_pandas()
+        # Artımlı eklenen günlük part'lar arasında zaman sırası korunur
+        table = pa.concat_tables(tables)
+        if "timestamp" in table.column_names:
+            table = table.sort_by("timestamp")
+        return table.to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cihaz sıralı parquet verisi için trajektori indeksi")
+    parser.add_argument("komut", choices=["build", "lookup"])
+    parser.add_argument("klasor", help="Cihaz sıralı parquet klasörü (örn. device_store)")
+    parser.add_argument("device_aid", nargs="?", help="lookup için cihaz kimliği")
+    args = parser.parse_args()
+
+    if args.komut == "build":
+        build_index(args.klasor)
+    else:
+        start = time.perf_counter()
+        df = TrajectoryIndex(args.klasor).lookup(args.device_aid)
+        print(df)
+        print(f"{len(df):,} satır, {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,18 +10,275 @@ from tqdm import tqdm
 import time
 import multiprocessing as mp
 from functools import partial
+import glob
+import os
+import shutil
+import tempfile
+
+from match_io import iter_match_chunks, read_matches
+from segment_model import SEGMENT_FEATURES, SegmentModel, name_centroids, profile_chunks
+from spatial_join import grid_density_clusters
 warnings.filterwarnings('ignore')
 
+# create_user_profiles_fast kolon sırası (device_aid hariç)
+PROFILE_COLUMNS = ['total_visits', 'unique_places', 'avg_distance', 'weekend_ratio', 'morning_visits',
+                   'favorite_venue_type', 'high_level_venues', 'quality_A_visits', 'quality_B_visits',
+                   'lat_min', 'lat_max', 'lng_min', 'lng_max', 'bar_pub', 'restaurant', 'hotel',
+                   'afternoon_visits', 'evening_visits', 'most_active_hour']
+
+# MapinSegment'ten çıkan mekan türleri (sıralı: histogram modunda eşitlik en küçük değere gider)
+VENUE_TYPES = ['bar_pub', 'hotel', 'other', 'restaurant']
+# Parça ara toplamlarının birleştirme işlemi (histogram kolonları toplanır)
+PARTIAL_AGGREGATIONS = {
+    'n_rows': 'sum', 'total_visits': 'sum', 'distance_sum': 'sum', 'distance_count': 'sum',
+    'weekend_visits': 'sum', 'morning_visits': 'sum', 'afternoon_visits': 'sum', 'evening_visits': 'sum',
+    'high_level_venues': 'sum', 'quality_A_visits': 'sum', 'quality_B_visits': 'sum',
+    'lat_min': 'min', 'lat_max': 'max', 'lng_min': 'min', 'lng_max': 'max'
+}
+
+def _group_mode(group_codes, values, groups, default):
+    """Grup başına en sık değer; eşitlikte en küçük değer, değeri olmayan grupta default.
+
+    group_codes: her satırın ``groups`` içindeki konumu (-1: grupsuz satır).
+    """
+    valid = (group_codes >= 0) & values.notna().to_numpy()
+    value_codes, uniques = pd.factorize(values[valid], sort=True)
+    n_values = max(len(uniques), 1)
+    
+    # (grup, değer) çiftlerinin sayımı; sıralama grup, azalan sayı, artan değer
+    pairs, counts = np.unique(group_codes[valid].astype(np.int64) * n_values + value_codes, return_counts=True)
+    pair_groups, pair_values = pairs // n_values, pairs % n_values
+    order = np.lexsort((pair_values, -counts, pair_groups))
+    pair_groups, pair_values = pair_groups[order], pair_values[order]
+    first = np.r_[True, pair_groups[1:] != pair_groups[:-1]] if len(pair_groups) else np.zeros(0, dtype=bool)
+    
+    modes = pd.Series(default, index=groups, dtype=object)
+    modes.iloc[pair_groups[first]] = np.asarray(uniques)[pair_values[first]]
+    return modes.infer_objects()
+
+def enrich_matches(eslesmeler, mekanlar):
+    """Zaman özellikleri eklenmiş ve MapinSegment'i çözülmüş mekan bilgileriyle birleştirilmiş yeni tablo
+    (eslesmeler değiştirilmez)"""
+    timestamps = pd.to_datetime(eslesmeler['timestamp'], unit='s')
+    day_of_week = timestamps.dt.dayofweek
+    return eslesmeler.assign(
+        hour=timestamps.dt.hour,
+        day_of_week=day_of_week,
+        is_weekend=day_of_week.isin([5, 6]),
+    ).merge(
+        mekanlar[['MusteriTabelaAdi', 'venue_type', 'venue_level', 'venue_quality', 'lat', 'lng']],
+        left_on='gidilen_mekan',
+        right_on='MusteriTabelaAdi',
+        how='left'
+    )
+
+def _finalize_profiles(user_stats):
+    """Cihaz bazında toplanmış istatistiklerden profil tablosu ve türetilmiş özellikler.
+
+    user_stats: device_aid indeksli, PROFILE_COLUMNS ve has_venue_type kolonlarını içerir.
+    Bellekte ve parça parça (out-of-core) profil üretimi bu adımı paylaşır.
+    """
+    # Mekan türü olmayan cihazların tür sayıları boş kalır (eski unstack + join davranışı)
+    no_venue_type = ~user_stats['has_venue_type'].astype(bool)
+    user_stats = user_stats[PROFILE_COLUMNS]
+    if no_venue_type.any():
+        user_stats = user_stats.copy()
+        user_stats[['bar_pub', 'restaurant', 'hotel']] = (
+            user_stats[['bar_pub', 'restaurant', 'hotel']].astype(float).mask(no_venue_type, axis=0))
+    
+    user_profiles = user_stats.reset_index()
+    
+    # Türetilmiş özellikler
+    user_profiles['travel_radius'] = np.sqrt(
+        (user_profiles['lat_max'] - user_profiles['lat_min'])**2 + 
+        (user_profiles['lng_max'] - user_profiles['lng_min'])**2
+    ) * 111000
+    
+    # Venue type diversity
+    user_profiles['venue_type_diversity'] = (
+        (user_profiles[['bar_pub', 'restaurant', 'hotel']] > 0).sum(axis=1)
+    )
+    
+    # Zenginlik skoru - vectorized
+    print("  • Zenginlik skorları hesaplanıyor...")
+    wealth_scores = (
+        user_profiles['quality_A_visits'] * 15 + 
+        user_profiles['quality_B_visits'] * 8 + 
+        user_profiles['high_level_venues'] * 10 + 
+        user_profiles['hotel'] * 12 + 
+        user_profiles['bar_pub'] * 3 + 
+        user_profiles['restaurant'] * 5 + 
+        user_profiles['unique_places'] * 2 + 
+        np.minimum(user_profiles['travel_radius'] / 1000, 30) + 
+        user_profiles['evening_visits'] * 1.5
+    )
+    user_profiles['wealth_score'] = np.minimum(wealth_scores, 100)
+    return user_profiles
+
+def _device_partials(data):
+    """Tek parçanın cihaz bazında birleştirilebilir ara toplamları (sayım, toplam, min/max, histogram)"""
+    hour = data['hour']
+    features = pd.DataFrame({
+        'device_aid': data['device_aid'],
+        'n_rows': 1,
+        'total_visits': data['gidilen_mekan'].notna(),
+        'distance_sum': data['mesafe_m'].fillna(0.0),
+        'distance_count': data['mesafe_m'].notna(),
+        'weekend_visits': data['is_weekend'].astype(bool),
+        'morning_visits': hour < 12,
+        'afternoon_visits': (hour >= 12) & (hour < 18),
+        'evening_visits': hour >= 18,
+        'high_level_venues': data['venue_level'] >= 3,
+        'quality_A_visits': data['venue_quality'] == 'A',
+        'quality_B_visits': data['venue_quality'] == 'B',
+        'lat_min': data['lat'],
+        'lat_max': data['lat'],
+        'lng_min': data['lng'],
+        'lng_max': data['lng']
+    })
+    grouped = features.groupby('device_aid', sort=False)
+    partials = grouped.agg({col: PARTIAL_AGGREGATIONS[col] for col in features.columns if col != 'device_aid'})
+    
+    # Saat ve mekan türü histogramları: (cihaz, değer) kodları üzerinden tek bincount
+    # (device_aid'i boş satırların ngroup kodu NaN'dır; -1 yapılıp dışarıda bırakılır)
+    device_codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    n_devices = len(partials)
+    for prefix, codes, n_values in [('hour_', hour.to_numpy(dtype=float), 24),
+                                    ('type_', pd.Index(VENUE_TYPES).get_indexer(data['venue_type']), len(VENUE_TYPES))]:
+        valid = (device_codes >= 0) & (codes >= 0)
+        histogram = np.bincount(device_codes[valid] * n_values + codes[valid].astype(np.int64),
+                                minlength=n_devices * n_values).reshape(n_devices, n_values)
+        labels = [f"{h:02d}" for h in range(24)] if prefix == 'hour_' else VENUE_TYPES
+        for j, label in enumerate(labels):
+            partials[prefix + label] = histogram[:, j]
+    return partials
+
+def _merge_partials(frames):
+    """Aynı cihazın farklı parçalardaki ara toplamlarını birleştirir"""
+    merged = pd.concat(frames)
+    return merged.groupby(level=0, sort=False).agg({col: PARTIAL_AGGREGATIONS.get(col, 'sum') for col in merged.columns})
+
+def _partials_to_stats(partials, place_pairs):
+    """Birleştirilmiş ara toplamlar ve farklı (cihaz, mekan) çiftlerinden _finalize_profiles girdisi"""
+    hour_hist = partials[[f"hour_{h:02d}" for h in range(24)]].to_numpy()
+    type_hist = partials[[f"type_{t}" for t in VENUE_TYPES]].to_numpy()
+    
+    stats = pd.DataFrame(index=partials.index)
+    stats['total_visits'] = partials['total_visits']
+    stats['unique_places'] = place_pairs.groupby('device_aid').size().reindex(partials.index, fill_value=0)
+    stats['avg_distance'] = partials['distance_sum'] / partials['distance_count'].where(partials['distance_count'] > 0)
+    stats['weekend_ratio'] = partials['weekend_visits'] / partials['n_rows']
+    for col in ['morning_visits', 'high_level_venues', 'quality_A_visits', 'quality_B_visits',
+                'lat_min', 'lat_max', 'lng_min', 'lng_max', 'afternoon_visits', 'evening_visits']:
+        stats[col] = partials[col]
+    for venue_type in ['bar_pub', 'restaurant', 'hotel']:
+        stats[venue_type] = partials[f"type_{venue_type}"]
+    
+    # Mod: histogramda ilk en büyük sütun = eşitlikte en küçük değer (mode().iloc[0] ile aynı)
+    stats['favorite_venue_type'] = np.where(type_hist.sum(axis=1) > 0,
+                                            np.asarray(VENUE_TYPES, dtype=object)[type_hist.argmax(axis=1)], 'unknown')
+    stats['most_active_hour'] = np.where(hour_hist.sum(axis=1) > 0, hour_hist.argmax(axis=1), 12)
+    stats['has_venue_type'] = type_hist.sum(axis=1) > 0
+    return stats
+
+class DeviceProfileAccumulator:
+    """Eşleşme parçalarından cihaz profili ara toplamlarını biriktirir.
+
+    Ara toplamlar bellekte birleştirilir; birleştirilmiş durum ``memory_budget_mb``'ı aşarsa
+    cihaz hash'ine göre ``n_buckets`` kovaya bölünüp ``spill_dir`` altına parquet olarak
+    yazılır. ``profiles()`` her kovayı ayrı birleştirir; bellek tek kovanın boyutuyla sınırlıdır.
+    Farklı mekanlar (``venues``) taşmadan bağımsız olarak bellekte tutulur.
+    """
+    
+    def __init__(self, memory_budget_mb=1024, spill_dir=None, n_buckets=32):
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.n_buckets = n_buckets
+        self._own_spill_dir = spill_dir is None
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="profil_spill_")
+        self.n_rows = 0
+        self.n_spills = 0
+        self.venues = set()
+        self._partials, self._pairs, self._bytes = [], [], 0
+    
+    def add(self, enriched_chunk):
+        partials = _device_partials(enriched_chunk)
+        pairs = enriched_chunk[['device_aid', 'gidilen_mekan']].dropna().drop_duplicates()
+        self._partials.append(partials)
+        self._pairs.append(pairs)
+        self._bytes += partials.memory_usage(deep=True).sum() + pairs.memory_usage(deep=True).sum()
+        self.n_rows += len(enriched_chunk)
+        self.venues.update(enriched_chunk['gidilen_mekan'].dropna().unique())
+        if self._bytes > self.memory_budget:
+            self._compact()
+    
+    def _merged_state(self):
+        partials = _merge_partials(self._partials)
+        pairs = pd.concat(self._pairs, ignore_index=True).drop_duplicates()
+        return partials, pairs
+    
+    def _compact(self):
+        partials, pairs = self._merged_state()
+        size = partials.memory_usage(deep=True).sum() + pairs.memory_usage(deep=True).sum()
+        # Birleştirme bütçenin yarısına inmiyorsa durum diske taşınır
+        if size > self.memory_budget / 2:
+            self._spill(partials, pairs)
+            self._partials, self._pairs, self._bytes = [], [], 0
+        else:
+            self._partials, self._pairs, self._bytes = [partials], [pairs], size
+    
+    def _bucket_of(self, devices):
+        return (pd.util.hash_array(np.asarray(devices, dtype=object)) % self.n_buckets).astype(np.int64)
+    
+    def _spill(self, partials, pairs):
+        for name, frame, buckets in [('partials', partials.rename_axis('device_aid').reset_index(),
+                                      self._bucket_of(partials.index)),
+                                     ('pairs', pairs, self._bucket_of(pairs['device_aid']))]:
+            for bucket in np.unique(buckets):
+                bucket_dir = os.path.join(self.spill_dir, f"bucket-{bucket:03d}")
+                os.makedirs(bucket_dir, exist_ok=True)
+                frame[buckets == bucket].to_parquet(
+                    os.path.join(bucket_dir, f"{name}-{self.n_spills:05d}.parquet"), index=False)
+        self.n_spills += 1
+    
+    def profiles(self):
+        """Tüm cihazların profil tablosu (device_aid sıralı, create_user_profiles_fast ile aynı kolonlar)"""
+        try:
+            if self.n_spills == 0:
+                if not self._partials:
+                    return None
+                stats = _partials_to_stats(*self._merged_state())
+            else:
+                if self._partials:
+                    self._spill(*self._merged_state())
+                    self._partials, self._pairs, self._bytes = [], [], 0
+                print(f"  • {self.n_spills} taşma, {self.n_buckets} kova birleştiriliyor...")
+                bucket_stats = []
+                for bucket_dir in sorted(glob.glob(os.path.join(self.spill_dir, "bucket-*"))):
+                    partials = _merge_partials([
+                        pd.read_parquet(path).set_index('device_aid')
+                        for path in sorted(glob.glob(os.path.join(bucket_dir, "partials-*.parquet")))])
+                    pairs = pd.concat([pd.read_parquet(path)
+                                       for path in sorted(glob.glob(os.path.join(bucket_dir, "pairs-*.parquet")))],
+                                      ignore_index=True).drop_duplicates()
+                    bucket_stats.append(_partials_to_stats(partials, pairs))
+                stats = pd.concat(bucket_stats)
+            return _finalize_profiles(stats.sort_index().rename_axis('device_aid'))
+        finally:
+            if self._own_spill_dir:
+                shutil.rmtree(self.spill_dir, ignore_errors=True)
+
 class FastSpatialSocialAnalyzer:
     def __init__(self, eslesmeler_df, mekanlar_df):
         print("🚀 Hızlı analiz başlatılıyor...")
         self.eslesmeler = eslesmeler_df.copy()
         self.mekanlar = mekanlar_df.copy()
         self.user_profiles = None
+        self.segment_model = None
         self.enriched_data = None
         self._prepare_data_fast()
         
-    def _parse_mapin_segment_vectorized(self, segments):
+    @staticmethod
+    def _parse_mapin_segment_vectorized(segments):
         """Vektörize edilmiş MapinSegment parsing - çok daha hızlı"""
         segments = segments.fillna('').astype(str).str.upper()
         
@@ -51,112 +308,108 @@ class FastSpatialSocialAnalyzer:
             self.mekanlar['venue_level'] = levels  
             self.mekanlar['venue_quality'] = qualities
         
-        # Zaman özellikleri - vectorized
-        print("  • Zaman özellikleri hesaplanıyor...")
-        timestamps = pd.to_datetime(self.eslesmeler['timestamp'], unit='s')
-        self.eslesmeler['hour'] = timestamps.dt.hour
-        self.eslesmeler['day_of_week'] = timestamps.dt.dayofweek
-        self.eslesmeler['is_weekend'] = self.eslesmeler['day_of_week'].isin([5, 6])
-        
-        # Verileri birleştir
-        print("  • Veriler birleştiriliyor...")
-        self.enriched_data = self.eslesmeler.merge(
-            self.mekanlar[['MusteriTabelaAdi', 'venue_type', 'venue_level', 'venue_quality', 'lat', 'lng']], 
-            left_on='gidilen_mekan', 
-            right_on='MusteriTabelaAdi', 
-            how='left'
-        )
+        # Zaman özellikleri ve mekan bilgileriyle birleştirme - vectorized
+        print("  • Zaman özellikleri hesaplanıyor ve veriler birleştiriliyor...")
+        self.enriched_data = enrich_matches(self.eslesmeler, self.mekanlar)
         print("✅ Veri hazırlama tamamlandı!")
         
     def create_user_profiles_fast(self):
         """Hızlandırılmış kullanıcı profilleri - Pandas groupby kullanarak"""
         print("👥 Kullanıcı profilleri oluşturuluyor (hızlı mod)...")
         
-        # Tüm hesaplamaları tek seferde groupby ile yap
-        user_stats = self.enriched_data.groupby('device_aid').agg({
-            'gidilen_mekan': ['count', 'nunique'],  # total_visits, unique_places
-            'mesafe_m': 'mean',  # avg_distance
-            'is_weekend': 'mean',  # weekend_ratio
-            'hour': lambda x: (x < 12).sum(),  # morning_visits (afternoon/evening ayrı hesaplanacak)
-            'venue_type': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else 'unknown',
-            'venue_level': lambda x: (x >= 3).sum(),  # high_level_venues
-            'venue_quality': [lambda x: (x == 'A').sum(), lambda x: (x == 'B').sum()],
-            'lat': ['min', 'max'],
-            'lng': ['min', 'max']
+        data = self.enriched_data
+        hour = data['hour']
+        
+        # Lambda yerine önceden hesaplanmış bool kolonlar; tüm sayımlar yerleşik 'sum' ile yapılır
+        features = pd.DataFrame({
+            'device_aid': data['device_aid'],
+            'gidilen_mekan': data['gidilen_mekan'],
+            'mesafe_m': data['mesafe_m'],
+            'is_weekend': data['is_weekend'],
+            'morning': hour < 12,
+            'afternoon': (hour >= 12) & (hour < 18),
+            'evening': hour >= 18,
+            'high_level': data['venue_level'] >= 3,
+            'quality_A': data['venue_quality'] == 'A',
+            'quality_B': data['venue_quality'] == 'B',
+            'lat': data['lat'],
+            'lng': data['lng']
         })
+        for venue_type in ['bar_pub', 'restaurant', 'hotel']:
+            features[venue_type] = data['venue_type'] == venue_type
+        features['has_venue_type'] = data['venue_type'].notna()
         
-        # Column names düzelt
-        user_stats.columns = ['total_visits', 'unique_places', 'avg_distance', 'weekend_ratio', 
-                             'morning_visits', 'favorite_venue_type', 'high_level_venues',
-                             'quality_A_visits', 'quality_B_visits', 'lat_min', 'lat_max', 'lng_min', 'lng_max']
-        
-        # Venue type counts - ayrı hesapla
-        venue_counts = self.enriched_data.groupby(['device_aid', 'venue_type']).size().unstack(fill_value=0)
-        venue_counts = venue_counts.reindex(columns=['bar_pub', 'restaurant', 'hotel'], fill_value=0)
-        
-        # Hour-based visits
-        hour_stats = self.enriched_data.groupby('device_aid')['hour'].agg([
-            lambda x: ((x >= 12) & (x < 18)).sum(),  # afternoon
-            lambda x: (x >= 18).sum(),  # evening  
-            lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else 12  # most_active_hour
-        ])
-        hour_stats.columns = ['afternoon_visits', 'evening_visits', 'most_active_hour']
-        
-        # Tüm dataframeleri birleştir
-        self.user_profiles = user_stats.join([venue_counts, hour_stats])
-        self.user_profiles = self.user_profiles.reset_index()
-        
-        # Türetilmiş özellikler
-        self.user_profiles['travel_radius'] = np.sqrt(
-            (self.user_profiles['lat_max'] - self.user_profiles['lat_min'])**2 + 
-            (self.user_profiles['lng_max'] - self.user_profiles['lng_min'])**2
-        ) * 111000
-        
-        # Venue type diversity
-        self.user_profiles['venue_type_diversity'] = (
-            (self.user_profiles[['bar_pub', 'restaurant', 'hotel']] > 0).sum(axis=1)
+        # Tüm hesaplamaları tek seferde groupby ile yap
+        grouped = features.groupby('device_aid')
+        user_stats = grouped.agg(
+            total_visits=('gidilen_mekan', 'count'),
+            unique_places=('gidilen_mekan', 'nunique'),
+            avg_distance=('mesafe_m', 'mean'),
+            weekend_ratio=('is_weekend', 'mean'),
+            morning_visits=('morning', 'sum'),
+            high_level_venues=('high_level', 'sum'),
+            quality_A_visits=('quality_A', 'sum'),
+            quality_B_visits=('quality_B', 'sum'),
+            lat_min=('lat', 'min'),
+            lat_max=('lat', 'max'),
+            lng_min=('lng', 'min'),
+            lng_max=('lng', 'max'),
+            bar_pub=('bar_pub', 'sum'),
+            restaurant=('restaurant', 'sum'),
+            hotel=('hotel', 'sum'),
+            has_venue_type=('has_venue_type', 'any'),
+            afternoon_visits=('afternoon', 'sum'),
+            evening_visits=('evening', 'sum')
         )
         
-        # Zenginlik skoru - vectorized
-        print("  • Zenginlik skorları hesaplanıyor...")
-        wealth_scores = (
-            self.user_profiles['quality_A_visits'] * 15 + 
-            self.user_profiles['quality_B_visits'] * 8 + 
-            self.user_profiles['high_level_venues'] * 10 + 
-            self.user_profiles['hotel'] * 12 + 
-            self.user_profiles['bar_pub'] * 3 + 
-            self.user_profiles['restaurant'] * 5 + 
-            self.user_profiles['unique_places'] * 2 + 
-            np.minimum(self.user_profiles['travel_radius'] / 1000, 30) + 
-            self.user_profiles['evening_visits'] * 1.5
-        )
-        self.user_profiles['wealth_score'] = np.minimum(wealth_scores, 100)
+        # Mod değerleri tek sıralı (cihaz, değer) sayımından; eşitlikte en küçük değer (mode().iloc[0] gibi)
+        device_codes = grouped.ngroup().to_numpy()
+        user_stats['favorite_venue_type'] = _group_mode(device_codes, data['venue_type'], user_stats.index, 'unknown')
+        user_stats['most_active_hour'] = _group_mode(device_codes, hour, user_stats.index, 12)
+        
+        self.user_profiles = _finalize_profiles(user_stats)
         
         print("✅ Kullanıcı profilleri tamamlandı!")
         return self.user_profiles
         
-    def segment_users_fast(self, n_clusters=5):
-        """Hızlandırılmış segmentasyon"""
+    def segment_users_fast(self, n_clusters=5, engine="minibatch", model_path=None, refit=False):
+        """Hızlandırılmış segmentasyon.
+
+        engine="minibatch": SegmentModel (artımlı ölçekleyici + MiniBatchKMeans) profilleri parça
+        parça eğitir. model_path verilirse ve dosya varsa model yüklenip sadece atama yapılır
+        (refit=True yeniden eğitir); yeni eğitilen model bu dosyaya kaydedilir.
+        engine="kmeans": eski yöntem, tüm profiller üzerinde KMeans(n_init=10).
+        Her iki durumda segment adları merkezlerin profiline göre verilir (etiket sırasından bağımsız).
+        """
         print("🎯 Kullanıcı segmentasyonu yapılıyor...")
         
         if self.user_profiles is None:
             self.create_user_profiles_fast()
         
-        features = ['total_visits', 'unique_places', 'weekend_ratio', 
-                   'travel_radius', 'wealth_score', 'venue_type_diversity',
-                   'bar_pub', 'restaurant', 'hotel',
-                   'quality_A_visits', 'high_level_venues']
+        if engine == "kmeans":
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(self.user_profiles[SEGMENT_FEATURES].fillna(0))
+            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10).fit(X_scaled)
+            order, names = name_centroids(kmeans.cluster_centers_)
+            segment_of_label = np.empty(n_clusters, dtype=np.int64)
+            segment_of_label[order] = np.arange(n_clusters)
+            segments = segment_of_label[kmeans.labels_]
+            segment_names = np.asarray(names, dtype=object)[segments]
+        elif engine == "minibatch":
+            if model_path is not None and os.path.exists(model_path) and not refit:
+                self.segment_model = SegmentModel.load(model_path)
+                print(f"  • Kayıtlı model kullanılıyor: {model_path} ({len(self.segment_model.names_)} segment)")
+            else:
+                self.segment_model = SegmentModel(n_clusters=n_clusters).fit(profile_chunks(self.user_profiles))
+                if model_path is not None:
+                    self.segment_model.save(model_path)
+                    print(f"  • Model kaydedildi: {model_path}")
+            segments, segment_names = self.segment_model.assign(self.user_profiles)
+        else:
+            raise ValueError(f"Bilinmeyen segmentasyon motoru: {engine} (seçenekler: minibatch, kmeans)")
         
-        X = self.user_profiles[features].fillna(0)
-        X_scaled = StandardScaler().fit_transform(X)
-        
-        segments = KMeans(n_clusters=n_clusters, random_state=42, n_init=10).fit_predict(X_scaled)
         self.user_profiles['segment'] = segments
-        
-        segment_names = {0: "Casual Diners", 1: "Bar Hoppers", 2: "Fine Diners",
-                        3: "Hotel Guests", 4: "Local Explorers"}
-        
-        self.user_profiles['segment_name'] = self.user_profiles['segment'].map(segment_names)
+        self.user_profiles['segment_name'] = segment_names
         
         print("✅ Segmentasyon tamamlandı!")
         return self.user_profiles['segment_name'].value_counts()
@@ -222,35 +475,60 @@ class FastSpatialSocialAnalyzer:
         print("✅ Zaman analizi tamamlandı!")
         return result
     
-    def find_hotspots_fast(self, radius_km=0.5):
-        """Hızlandırılmış hotspot analizi"""
+    def find_hotspots_fast(self, radius_km=0.5, engine="grid", min_samples=3, weight="total_visits"):
+        """Hızlandırılmış hotspot analizi.
+
+        engine="grid": ziyaretler konumlarıyla metrik grid hücrelerine yerleştirilir; radius_km
+        içindeki toplam ``weight`` (total_visits, unique_users veya None: konum sayısı) en az
+        min_samples olan yoğun hücreler bağlı bileşenlerle birleştirilir, yakındaki seyrek
+        konumlar sınır noktası olarak katılır (neredeyse doğrusal).
+        engine="dbscan": eski yöntem; derece*111 koordinatlarda ağırlıksız DBSCAN (boylam ölçeği bozuk).
+        """
         print("🔥 Hotspot analizi yapılıyor...")
         
-        # Koordinat bazlı groupby - tek seferde
-        coords_density = self.enriched_data.groupby(['lat', 'lng', 'MusteriTabelaAdi']).agg({
-            'device_aid': 'nunique',
-            'timestamp': 'count',
-            'venue_type': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else 'unknown',
-            'venue_quality': lambda x: (x == 'A').sum()
-        }).reset_index()
-        
-        coords_density.columns = ['lat', 'lng', 'venue_name', 'unique_users', 'total_visits', 'dominant_type', 'quality_A_count']
-        
-        # DBSCAN - sadece gerekli veri ile
-        coords_km = coords_density[['lat', 'lng']].values * 111
-        clusters = DBSCAN(eps=radius_km, min_samples=3, n_jobs=-1).fit_predict(coords_km)
+        # Koordinat bazlı groupby - tek seferde, Python lambda'sı olmadan
+        features = self.enriched_data[['lat', 'lng', 'MusteriTabelaAdi', 'device_aid', 'timestamp']].assign(
+            quality_A=self.enriched_data['venue_quality'] == 'A')
+        grouped = features.groupby(['lat', 'lng', 'MusteriTabelaAdi'])
+        coords_density = grouped.agg(
+            unique_users=('device_aid', 'nunique'),
+            total_visits=('timestamp', 'count'),
+            quality_A_count=('quality_A', 'sum'),
+        )
+        coords_density['dominant_type'] = _group_mode(grouped.ngroup().to_numpy(), self.enriched_data['venue_type'],
+                                                      coords_density.index, 'unknown').to_numpy()
+        coords_density = coords_density.reset_index()
+        coords_density.columns = ['lat', 'lng', 'venue_name', 'unique_users', 'total_visits', 'quality_A_count', 'dominant_type']
+        coords_density = coords_density[['lat', 'lng', 'venue_name', 'unique_users', 'total_visits', 'dominant_type', 'quality_A_count']]
+        
+        if engine == "grid":
+            weights = None if weight is None else coords_density[weight]
+            clusters = grid_density_clusters(coords_density['lat'], coords_density['lng'],
+                                             radius_km * 1000, min_points=min_samples, weights=weights)
+        elif engine == "dbscan":
+            coords_km = coords_density[['lat', 'lng']].values * 111
+            clusters = DBSCAN(eps=radius_km, min_samples=min_samples, n_jobs=-1).fit_predict(coords_km)
+        else:
+            raise ValueError(f"Bilinmeyen hotspot motoru: {engine} (seçenekler: grid, dbscan)")
         coords_density['hotspot_cluster'] = clusters
         
-        # Hotspot aggregation
-        hotspots = coords_density[coords_density['hotspot_cluster'] != -1].groupby('hotspot_cluster').agg({
-            'lat': 'mean',
-            'lng': 'mean', 
-            'venue_name': lambda x: ', '.join(x.unique()),
-            'unique_users': 'sum',
-            'total_visits': 'sum',
-            'dominant_type': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else 'mixed',
-            'quality_A_count': 'sum'
-        }).sort_values('total_visits', ascending=False)
+        # Hotspot aggregation - küme başına lambda yerine yerleşik indirgemeler
+        located = coords_density[coords_density['hotspot_cluster'] != -1]
+        by_cluster = located.groupby('hotspot_cluster')
+        hotspots = by_cluster.agg(
+            lat=('lat', 'mean'),
+            lng=('lng', 'mean'),
+            unique_users=('unique_users', 'sum'),
+            total_visits=('total_visits', 'sum'),
+            quality_A_count=('quality_A_count', 'sum'),
+        )
+        # Küme içindeki farklı adlar ilk görülme sırasıyla birleştirilir
+        hotspots['venue_name'] = located.drop_duplicates(['hotspot_cluster', 'venue_name']).groupby(
+            'hotspot_cluster')['venue_name'].agg(', '.join)
+        hotspots['dominant_type'] = _group_mode(by_cluster.ngroup().to_numpy(), located['dominant_type'],
+                                                hotspots.index, 'mixed').to_numpy()
+        hotspots = hotspots[['lat', 'lng', 'venue_name', 'unique_users', 'total_visits', 'dominant_type',
+                             'quality_A_count']].sort_values('total_visits', ascending=False)
         
         print("✅ Hotspot analizi tamamlandı!")
         return hotspots
@@ -286,8 +564,9 @@ class FastSpatialSocialAnalyzer:
         print("✅ Harita oluşturuldu!")
         return m
     
-    def comprehensive_analysis_fast(self):
-        """Hızlandırılmış kapsamlı analiz"""
+    def comprehensive_analysis_fast(self, user_profiles=None, segment_model_path=None):
+        """Hızlandırılmış kapsamlı analiz (user_profiles verilirse profil adımı atlanır,
+        segment_model_path varsa segmentler kayıtlı modelle atanır)"""
         print("\n" + "="*60)
         print("🚀 HIZLI KAPSAMLI ANALİZ BAŞLIYOR")
         print("="*60)
@@ -296,10 +575,13 @@ class FastSpatialSocialAnalyzer:
         
         # Paralel olmayan ama optimize edilmiş işlemler
         print("📈 İlerleme: 20% - Kullanıcı Profilleri")
-        self.create_user_profiles_fast()
+        if user_profiles is not None:
+            self.user_profiles = user_profiles
+        else:
+            self.create_user_profiles_fast()
         
         print("📈 İlerleme: 40% - Kullanıcı Segmentasyonu") 
-        segments = self.segment_users_fast()
+        segments = self.segment_users_fast(model_path=segment_model_path)
         
         print("📈 İlerleme: 60% - Mekan Analizi")
         venue_analysis = self.analyze_venues_fast()
@@ -352,8 +634,52 @@ class FastSpatialSocialAnalyzer:
             'duration': duration
         }
 
-def run_fast_analysis(eslesmeler_path, mekanlar_path):
-    """Hızlı analiz çalıştır"""
+def build_user_profiles_out_of_core(eslesmeler_path, mekanlar, chunk_size=500_000, memory_budget_mb=1024,
+                                    spill_dir=None, sample_size=100_000, seed=42):
+    """Eşleşme dosyasının tamamından, parça parça okuyarak tüm cihazların profillerini üretir.
+
+    Dönüş: (profiller, satır düzeyindeki analizler için sample_size satırlık düzgün örneklem,
+    toplam satır sayısı, farklı mekan sayısı). Dosyada satır yoksa profiller ve örneklem None'dır.
+    Örneklem her satıra rastgele anahtar verip en küçük anahtarları
+    tutarak seçilir; dosyanın tamamı belleğe alınmaz.
+    """
+    mekanlar = mekanlar.copy()
+    if 'MapinSegment' in mekanlar.columns:
+        venue_types, levels, qualities = FastSpatialSocialAnalyzer._parse_mapin_segment_vectorized(mekanlar['MapinSegment'])
+        mekanlar['venue_type'] = venue_types
+        mekanlar['venue_level'] = levels
+        mekanlar['venue_quality'] = qualities
+    
+    rng = np.random.default_rng(seed)
+    accumulator = DeviceProfileAccumulator(memory_budget_mb, spill_dir)
+    sample, sample_keys = None, None
+    for chunk in tqdm(iter_match_chunks(eslesmeler_path, chunk_size), desc="Eşleşme parçaları"):
+        if chunk.empty:
+            continue
+        keys = rng.random(len(chunk))
+        if sample is None:
+            sample, sample_keys = chunk, keys
+        else:
+            sample, sample_keys = pd.concat([sample, chunk], ignore_index=True), np.r_[sample_keys, keys]
+        if len(sample) > sample_size:
+            keep = np.sort(np.argpartition(sample_keys, sample_size)[:sample_size])
+            sample, sample_keys = sample.iloc[keep].reset_index(drop=True), sample_keys[keep]
+        accumulator.add(enrich_matches(chunk, mekanlar))
+    
+    if accumulator.n_spills:
+        print(f"  • Bellek bütçesi ({memory_budget_mb} MB) aşıldı, ara toplamlar diske taşındı")
+    return accumulator.profiles(), sample, accumulator.n_rows, len(accumulator.venues)
+
+def run_fast_analysis(eslesmeler_path, mekanlar_path, out_of_core=True, chunk_size=500_000,
+                      memory_budget_mb=1024, sample_size=100_000, segment_model_path=None):
+    """Hızlı analiz çalıştır.
+
+    out_of_core=True iken kullanıcı profilleri, zenginlik skorları ve segmentler eşleşme
+    dosyasının tamamından parça parça üretilir; mekan, zaman, hotspot ve harita analizleri
+    sample_size satırlık düzgün örneklem üzerinde çalışır. out_of_core=False iken dosyanın
+    tamamı belleğe okunur. Eşleşme dosyası boşsa analiz yapılmaz ve None döner. segment_model_path verilirse segment modeli ilk çalıştırmada
+    eğitilip kaydedilir, sonraki çalıştırmalarda yeniden eğitilmeden kullanılır.
+    """
     print("⚡ HIZLI ANALİZ MODU")
     print("="*50)
     
@@ -361,22 +687,33 @@ def run_fast_analysis(eslesmeler_path, mekanlar_path):
     
     # Veri yükleme
     print("📂 Veriler yükleniyor...")
-    eslesmeler = pd.read_csv(eslesmeler_path)
     mekanlar = pd.read_csv(mekanlar_path)
-    
-    # Büyük veri setleri için sampling
-    if len(eslesmeler) > 100000:
-        print(f"⚠️  Büyük veri seti tespit edildi ({len(eslesmeler):,} satır)")
-        sample_size = min(100000, len(eslesmeler))
-        eslesmeler = eslesmeler.sample(sample_size)
-        print(f"🔀 {sample_size:,} satır örneklem alındı")
-    
-    print(f"  ✅ Eşleşmeler: {len(eslesmeler):,} satır")
+    user_profiles = None
+    if out_of_core:
+        print(f"  • Parça parça okuma: {chunk_size:,} satırlık parçalar, {memory_budget_mb} MB bellek bütçesi")
+        user_profiles, eslesmeler, n_rows, n_venues = build_user_profiles_out_of_core(
+            eslesmeler_path, mekanlar, chunk_size, memory_budget_mb, sample_size=sample_size)
+        if user_profiles is None:
+            print(f"❌ Eşleşme dosyasında satır yok: {eslesmeler_path}")
+            return None
+        print(f"  ✅ Eşleşmeler: {n_rows:,} satır, {len(user_profiles):,} cihaz profili")
+        if n_rows > len(eslesmeler):
+            print(f"  • Satır düzeyindeki analizler için {len(eslesmeler):,} satır örneklem alındı")
+    else:
+        eslesmeler = read_matches(eslesmeler_path)
+        n_rows = len(eslesmeler)
+        if n_rows == 0:
+            print(f"❌ Eşleşme dosyasında satır yok: {eslesmeler_path}")
+            return None
+        print(f"  ✅ Eşleşmeler: {len(eslesmeler):,} satır")
     print(f"  ✅ Mekanlar: {len(mekanlar):,} satır")
     
     # Analiz 
     analyzer = FastSpatialSocialAnalyzer(eslesmeler, mekanlar)
-    results = analyzer.comprehensive_analysis_fast()
+    results = analyzer.comprehensive_analysis_fast(user_profiles=user_profiles, segment_model_path=segment_model_path)
+    results['summary']['total_visits'] = n_rows
+    if out_of_core:
+        results['summary']['unique_venues'] = n_venues
     
     # Hızlı kaydetme
     print("\n💾 Sonuçlar kaydediliyor...")
@@ -417,4 +754,4 @@ def run_fast_analysis(eslesmeler_path, mekanlar_path):
     return results
 
 if __name__ == "__main__":
-    results = run_fast_analysis("eslesmeler.csv", "maindataplaces.csv")
\ No newline at end of file
+    results = run_fast_analysis("eslesmeler.parquet", "maindataplaces.csv")
\ No newline at end of file
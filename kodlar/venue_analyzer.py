@@ -1,16 +1,24 @@
 import pandas as pd
 import numpy as np
+import hashlib
+import json
+import multiprocessing as mp
 import os
 import re
+import pyarrow as pa
+import pyarrow.parquet as pq
 from tqdm import tqdm
 
+from match_io import iter_match_chunks
+from venue_fuzzy import VenueNameIndex
+
 # --- Ayarlar Başlangıcı ---
 
 # 0. VERİ DOSYALARININ BULUNDUĞU TEMEL KLASÖR YOLU
 data_base_path = ""
 
-# 1. TÜM KULLANICI AKTİVİTELERİNİ İÇEREN BİRLEŞİK CSV DOSYASI
-consolidated_activity_file_name = "eslesmeler.csv"
+# 1. TÜM KULLANICI AKTİVİTELERİNİ İÇEREN BİRLEŞİK DOSYA (matcher.py parquet çıktısı veya CSV)
+consolidated_activity_file_name = "eslesmeler.parquet"
 consolidated_activity_file_path = os.path.join(data_base_path, consolidated_activity_file_name)
 
 # 2. BİRLEŞİK AKTİVİTE DOSYASINDAKİ SÜTUN ADLARI
@@ -56,11 +64,41 @@ secondary_place_fixed_weights = {
 }
 TARGET_VENUE_TYPES_SECONDARY = ['kahve', 'veteriner']
 
+# Mekan türü -> cihaz puan kolonu
+SCORE_COLUMNS = {
+    'Otel': 'Otel_Puani',
+    'Restoran': 'Restoran_Puani',
+    'Bar': 'Bar_Puani',
+    'Kahve': 'Kahve_Puani',
+    'Veteriner': 'Veteriner_Puani'
+}
+# Parçalar arasında toplanabilen cihaz kolonları (oran sadece en sonda hesaplanır)
+PARTIAL_COLUMNS = list(SCORE_COLUMNS.values()) + ['Ziyaret_Edilen_Mekan_Sayisi', 'Eslesme_Sayisi']
+
 # 8. ÇIKTI DOSYASI
 output_file = "venue_analysis_results.csv"
 
+# 9. DERLENMİŞ MEKAN KATALOĞU (kaynak dosyalar veya ayarlar değişince yeniden oluşturulur)
+venue_catalog_cache_path = os.path.join(data_base_path, "venue_catalog.parquet")
+
+# 10. BULANIK MEKAN ADI EŞLEŞTİRME (tam eşleşmeyen farklı adlar trigram indeksiyle aranır)
+fuzzy_matching_config = {
+    'enabled': False,
+    'top_k': 5,
+    'min_similarity': 0.85
+}
+
+# 11. PARALEL PUANLAMA (None: tüm çekirdekler, 1: seri)
+chunk_size = 50000
+scoring_workers = None
+# Bellekte bekleyen ara toplam sayısı bu değeri aşınca birleştirilir
+partial_merge_every = 64
+
 # --- Ayarlar Sonu ---
 
+# Puanlama havuzu işçi durumu (bkz. _scoring_worker_init)
+_SCORING_STATE = {}
+
 def preprocess_text_for_matching(series):
     if series is None: 
         return pd.Series(dtype='object')
@@ -131,6 +169,11 @@ def get_spending_bonus_vectorized(venue_types, spending_ranges):
     
     return bonuses
 
+def _normalize_names(series):
+    """Mekan adını lookup anahtarına çevirir; boş ve eksik adlar NaN olur"""
+    names = series.astype(str).str.lower().str.strip()
+    return names.where((names != '') & (names != 'nan'))
+
 def load_venue_data():
     """Mekan verilerini yükle ve lookup dictionary'leri oluştur"""
     print("Mekan verileri yükleniyor...")
@@ -152,14 +195,18 @@ def load_venue_data():
                 harcama_col = main_venue_data_config['harcama_col']
                 
                 if mekan_adi_col in main_venues_df.columns:
-                    # Create lookup dictionary for faster access
-                    for _, row in main_venues_df.iterrows():
-                        mekan_adi = str(row[mekan_adi_col]).lower().strip()
-                        if mekan_adi and mekan_adi != 'nan':
-                            main_venue_lookup[mekan_adi] = {
-                                'segment': row.get(segment_col, ''),
-                                'spending': row.get(harcama_col, '')
-                            }
+                    # Aynı ad tekrar ederse son satır geçerli olur
+                    names = _normalize_names(main_venues_df[mekan_adi_col])
+                    valid = names.notna()
+                    segments = main_venues_df[segment_col] if segment_col in main_venues_df.columns else ''
+                    spending = main_venues_df[harcama_col] if harcama_col in main_venues_df.columns else ''
+                    main_venues = pd.DataFrame({'segment': segments, 'spending': spending},
+                                               index=main_venues_df.index)[valid]
+                    main_venue_lookup = dict(zip(
+                        names[valid],
+                        ({'segment': seg, 'spending': spend}
+                         for seg, spend in zip(main_venues['segment'], main_venues['spending']))
+                    ))
                     print(f"Ana mekan verisi yüklendi: {len(main_venue_lookup)} kayıt")
         except Exception as e:
             print(f"Ana mekan dosyası yüklenirken hata: {e}")
@@ -172,21 +219,21 @@ def load_venue_data():
                 type_col_id = secondary_venue_data_config['type_col_name_or_index']
                 mekan_adi_col = secondary_venue_data_config['mekan_adi_col']
                 
-                for _, row in secondary_venues_df.iterrows():
-                    mekan_adi = str(row[mekan_adi_col]).lower().strip()
-                    venue_type = None
-                    
-                    if isinstance(type_col_id, int):
-                        if 0 <= type_col_id < len(row):
-                            venue_type = str(row.iloc[type_col_id]).lower().strip()
-                    elif isinstance(type_col_id, str) and type_col_id in row:
-                        venue_type = str(row[type_col_id]).lower().strip()
-                    
-                    if mekan_adi and mekan_adi != 'nan' and venue_type in TARGET_VENUE_TYPES_SECONDARY:
-                        secondary_venue_lookup[mekan_adi] = {
-                            'type': venue_type,
-                            'weight': secondary_place_fixed_weights.get(venue_type, 0)
-                        }
+                if isinstance(type_col_id, int) and 0 <= type_col_id < secondary_venues_df.shape[1]:
+                    type_values = secondary_venues_df.iloc[:, type_col_id]
+                elif isinstance(type_col_id, str) and type_col_id in secondary_venues_df.columns:
+                    type_values = secondary_venues_df[type_col_id]
+                else:
+                    type_values = pd.Series(None, index=secondary_venues_df.index, dtype=object)
+                venue_types = type_values.astype(str).str.lower().str.strip()
+                
+                names = _normalize_names(secondary_venues_df[mekan_adi_col])
+                valid = names.notna() & venue_types.isin(TARGET_VENUE_TYPES_SECONDARY)
+                secondary_venue_lookup = dict(zip(
+                    names[valid],
+                    ({'type': venue_type, 'weight': secondary_place_fixed_weights.get(venue_type, 0)}
+                     for venue_type in venue_types[valid])
+                ))
                 
                 print(f"İkincil mekan verisi yüklendi: {len(secondary_venue_lookup)} kayıt")
         except Exception as e:
@@ -194,139 +241,288 @@ def load_venue_data():
 
     return main_venue_lookup, secondary_venue_lookup
 
-def process_activities_vectorized(activities_df, main_venue_lookup, secondary_venue_lookup):
-    """Tüm aktiviteleri vectorized olarak işle ve cihaz bazında topla"""
-    print("Aktiviteler işleniyor (vectorized)...")
-    
-    # Preprocessing
-    activities_clean = activities_df[[device_id_col_in_activities, musteri_tabela_adi_aktivite_col]].copy()
-    activities_clean = activities_clean.dropna()
-    activities_clean['mekan_processed'] = activities_clean[musteri_tabela_adi_aktivite_col].astype(str).str.lower().str.strip()
-    
-    n_activities = len(activities_clean)
-    print(f"İşlenecek aktivite sayısı: {n_activities}")
-    
-    # Initialize result arrays for individual activities
-    activities_results = {
+def build_venue_catalog(main_venue_lookup, secondary_venue_lookup):
+    """Ana ve ikincil lookup'ları normalize mekan adına göre anahtarlı tek tabloya çevirir.
+
+    Segment ağırlığı ve harcama bonusu her farklı mekan için bir kez hesaplanır. Geçerli
+    ana mekan türü olan ad ana mekan olarak, olmayan ad ikincil katalogda varsa ikincil
+    mekan olarak kalır; ikisi de değilse katalogda yer almaz.
+    """
+    main_names = list(main_venue_lookup)
+    segments = [main_venue_lookup[name]['segment'] for name in main_names]
+    spending = [main_venue_lookup[name]['spending'] for name in main_names]
+    venue_types, _, base_weights = get_venue_type_and_quality_from_segment_vectorized(segments)
+    spending_bonuses = get_spending_bonus_vectorized(venue_types, spending)
+
+    main_catalog = pd.DataFrame({
+        'venue_type': venue_types,
+        'segment': segments,
+        'spending': spending,
+        'base_weight': base_weights,
+        'spending_bonus': spending_bonuses,
+        'total_weight': base_weights + spending_bonuses,
+        'match_source': "Ana Mekan",
+    }, index=pd.Index(main_names, dtype=object))
+    main_catalog = main_catalog[main_catalog['venue_type'].notna()]
+
+    # İkincil katalog sadece geçerli ana mekan eşleşmesi olmayan adlar için kullanılır
+    secondary_names = [name for name in secondary_venue_lookup if name not in main_catalog.index]
+    secondary_catalog = pd.DataFrame({
+        'venue_type': [secondary_venue_lookup[name]['type'].capitalize() for name in secondary_names],
+        'segment': "N/A",
+        'spending': "N/A",
+        'base_weight': 0.0,
+        'spending_bonus': 0.0,
+        'total_weight': [float(secondary_venue_lookup[name]['weight']) for name in secondary_names],
+        'match_source': "İkincil Mekan",
+    }, index=pd.Index(secondary_names, dtype=object))
+
+    frames = [df for df in (main_catalog, secondary_catalog) if len(df) > 0]
+    if not frames:
+        return main_catalog
+    return pd.concat(frames)
+
+def _file_signature(path, previous=None):
+    """Kaynak dosya imzası (boyut, mtime, sha1); boyut ve mtime değişmediyse önceki sha1 kullanılır"""
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    if previous and previous['boyut'] == st.st_size and previous['mtime_ns'] == st.st_mtime_ns:
+        return previous
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(block)
+    return {'boyut': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': sha1.hexdigest()}
+
+def _catalog_settings_hash():
+    """Kataloğu etkileyen ayarların özeti; ağırlıklar veya kolon adları değişirse önbellek geçersizdir"""
+    settings = [main_venue_data_config, secondary_venue_data_config, segment_weights,
+                spending_bonus_config, secondary_place_fixed_weights, TARGET_VENUE_TYPES_SECONDARY]
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+def _catalog_sources():
+    return [main_venue_data_config['path'], secondary_venue_data_config['path']]
+
+def _cached_catalog_is_fresh(metadata):
+    """Kaynakların sha1'i ve ayarlar aynıysa önbellek geçerlidir (sadece mtime değişmesi yetmez)"""
+    if metadata.get('ayarlar') != _catalog_settings_hash():
+        return False
+    cached = metadata.get('kaynaklar', {})
+    for path in _catalog_sources():
+        previous = cached.get(path)
+        current = _file_signature(path, previous)
+        if (current is None) != (previous is None):
+            return False
+        if current is not None and current['sha1'] != previous['sha1']:
+            return False
+    return True
+
+def load_venue_catalog(cache_path=None):
+    """Derlenmiş mekan kataloğunu önbellekten yükler; kaynaklar değiştiyse yeniden oluşturup yazar.
+
+    Önbellek, normalize ad dahil katalog kolonlarını tutan bir parquet dosyasıdır; kaynak
+    dosyaların boyut/mtime/sha1 imzaları ve ayar özeti dosya metadata'sında saklanır.
+    """
+    cache_path = cache_path or venue_catalog_cache_path
+    if os.path.exists(cache_path):
+        try:
+            table = pq.read_table(cache_path)
+            metadata = json.loads((table.schema.metadata or {}).get(b'venue_catalog', b'{}'))
+            if _cached_catalog_is_fresh(metadata):
+                venue_catalog = table.to_pandas().set_index('mekan_adi')
+                venue_catalog.index = venue_catalog.index.astype(object)
+                print(f"Mekan kataloğu önbellekten yüklendi: {len(venue_catalog)} kayıt ({cache_path})")
+                return venue_catalog
+            print("Mekan kaynakları veya ayarları değişmiş, katalog yeniden oluşturuluyor...")
+        except Exception as e:
+            print(f"Katalog önbelleği okunamadı, yeniden oluşturuluyor: {e}")
+
+    main_venue_lookup, secondary_venue_lookup = load_venue_data()
+    venue_catalog = build_venue_catalog(main_venue_lookup, secondary_venue_lookup)
+
+    metadata = {
+        'kaynaklar': {path: _file_signature(path) for path in _catalog_sources()},
+        'ayarlar': _catalog_settings_hash(),
+    }
+    table = pa.Table.from_pandas(venue_catalog.rename_axis('mekan_adi').reset_index(), preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           b'venue_catalog': json.dumps(metadata).encode()})
+    # Geçici dosya + os.replace: yarım yazılmış önbellek okunmaz
+    tmp_path = f"{cache_path}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, cache_path)
+    print(f"Mekan kataloğu derlendi: {len(venue_catalog)} kayıt -> {cache_path}")
+    return venue_catalog
+
+def resolve_activity_venues(activities_df, venue_catalog, fuzzy_index=None):
+    """Aktiviteleri normalize mekan adı üzerinden tek hash join ile kataloğa bağlar.
+
+    Mekan adları kategorik koda çevrilir; normalizasyon ve katalog araması sadece farklı
+    adlar üzerinde yapılır, sonuç kodlar ile aktivitelere yayılır. ``fuzzy_index``
+    (katalog indeksiyle aynı sırada ``VenueNameIndex``) verilirse tam eşleşmeyen farklı
+    adlar bulanık eşleştirmeyle kataloğa bağlanır.
+    """
+    activities_clean = activities_df[[device_id_col_in_activities, musteri_tabela_adi_aktivite_col]].dropna()
+    codes, names = pd.factorize(activities_clean[musteri_tabela_adi_aktivite_col])
+    names_processed = pd.Index(names).astype(str).str.lower().str.strip()
+
+    # Farklı ad -> katalog satırı (-1: eşleşme yok), aktivitelere kod ile yayılır
+    name_pos = venue_catalog.index.get_indexer(names_processed)
+    name_fuzzy = np.zeros(len(name_pos), dtype=bool)
+    if fuzzy_index is not None and (name_pos < 0).any():
+        unmatched = np.flatnonzero(name_pos < 0)
+        fuzzy_pos, _ = fuzzy_index.match(names[unmatched], k=fuzzy_matching_config['top_k'],
+                                         min_similarity=fuzzy_matching_config['min_similarity'])
+        name_pos[unmatched] = fuzzy_pos
+        name_fuzzy[unmatched] = fuzzy_pos >= 0
+    catalog_pos = name_pos[codes]
+    matched = catalog_pos >= 0
+    take = np.where(matched, catalog_pos, 0)
+
+    def _column(col, empty):
+        values = venue_catalog[col].to_numpy()[take] if len(venue_catalog) else np.full(len(take), empty)
+        return np.where(matched, values, empty)
+
+    match_source = _column('match_source', "Eşleşme Yok")
+    fuzzy = name_fuzzy[codes]
+    if fuzzy.any():
+        match_source[fuzzy] = [f"{source} (Bulanık)" for source in match_source[fuzzy]]
+
+    return pd.DataFrame({
         'device_aid': activities_clean[device_id_col_in_activities].values,
         'mekan_adi': activities_clean[musteri_tabela_adi_aktivite_col].values,
-        'venue_type': np.full(n_activities, None, dtype=object),
-        'segment': np.full(n_activities, None, dtype=object),
-        'base_weight': np.zeros(n_activities),
-        'spending_bonus': np.zeros(n_activities),
-        'total_weight': np.zeros(n_activities),
-        'match_source': np.full(n_activities, "Eşleşme Yok", dtype=object),
-        'spending_range': np.full(n_activities, None, dtype=object)
-    }
-    
-    # Process main venues
-    print("Ana mekan eşleştirmeleri işleniyor...")
-    segments_list = []
-    spending_list = []
-    main_match_indices = []
-    
-    for idx, mekan_processed in enumerate(tqdm(activities_clean['mekan_processed'], desc="Ana mekan lookup")):
-        if mekan_processed in main_venue_lookup:
-            venue_data = main_venue_lookup[mekan_processed]
-            segments_list.append(venue_data['segment'])
-            spending_list.append(venue_data['spending'])
-            main_match_indices.append(idx)
-        else:
-            segments_list.append('')
-            spending_list.append('')
-    
-    if main_match_indices:
-        # Vectorized processing for main venues
-        venue_types, quality_keys, base_weights = get_venue_type_and_quality_from_segment_vectorized(segments_list)
-        spending_bonuses = get_spending_bonus_vectorized(venue_types, spending_list)
-        
-        # Update results for matched main venues
-        valid_matches = [i for i in main_match_indices if venue_types[i] is not None]
-        
-        for idx in valid_matches:
-            activities_results['venue_type'][idx] = venue_types[idx]
-            activities_results['segment'][idx] = segments_list[idx]
-            activities_results['base_weight'][idx] = base_weights[idx]
-            activities_results['spending_bonus'][idx] = spending_bonuses[idx]
-            activities_results['total_weight'][idx] = base_weights[idx] + spending_bonuses[idx]
-            activities_results['match_source'][idx] = "Ana Mekan"
-            activities_results['spending_range'][idx] = spending_list[idx] if spending_list[idx] else None
-    
-    # Process secondary venues for unmatched activities
-    print("İkincil mekan eşleştirmeleri işleniyor...")
-    unmatched_mask = activities_results['total_weight'] == 0
-    unmatched_indices = np.where(unmatched_mask)[0]
-    
-    for idx in tqdm(unmatched_indices, desc="İkincil mekan lookup"):
-        mekan_processed = activities_clean.iloc[idx]['mekan_processed']
-        if mekan_processed in secondary_venue_lookup:
-            venue_data = secondary_venue_lookup[mekan_processed]
-            activities_results['venue_type'][idx] = venue_data['type'].capitalize()
-            activities_results['total_weight'][idx] = venue_data['weight']
-            activities_results['match_source'][idx] = "İkincil Mekan"
-            activities_results['segment'][idx] = "N/A"
-    
-    # Convert to DataFrame for processing
-    activities_df_processed = pd.DataFrame(activities_results)
-    
-    # CİHAZ BAZINDA TOPLAMA İŞLEMİ
-    print("Cihaz bazında puanlar toplanıyor...")
-    
-    # Her cihaz için puanları topla
-    device_scores = {}
-    venue_type_columns = ['Otel_Puani', 'Restoran_Puani', 'Bar_Puani', 'Kahve_Puani', 'Veteriner_Puani']
-    
-    # Her cihaz için grupla
-    grouped = activities_df_processed.groupby('device_aid')
+        'venue_type': _column('venue_type', None),
+        'segment': _column('segment', None),
+        'base_weight': _column('base_weight', 0.0).astype(float),
+        'spending_bonus': _column('spending_bonus', 0.0).astype(float),
+        'total_weight': _column('total_weight', 0.0).astype(float),
+        'match_source': match_source,
+    })
+
+def score_devices(activities_df_processed):
+    """(cihaz, mekan türü) bazında tek gruplu toplam; beş puan kolonu, eşleşme sayısı ve oranı.
+
+    Cihazlar sıralı döner; kolonlar ve değerler eski cihaz başına iterrows döngüsüyle aynıdır.
+    """
+    return finalize_device_scores(device_partials(activities_df_processed))
+
+def device_partials(activities_df_processed):
+    """Cihaz bazında birleştirilebilir ara toplamlar: beş puan toplamı, ziyaret ve eşleşme sayısı"""
+    venue_type_columns = list(SCORE_COLUMNS.values())
+    device_codes, devices = pd.factorize(activities_df_processed['device_aid'], sort=True)
+    total_weight = activities_df_processed['total_weight'].to_numpy(dtype=float)
+    matched = total_weight > 0
+
+    # Puan türü kodu (-1: puanlanmayan tür veya eşleşme yok)
+    type_codes = pd.Index(list(SCORE_COLUMNS)).get_indexer(activities_df_processed['venue_type'])
+    scored = matched & (type_codes >= 0)
+
+    n_devices, n_types = len(devices), len(venue_type_columns)
+    scores = np.bincount(device_codes[scored] * n_types + type_codes[scored], weights=total_weight[scored],
+                         minlength=n_devices * n_types).reshape(n_devices, n_types)
+
+    partials = pd.DataFrame(scores, columns=venue_type_columns)
+    partials.insert(0, 'device_aid', devices)
+    partials['Ziyaret_Edilen_Mekan_Sayisi'] = np.bincount(device_codes, minlength=n_devices)
+    partials['Eslesme_Sayisi'] = np.bincount(device_codes[matched], minlength=n_devices)
+    return partials
+
+def merge_device_partials(partials):
+    """Parçalardan gelen ara toplamları cihaz bazında toplar (parça sınırından bağımsız)"""
+    merged = pd.concat(partials, ignore_index=True)
+    return merged.groupby('device_aid', sort=True)[PARTIAL_COLUMNS].sum().reset_index()
+
+def finalize_device_scores(partials):
+    """Toplam puan ve eşleşme oranı sadece birleştirilmiş sayılardan hesaplanır"""
+    device_results = partials[['device_aid'] + list(SCORE_COLUMNS.values())].copy()
+    # Toplam puan eski sırayla toplanır (Otel + Restoran + Bar + Kahve + Veteriner)
+    device_results['Toplam_Puan'] = 0.0
+    for col in SCORE_COLUMNS.values():
+        device_results['Toplam_Puan'] += device_results[col]
+    visits = partials['Ziyaret_Edilen_Mekan_Sayisi'].to_numpy()
+    matches = partials['Eslesme_Sayisi'].to_numpy()
+    device_results['Ziyaret_Edilen_Mekan_Sayisi'] = visits
+    device_results['Eslesme_Sayisi'] = matches
+    device_results['Eslesme_Orani'] = matches / visits * 100
+    return device_results
+
+def _scoring_worker_init(venue_catalog, fuzzy_index):
+    """Havuz işçisi başlangıcı: katalog ve bulanık indeks her işçiye bir kez verilir"""
+    _SCORING_STATE.update(venue_catalog=venue_catalog, fuzzy_index=fuzzy_index)
+
+def _score_chunk(chunk):
+    """Tek aktivite parçası -> (cihaz ara toplamları, bulanık eşleşen aktivite sayısı, hata).
+
+    Sadece gerekli sütunları eksik parça atlanır; diğer hatalar çağırana yükselir.
+    """
+    required_cols = [device_id_col_in_activities, musteri_tabela_adi_aktivite_col]
+    missing = [col for col in required_cols if col not in chunk.columns]
+    if missing:
+        return None, 0, f"Eksik sütunlar: {', '.join(missing)}"
+    activities = resolve_activity_venues(chunk, _SCORING_STATE['venue_catalog'], _SCORING_STATE['fuzzy_index'])
+    n_fuzzy = int(activities['match_source'].str.endswith("(Bulanık)").sum())
+    return device_partials(activities), n_fuzzy, None
+
+def score_activity_file(path, venue_catalog, fuzzy_index=None, n_workers=None):
+    """Aktivite dosyasını parça parça (n_workers süreçlik havuzda) puanlar ve cihaz sonuçlarını döndürür.
+
+    İşçiler oran yerine birleştirilebilir toplam/sayı döndürür; eşleşme oranı en sonda
+    birleştirilmiş sayılardan hesaplandığı için sonuç parça sınırlarından bağımsızdır.
+    n_workers=1 seri çalışır; veri yoksa None döner.
+    """
+    n_workers = n_workers or scoring_workers or os.cpu_count() or 1
+    chunks = iter_match_chunks(path, chunk_size)
     
-    device_results = []
+    if n_workers > 1:
+        # fork: katalog ve bulanık indeks işçilere pickle edilmeden, copy-on-write devredilir
+        context = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+        pool = context.Pool(n_workers, initializer=_scoring_worker_init, initargs=(venue_catalog, fuzzy_index))
+        results = pool.imap(_score_chunk, chunks)
+    else:
+        pool = None
+        _scoring_worker_init(venue_catalog, fuzzy_index)
+        results = map(_score_chunk, chunks)
+    print(f"İşçi süreç sayısı: {n_workers}")
     
-    for device_id, group in tqdm(grouped, desc="Cihaz bazında toplama"):
-        # Her cihaz için sıfır puanlarla başla
-        scores = {
-            'device_aid': device_id,
-            'Otel_Puani': 0.0,
-            'Restoran_Puani': 0.0,
-            'Bar_Puani': 0.0,
-            'Kahve_Puani': 0.0,
-            'Veteriner_Puani': 0.0,
-            'Toplam_Puan': 0.0,
-            'Ziyaret_Edilen_Mekan_Sayisi': len(group),
-            'Eslesme_Sayisi': len(group[group['total_weight'] > 0]),
-            'Eslesme_Orani': len(group[group['total_weight'] > 0]) / len(group) * 100
-        }
-        
-        # Her mekan türü için puanları topla
-        for _, row in group.iterrows():
-            venue_type = row['venue_type']
-            total_weight = row['total_weight']
-            
-            if pd.notna(venue_type) and total_weight > 0:
-                if venue_type == 'Otel':
-                    scores['Otel_Puani'] += total_weight
-                elif venue_type == 'Restoran':
-                    scores['Restoran_Puani'] += total_weight
-                elif venue_type == 'Bar':
-                    scores['Bar_Puani'] += total_weight
-                elif venue_type == 'Kahve':
-                    scores['Kahve_Puani'] += total_weight
-                elif venue_type == 'Veteriner':
-                    scores['Veteriner_Puani'] += total_weight
-        
-        # Toplam puanı hesapla
-        scores['Toplam_Puan'] = (scores['Otel_Puani'] + scores['Restoran_Puani'] + 
-                               scores['Bar_Puani'] + scores['Kahve_Puani'] + 
-                               scores['Veteriner_Puani'])
-        
-        device_results.append(scores)
+    partials, n_fuzzy, n_chunks = [], 0, 0
+    try:
+        for chunk_partials, chunk_fuzzy, error in tqdm(results, desc="Chunks işleniyor"):
+            if error is not None:
+                print(f"Chunk atlandı: {error}")
+                continue
+            partials.append(chunk_partials)
+            n_fuzzy += chunk_fuzzy
+            n_chunks += 1
+            # Ara toplamlar biriktikçe birleştirilir; bellek cihaz sayısıyla sınırlı kalır
+            if len(partials) >= partial_merge_every:
+                partials = [merge_device_partials(partials)]
+    except BaseException:
+        # Hatada kalan parçalar beklenmez
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
     
-    return pd.DataFrame(device_results)
+    if not partials:
+        return None
+    print(f"Final cihaz bazında toplama yapılıyor ({n_chunks} chunk)...")
+    if fuzzy_index is not None:
+        print(f"Bulanık eşleşen aktivite sayısı: {n_fuzzy}")
+    return finalize_device_scores(merge_device_partials(partials))
 
 def main():
     print("Venue Analysis Script Başlatılıyor (Device-Based Scoring)...")
     
-    # Mekan verilerini yükle ve lookup dictionary'leri oluştur
-    main_venue_lookup, secondary_venue_lookup = load_venue_data()
+    # Normalize ada göre anahtarlı mekan kataloğu (kaynaklar değişmediyse önbellekten)
+    venue_catalog = load_venue_catalog()
+    fuzzy_index = None
+    if fuzzy_matching_config['enabled']:
+        fuzzy_index = VenueNameIndex(venue_catalog.index)
+        print(f"Bulanık eşleştirme açık: {len(fuzzy_index.vocabulary)} trigram, {len(venue_catalog)} katalog adı")
     
     # Aktivite dosyasını yükle
     if not os.path.exists(consolidated_activity_file_path):
@@ -335,42 +531,8 @@ def main():
     
     print("Aktivite dosyası yükleniyor...")
     try:
-        # Chunk-wise reading for large files
-        chunk_size = 50000
-        all_results = []
-        
-        for chunk in tqdm(pd.read_csv(consolidated_activity_file_path, chunksize=chunk_size), 
-                         desc="Chunks işleniyor"):
-            # Gerekli sütunları kontrol et
-            required_cols = [device_id_col_in_activities, musteri_tabela_adi_aktivite_col]
-            if not all(col in chunk.columns for col in required_cols):
-                print(f"Eksik sütunlar bulundu")
-                continue
-            
-            # Bu chunk'ı işle
-            chunk_results = process_activities_vectorized(chunk, main_venue_lookup, secondary_venue_lookup)
-            all_results.append(chunk_results)
-        
-        # Tüm sonuçları birleştir ve final toplama yap
-        if all_results:
-            # Chunk'ları birleştir
-            combined_chunks = pd.concat(all_results, ignore_index=True)
-            
-            # Son bir kez cihaz bazında topla (chunk'lar arası duplikasyon için)
-            print("Final cihaz bazında toplama yapılıyor...")
-            final_results = combined_chunks.groupby('device_aid').agg({
-                'Otel_Puani': 'sum',
-                'Restoran_Puani': 'sum',
-                'Bar_Puani': 'sum',
-                'Kahve_Puani': 'sum',
-                'Veteriner_Puani': 'sum',
-                'Toplam_Puan': 'sum',
-                'Ziyaret_Edilen_Mekan_Sayisi': 'sum',
-                'Eslesme_Sayisi': 'sum',
-                'Eslesme_Orani': 'mean'
-            }).reset_index()
-            
-        else:
+        final_results = score_activity_file(consolidated_activity_file_path, venue_catalog, fuzzy_index)
+        if final_results is None:
             print("İşlenecek veri bulunamadı.")
             return
             
@@ -0,0 +1,147 @@
+import difflib
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Türkçe büyük/küçük harf: 'İ' -> 'i', 'I' -> 'ı' (str.lower 'İ'yi 'i̇' yapar, 'I'yı 'i' yapar)
+_TURKISH_UPPER = str.maketrans({'İ': 'i', 'I': 'ı'})
+# Eşleştirme anahtarında Türkçe harfler ASCII karşılığına indirilir: katalog adları str.lower ile
+# normalize edildiği için 'I' orada 'i' olmuştur, aktivitelerde de 'isik'/'ışık' gibi yazımlar karışır
+_ASCII_FOLD = str.maketrans({'ı': 'i', 'ş': 's', 'ğ': 'g', 'ç': 'c', 'ö': 'o', 'ü': 'u',
+                             'â': 'a', 'î': 'i', 'û': 'u'})
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def turkish_casefold(names):
+    """Mekan adlarını Türkçe kurallarla küçültür ('İ' -> 'i', 'I' -> 'ı')"""
+    names = pd.Series(names, dtype=object).fillna('').astype(str)
+    folded = names.map(lambda name: name.translate(_TURKISH_UPPER)).str.lower()
+    # Birleşik nokta (U+0307): 'İ' içeren ad daha önce str.lower ile küçültülmüşse kalır
+    return folded.str.replace('\u0307', '', regex=False)
+
+
+def match_keys(names):
+    """Bulanık eşleştirme anahtarı: Türkçe küçültme, ASCII'ye indirme, noktalama ve fazla boşluk temizliği"""
+    keys = turkish_casefold(names).map(lambda name: name.translate(_ASCII_FOLD))
+    return keys.str.replace(_NON_WORD, ' ', regex=True).str.strip()
+
+
+def _trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(a, b, min_similarity):
+    """difflib oranı; ucuz üst sınırlar eşiğin altındaysa tam hesap atlanır (0 döner)"""
+    matcher = difflib.SequenceMatcher(None, a, b)
+    if matcher.real_quick_ratio() < min_similarity or matcher.quick_ratio() < min_similarity:
+        return 0.0
+    return matcher.ratio()
+
+
+class VenueNameIndex:
+    """Katalog adları üzerinde karakter trigram ters indeksi.
+
+    Adlar idf ağırlıklı, L2 normalize trigram vektörlerine çevrilir; sorgu adları için
+    kosinüs benzerliğine göre ilk ``k`` aday seyrek matris çarpımıyla bulunur, adaylar
+    difflib oranıyla yeniden puanlanır. ``match`` sonuçları anahtar bazında saklanır;
+    aynı ad sonraki parçalarda tekrar puanlanmaz.
+    """
+
+    def __init__(self, names):
+        self.names = pd.Index(names)
+        self.keys = match_keys(self.names).to_numpy()
+        self.vocabulary = {}
+        rows, cols = [], []
+        for row, key in enumerate(self.keys):
+            for gram in _trigrams(key):
+                rows.append(row)
+                cols.append(self.vocabulary.setdefault(gram, len(self.vocabulary)))
+        n_grams = len(self.vocabulary)
+        doc_freq = np.bincount(np.asarray(cols, dtype=np.int64), minlength=n_grams)
+        self.idf = np.log((1 + len(self.keys)) / (1 + doc_freq)) + 1.0
+        # Katalogda olmayan trigram en nadir trigram kadar ağırlık alır (sorgu normunu düşürür)
+        self.unknown_idf = np.log(1 + len(self.keys)) + 1.0
+        self.matrix = self._normalized(np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64),
+                                       len(self.keys), np.zeros(len(self.keys)))
+        self._resolved = {}
+
+    def _normalized(self, rows, cols, n_rows, unknown_sq):
+        weights = self.idf[cols] if len(cols) else np.zeros(0)
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n_rows) + unknown_sq)
+        values = weights / np.where(norms > 0, norms, 1.0)[rows]
+        return sparse.csr_matrix((values, (rows, cols)), shape=(n_rows, len(self.vocabulary)))
+
+    def _query_matrix(self, keys):
+        rows, cols = [], []
+        unknown = np.zeros(len(keys))
+        for row, key in enumerate(keys):
+            for gram in _trigrams(key):
+                col = self.vocabulary.get(gram)
+                if col is None:
+                    unknown[row] += 1
+                else:
+                    rows.append(row)
+                    cols.append(col)
+        return self._normalized(np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64),
+                                len(keys), unknown * self.unknown_idf ** 2)
+
+    def candidates(self, names, k=5, min_cosine=0.5, chunk_size=20_000):
+        """Her sorgu adı için kosinüs benzerliği en yüksek ilk k katalog adayı.
+
+        Dönüş: (sorgu indeksi, katalog indeksi, kosinüs) dizileri; sorgu ve azalan benzerlik sırasında.
+        """
+        keys = match_keys(names).to_numpy()
+        out_query, out_catalog, out_score = [], [], []
+        for start in range(0, len(keys), chunk_size):
+            scores = (self._query_matrix(keys[start:start + chunk_size]) @ self.matrix.T).tocoo()
+            keep = scores.data >= min_cosine
+            query_idx, catalog_idx, score = scores.row[keep], scores.col[keep], scores.data[keep]
+            # Eşit benzerlikte küçük katalog indeksi önce gelir
+            order = np.lexsort((catalog_idx, -score, query_idx))
+            query_idx, catalog_idx, score = query_idx[order], catalog_idx[order], score[order]
+            first = np.r_[0, np.flatnonzero(np.diff(query_idx)) + 1] if len(query_idx) else np.zeros(0, dtype=int)
+            rank = np.arange(len(query_idx)) - np.repeat(first, np.diff(np.r_[first, len(query_idx)]))
+            top = rank < k
+            out_query.append(query_idx[top].astype(np.int64) + start)
+            out_catalog.append(catalog_idx[top].astype(np.int64))
+            out_score.append(score[top])
+        if not out_query:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        return np.concatenate(out_query), np.concatenate(out_catalog), np.concatenate(out_score)
+
+    def match(self, names, k=5, min_similarity=0.85, min_cosine=0.5):
+        """Her sorgu adı için en iyi katalog eşleşmesinin konumu (-1: eşleşme yok) ve benzerliği.
+
+        Aday benzerliği, eşleştirme anahtarları üzerinde difflib oranıdır; eşitlikte
+        trigram kosinüsü yüksek (sonra katalog indeksi küçük) aday seçilir.
+        """
+        keys = match_keys(names).to_numpy()
+        new_keys = [key for key in pd.unique(keys) if key not in self._resolved]
+        if new_keys:
+            best, best_similarity = self._match_keys(np.asarray(new_keys, dtype=object), k,
+                                                     min_similarity, min_cosine)
+            self._resolved.update(zip(new_keys, zip(best.tolist(), best_similarity.tolist())))
+        resolved = [self._resolved[key] for key in keys]
+        return (np.fromiter((pos for pos, _ in resolved), dtype=np.int64, count=len(keys)),
+                np.fromiter((sim for _, sim in resolved), dtype=float, count=len(keys)))
+
+    def _match_keys(self, keys, k, min_similarity, min_cosine):
+        query_idx, catalog_idx, _ = self.candidates(keys, k=k, min_cosine=min_cosine)
+        similarity = np.fromiter(
+            (_similarity(keys[q], self.keys[c], min_similarity) for q, c in zip(query_idx, catalog_idx)),
+            dtype=float, count=len(query_idx))
+
+        best = np.full(len(keys), -1, dtype=np.int64)
+        best_similarity = np.zeros(len(keys))
+        accepted = similarity >= min_similarity
+        query_idx, catalog_idx, similarity = query_idx[accepted], catalog_idx[accepted], similarity[accepted]
+        # Adaylar kosinüs sırasında; stabil sıralama eşitlikte bu sırayı korur
+        order = np.lexsort((-similarity, query_idx))
+        query_idx, catalog_idx, similarity = query_idx[order], catalog_idx[order], similarity[order]
+        first = np.r_[True, query_idx[1:] != query_idx[:-1]] if len(query_idx) else np.zeros(0, dtype=bool)
+        best[query_idx[first]] = catalog_idx[first]
+        best_similarity[query_idx[first]] = similarity[first]
+        return best, best_similarity
@@ -1,21 +1,30 @@
 import pandas as pd
 import numpy as np
 import glob
-from sklearn.neighbors import BallTree
 from tqdm import tqdm
 from collections import Counter
 
-# 1. 📥 Cihaz CSV dosyalarını oku ve birleştir
+from device_store import is_store, iter_buckets
+from spatial_join import build_index
+from poi_analytics import venue_visit_stats
+
+# 1. 📥 Cihaz verilerini oku (parquet mağazası varsa bucket'lardan, yoksa cihaz CSV'lerinden)
+device_store_path = "device_store"
 device_csv_folder = "devices/*.csv"
-all_files = glob.glob(device_csv_folder)
 
-if not all_files:
-    raise FileNotFoundError("Devices klasöründe CSV dosyası bulunamadı!")
+if is_store(device_store_path):
+    kaynaklar = ((f"bucket={b:04d}", df) for b, df in iter_buckets(device_store_path))
+else:
+    all_files = glob.glob(device_csv_folder)
+    if not all_files:
+        raise FileNotFoundError("Devices klasöründe CSV dosyası bulunamadı!")
+    kaynaklar = ((file, None) for file in all_files)
 
 df_list = []
-for file in tqdm(all_files, desc="Cihaz verileri yükleniyor"):
+for file, df in tqdm(kaynaklar, desc="Cihaz verileri yükleniyor"):
     try:
-        df = pd.read_csv(file)
+        if df is None:
+            df = pd.read_csv(file)
         # Gerekli kolonların varlığını kontrol et
         required_cols = ['timestamp', 'latitude', 'longitude', 'device_aid']
         if not all(col in df.columns for col in required_cols):
@@ -50,34 +59,18 @@ except FileNotFoundError:
 
 # 3. 🧭 BallTree ile yakın veteriner kontrolü
 RADIUS_KM = 0.02  # 20 metre
-EARTH_RADIUS_KM = 6371.0
-
-# Veteriner koordinatlarını radyana çevir
-vet_coords = np.radians(vet_df[['latitude', 'longitude']].values)
-tree = BallTree(vet_coords, metric='haversine')
-
-# Cihaz koordinatlarını radyana çevir
-user_coords = np.radians(mobility_df[['latitude', 'longitude']].values)
-
-# Yakın veterinerleri bul
-print("Yakın veterinerler aranıyor...")
-indices = tree.query_radius(user_coords, r=RADIUS_KM / EARTH_RADIUS_KM)
-
-# Eşleşmeleri tabloya yaz (tüm eşleşmeleri kaydet)
-matches = []
-vet_names = []
-
-for idx, vet_indices in enumerate(tqdm(indices, desc="Eşleşmeler işleniyor")):
-    if len(vet_indices) > 0:
-        # En yakın veterineri bul
-        distances = tree.query([user_coords[idx]], k=len(vet_indices), return_distance=True)[0][0]
-        closest_idx = vet_indices[np.argmin(distances)]
-        closest_name = vet_df.iloc[closest_idx]['name']
-        
-        matches.append(closest_name)
-        vet_names.append(closest_name)
-    else:
-        matches.append(None)
+SPATIAL_ENGINE = "balltree"  # "grid": metrik grid-hash, "kdtree": izdüşümlü cKDTree (spatial_join)
+
+# Her ping için yarıçap içindeki en yakın veteriner tek vektörize çağrıyla bulunur (-1: yok)
+print(f"Yakın veterinerler aranıyor ({SPATIAL_ENGINE})...")
+index = build_index(vet_df['latitude'].values, vet_df['longitude'].values, RADIUS_KM * 1000,
+                    engine=SPATIAL_ENGINE)
+nearest_vet, _ = index.nearest(mobility_df['latitude'].values, mobility_df['longitude'].values)
+
+# Eşleşmeleri tabloya yaz: eşleşen ping'lere en yakın veterinerin adı
+matches = np.full(len(mobility_df), None, dtype=object)
+matched = nearest_vet >= 0
+matches[matched] = vet_df['name'].values[nearest_vet[matched]]
 
 mobility_df['near_vet'] = matches
 
@@ -101,46 +94,8 @@ print("Veteriner klinikleri analizi yapılıyor...")
 # Ziyaret edilen veterinerler
 visited_vet_df = mobility_df.dropna(subset=['near_vet']).copy()
 
-# Her veteriner için analiz
-vet_analysis = []
-
-for vet_name in visited_vet_df['near_vet'].unique():
-    vet_visits_data = visited_vet_df[visited_vet_df['near_vet'] == vet_name]
-    
-    # Temel istatistikler
-    total_visits = len(vet_visits_data)
-    unique_devices = vet_visits_data['device_aid'].nunique()
-    
-    # Zaman analizi
-    visits_by_hour = vet_visits_data['timestamp'].dt.hour.value_counts().sort_index()
-    peak_hour = visits_by_hour.idxmax()
-    
-    visits_by_day = vet_visits_data['timestamp'].dt.day_name().value_counts()
-    peak_day = visits_by_day.idxmax()
-    
-    # Tarih aralığı
-    first_visit = vet_visits_data['timestamp'].min()
-    last_visit = vet_visits_data['timestamp'].max()
-    
-    # En sık ziyaret eden cihaz
-    top_visitor = vet_visits_data['device_aid'].value_counts().iloc[0]
-    top_visitor_device = vet_visits_data['device_aid'].value_counts().index[0]
-    
-    vet_analysis.append({
-        'veteriner_name': vet_name,
-        'total_visits': total_visits,
-        'unique_visitors': unique_devices,
-        'avg_visits_per_visitor': round(total_visits / unique_devices, 2),
-        'peak_hour': peak_hour,
-        'peak_day': peak_day,
-        'first_visit_date': first_visit.strftime('%Y-%m-%d %H:%M'),
-        'last_visit_date': last_visit.strftime('%Y-%m-%d %H:%M'),
-        'most_frequent_visitor_device': top_visitor_device,
-        'most_frequent_visitor_count': top_visitor,
-        'visits_per_day': round(total_visits / ((last_visit - first_visit).days + 1), 2)
-    })
-
-vet_analysis_df = pd.DataFrame(vet_analysis)
+# Tüm veterinerler için istatistikler tek gruplu geçişte hesaplanır (poi_analytics)
+vet_analysis_df = venue_visit_stats(visited_vet_df, 'near_vet', name_col='veteriner_name')
 
 # Popülerlik sıralaması
 vet_analysis_df = vet_analysis_df.sort_values('total_visits', ascending=False)